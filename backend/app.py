@@ -1,14 +1,56 @@
 from fastapi import FastAPI # type: ignore
 from fastapi.middleware.cors import CORSMiddleware # type: ignore
 from fastapi import FastAPI, Request # type: ignore
-from fastapi.responses import FileResponse # type: ignore
-from fastapi.staticfiles import StaticFiles # type: ignore
+from fastapi.responses import FileResponse, JSONResponse, Response # type: ignore
+from contextlib import asynccontextmanager
+import asyncio
 import os
-from db.db import initialize_database
-from routes.routes import router
+import time
+from db.db import initialize_database_with_retry, ping, run_db, shutdown_db
+from routes.routes import if_none_match, router
+from services import emp_archive, jobs, master_cache, metrics, result_format, static_site, uploads
 
-app = FastAPI()
-initialize_database()
+# Seconds /api/ready waits for the database round trip
+READY_PING_TIMEOUT = float(os.getenv("READY_PING_TIMEOUT", "2"))
+
+# Startup progress, reported by /api/ready. The server accepts requests as
+# soon as the app is imported; migrations run in the background and are
+# retried until MySQL answers, so a database that is briefly down at boot
+# delays readiness instead of crashing the process.
+_started = time.perf_counter()
+readiness = {"database": False, "attempts": 0, "error": None, "ready_after_s": None}
+
+def _init_failed(attempt: int, error: Exception):
+    readiness["attempts"] = attempt
+    readiness["error"] = f"{type(error).__name__}: {error}"
+
+async def prepare_database():
+    """Migrations (with retry), then the master cache and the jobs that need the database."""
+    readiness["attempts"] = await initialize_database_with_retry(_init_failed)
+    readiness.update(database=True, error=None, ready_after_s=round(time.perf_counter() - _started, 3))
+    print(f"Database ready after {readiness['ready_after_s']}s")
+    try:
+        await run_db(master_cache.cache.warm)
+    except Exception as e:
+        # Not fatal: the cache fills on first use instead
+        print(f"Master cache warm-up failed: {e}")
+    await emp_archive.run_forever()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    files = await asyncio.to_thread(static_site.site.load)
+    print(f"Static frontend: {files} files, {static_site.site.memory_bytes} bytes in memory")
+    background = [
+        asyncio.create_task(prepare_database()),
+        asyncio.create_task(uploads.sweep_forever()),
+    ]
+    yield
+    for task in background:
+        task.cancel()
+    await jobs.manager.shutdown()
+    shutdown_db()
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -17,50 +59,57 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Outermost, so the timings include the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
 
 # Optional API route
 @app.get("/api/hello")
 def hello():
     return {"message": "Hello from FastAPI backend!"}
 
+@app.get("/api/health")
+def health():
+    """Liveness: the process is up and serving; does not touch the database."""
+    return {"status": "ok"}
+
+@app.get("/api/ready")
+async def ready():
+    """Readiness: migrations have run and the database answers right now."""
+    if not readiness["database"]:
+        return JSONResponse({"status": "starting", **readiness}, status_code=503)
+    try:
+        await asyncio.wait_for(run_db(ping), READY_PING_TIMEOUT)
+    except Exception as e:
+        return JSONResponse({"status": "unavailable", "error": f"{type(e).__name__}: {e}"}, status_code=503)
+    return {"status": "ready", **readiness}
+
 app.include_router(router)
 
-FRONTEND_BUILD_DIR = os.path.join(os.path.dirname(__file__), "../frontend/out")
-# Serve static folders explicitly
-for static_dir in ["_next"]:
-    path = os.path.join(FRONTEND_BUILD_DIR, static_dir)
-    if os.path.isdir(path):
-        app.mount(f"/{static_dir}", StaticFiles(directory=path), name=static_dir)
+def static_response(request: Request, asset: static_site.StaticAsset, status_code: int = 200) -> Response:
+    encoding = result_format.accepted_encoding(request.headers.get("accept-encoding"), tuple(asset.encoded))
+    body = asset.representation(encoding)
+    headers = {"ETag": body.etag, "Cache-Control": asset.cache_control}
+    if asset.encoded:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if status_code == 200 and if_none_match(request, body.etag):
+        return Response(status_code=304, headers=headers)
+    if body.body is not None:
+        return Response(content=body.body, status_code=status_code, headers=headers, media_type=asset.media_type)
+    return FileResponse(body.path, status_code=status_code, headers=headers, media_type=asset.media_type, stat_result=body.stat)
 
-@app.get("/")
-def serve_root():
-    return FileResponse(os.path.join(FRONTEND_BUILD_DIR, "index.html"))
+def not_found() -> JSONResponse:
+    return JSONResponse({"detail": "Not Found"}, status_code=404)
 
 @app.get("/{full_path:path}")
-def serve_static_routes(full_path: str):
-    # Block /api/* from matching static route handler
+def serve_static_routes(full_path: str, request: Request):
+    # Unknown /api/* paths are API 404s, not the frontend's 404 page
     if full_path.startswith("api/") or full_path == "api":
-        return {"detail": "Not Found"}  # or raise HTTPException(status_code=404)
-
-    # 1. Raw file (e.g. _next/static/*, css, js, etc.)
-    raw_file = os.path.join(FRONTEND_BUILD_DIR, full_path)
-    if os.path.isfile(raw_file):
-        return FileResponse(raw_file)
-
-    # 2. Directory index (e.g. /master/agents/ -> /master/agents/index.html)
-    dir_index = os.path.join(FRONTEND_BUILD_DIR, full_path, "index.html")
-    if os.path.isfile(dir_index):
-        return FileResponse(dir_index)
-
-    # 3. HTML fallback
-    html_fallback = os.path.join(FRONTEND_BUILD_DIR, f"{full_path}.html")
-    if os.path.isfile(html_fallback):
-        return FileResponse(html_fallback)
-
-    # 4. fallback 404
-    fallback_404 = os.path.join(FRONTEND_BUILD_DIR, "404.html")
-    if os.path.isfile(fallback_404):
-        return FileResponse(fallback_404, status_code=404)
-
-    return {"detail": "Not Found"}
+        return not_found()
+    asset, status_code = static_site.site.resolve(full_path)
+    if asset is None:
+        return not_found()
+    return static_response(request, asset, status_code)
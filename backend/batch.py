@@ -0,0 +1,116 @@
+"""Headless batch conversion of schedule PDFs.
+
+Converts every PDF in a directory or ZIP archive through the same pipeline
+and result cache as the /api/convert endpoints, without the web server.
+Progress goes to stderr, the combined result (the same JSON as
+POST /api/convert/batch) to stdout or --out. Run it from the backend
+directory:
+
+    python batch.py convert /data/schedules/2024-05 --out 2024-05.json
+    python batch.py convert schedules.zip --workers 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+
+def collect_dir(path: str, recursive: bool) -> List[Tuple[str, str]]:
+    pattern = os.path.join(path, "**", "*") if recursive else os.path.join(path, "*")
+    files = [
+        f for f in glob.glob(pattern, recursive=recursive)
+        if os.path.isfile(f) and f.lower().endswith(".pdf")
+    ]
+    return [(os.path.relpath(f, path), f) for f in sorted(files)]
+
+
+async def convert(files: List[Tuple[str, str]], concurrency: int) -> Dict[str, Any]:
+    from services import jobs, pipeline
+
+    started = time.perf_counter()
+    finished = 0
+
+    def on_file(report: Dict[str, Any]):
+        nonlocal finished
+        finished += 1
+        if report["status"] == "done":
+            detail = f"{report['rows']} rows" + (" (cached)" if report["cached"] else "")
+        else:
+            detail = f"FAILED: {report['error']}"
+        print(f"[{finished}/{len(files)}] {report['fileName']}: {detail}", file=sys.stderr, flush=True)
+
+    try:
+        combined = await pipeline.convert_batch(files, concurrency=concurrency, on_file=on_file)
+    finally:
+        await jobs.manager.shutdown()
+    print(
+        f"Converted {len(files) - combined['failed']}/{len(files)} files "
+        f"in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr,
+    )
+    return combined
+
+
+def run_convert(args, result_out) -> int:
+    from services import jobs, pipeline, upload_store, uploads
+
+    if args.workers:
+        jobs.manager.workers = args.workers
+
+    with tempfile.TemporaryDirectory(prefix="batch-") as work_dir:
+        if os.path.isdir(args.source):
+            files = collect_dir(args.source, args.recursive)
+        elif os.path.isfile(args.source):
+            # ZIP entries go into a throwaway store, like uploads
+            store = upload_store.UploadStore(
+                work_dir, upload_store.UPLOAD_STORE_MAX_BYTES, upload_store.UPLOAD_TTL, upload_store.UPLOAD_EVICT_GRACE
+            )
+            extracted = uploads.extract_pdfs(args.source, store)
+            files = [(info["fileName"], store.object_path(info["sha256"])) for info in extracted]
+        else:
+            print(f"No such file or directory: {args.source}", file=sys.stderr)
+            return 2
+        if not files:
+            print(f"No PDF files in {args.source}", file=sys.stderr)
+            return 2
+
+        combined = asyncio.run(convert(files, args.concurrency or pipeline.BATCH_CONCURRENCY))
+
+    body = json.dumps(combined, ensure_ascii=False, indent=2)
+    if args.out and args.out != "-":
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(body)
+    else:
+        result_out.write(body + "\n")
+        result_out.flush()
+    return 1 if combined["failed"] else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert_cmd = commands.add_parser("convert", help="Convert a directory or ZIP archive of PDFs")
+    convert_cmd.add_argument("source", help="Directory of PDFs or a ZIP archive")
+    convert_cmd.add_argument("--out", help="Write the combined JSON here instead of stdout")
+    convert_cmd.add_argument("--recursive", action="store_true", help="Include PDFs in subdirectories")
+    convert_cmd.add_argument("--workers", type=int, default=0, help="Converter processes (default: CONVERT_WORKERS)")
+    convert_cmd.add_argument("--concurrency", type=int, default=0, help="PDFs in flight (default: BATCH_CONCURRENCY)")
+    convert_cmd.set_defaults(run=run_convert)
+
+    args = parser.parse_args(argv)
+    # The converter and its PDF library print to stdout, here and in the
+    # worker processes; point fd 1 at stderr so stdout carries only the
+    # result. Services are imported after this for the same reason.
+    result_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    return args.run(args, result_out)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Throughput benchmark for bulk emp ingestion (crud.create_multiple_emps).
+
+Inserts synthetic batches of increasing size into the configured MySQL
+database and reports rows per second as JSON. Rows are tagged with
+created_by=BENCH_USER and removed afterwards; point MYSQL_DATABASE at a
+scratch database before running.
+
+    python bench/bulk_emps.py --sizes 10 100 1000 10000 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+import services.crud as crud
+from db.db import transaction
+
+
+def make_emps(count: int, offset: int = 0):
+    return [
+        {
+            "ship_name": f"BENCH MARU {offset + i}",
+            "dw": 1000 + i % 5000,
+            "loaded_cargo_name": "BENCH",
+            "data_date": 20240101 + i % 28,
+            "created_by": common.BENCH_USER,
+        }
+        for i in range(count)
+    ]
+
+
+def cleanup():
+    with transaction() as conn:
+        conn.cursor().execute("DELETE FROM emps WHERE created_by = %s", (common.BENCH_USER,))
+
+
+def bench_size(size: int, repeat: int) -> dict:
+    timings = []
+    for run in range(repeat):
+        emps = make_emps(size, offset=run * size)
+        started = time.perf_counter()
+        rows = crud.create_multiple_emps(emps)
+        timings.append(time.perf_counter() - started)
+        assert len(rows) == size, f"expected {size} rows back, got {len(rows)}"
+        cleanup()
+    best = min(timings)
+    return {"size": size, "best_s": best, "rows_per_s": size / best if best else 0.0}
+
+
+def run(sizes=(10, 100, 1000, 10000, 100000), repeat: int = 3) -> dict:
+    cleanup()
+    results = [bench_size(size, repeat) for size in sizes]
+    return {"chunk_size": crud.EMP_BULK_CHUNK_SIZE, "results": results}
+
+
+def main(args):
+    common.emit({"benchmark": "bulk_emps", "env": common.environment(), **run(args.sizes, args.repeat)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
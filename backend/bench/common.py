@@ -0,0 +1,82 @@
+"""Helpers shared by the benchmark scripts: timing, summaries and JSON output."""
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# created_by of every row a benchmark writes; cleanups delete by it
+BENCH_USER = "bench"
+
+# The converter and its PDF library print to stdout, here and in worker
+# processes. Keep stdout for results: point fd 1 at stderr and write results
+# to a duplicate of the original. Import this module before those libraries.
+_results_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+os.dup2(2, 1)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Percentiles in milliseconds of a list of durations in seconds."""
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def time_calls(fn: Callable[[], Any], count: int) -> List[float]:
+    timings = []
+    for _ in range(count):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers were measured on, so runs can be compared fairly."""
+    from services import cache
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "converter": cache.CONVERTER_VERSION,
+    }
+
+
+def emit(report: Dict[str, Any], out: Optional[str] = None):
+    body = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(body + "\n")
+    else:
+        _results_out.write(body + "\n")
+        _results_out.flush()
@@ -0,0 +1,95 @@
+"""Converter benchmark on synthetic schedule PDFs (converter.main).
+
+Generates PDFs of increasing page count that look like the daily schedule
+(the eight converter columns, ruled cells, half-width kana) and times a
+whole-document conversion in this process, without the worker pool or the
+result cache. Reports seconds per document, pages per second and the rows
+found, so a converter upgrade that reads fewer rows shows up as well.
+
+    python bench/convert_pdf.py --pages 1 10 50 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+import fitz # type: ignore
+from services import conversion, pp_config
+
+COLUMNS = [
+    pp_config.COLUMN1, pp_config.COLUMN2, pp_config.COLUMN3, pp_config.COLUMN4,
+    pp_config.COLUMN5, pp_config.COLUMN6, pp_config.COLUMN7, pp_config.COLUMN8,
+]
+COLUMN_WIDTHS = [30, 150, 60, 80, 60, 60, 60, 90]
+ROWS_PER_PAGE = 14
+ROW_HEIGHT = 36
+
+
+def _row(page: int, i: int):
+    n = page * ROWS_PER_PAGE + i
+    return [
+        str(i + 1),
+        f"BENCH MARU {n}\nPANAMA",
+        f"{10000 + n * 37}\n{5000 + n}",
+        "ｺﾝﾃﾅ",
+        "明石",
+        "水島",
+        "備讃東",
+        "ｱﾝｶｰ" if n % 3 == 0 else "",
+    ]
+
+
+def make_pdf(path: str, pages: int):
+    """Landscape A4 pages, each a header row plus ROWS_PER_PAGE ship rows."""
+    with fitz.open() as doc:
+        for page_number in range(pages):
+            page = doc.new_page(width=842, height=595)
+            rows = [COLUMNS] + [_row(page_number, i) for i in range(ROWS_PER_PAGE)]
+            for r, cells in enumerate(rows):
+                x, y = 40, 30 + r * ROW_HEIGHT
+                for width, text in zip(COLUMN_WIDTHS, cells):
+                    rect = fitz.Rect(x, y, x + width, y + ROW_HEIGHT)
+                    page.draw_rect(rect, color=(0, 0, 0), width=0.7)
+                    page.insert_textbox(rect + (2, 2, -2, -2), text, fontsize=7, fontname="japan")
+                    x += width
+        doc.save(path)
+
+
+def bench_pages(pages: int, repeat: int, work_dir: str) -> dict:
+    path = os.path.join(work_dir, f"schedule_{pages}p.pdf")
+    make_pdf(path, pages)
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(json.loads(conversion.convert_file(path)))
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        "pages": pages,
+        "best_s": best,
+        "pages_per_s": pages / best if best else 0.0,
+        "rows": rows,
+        "expected_rows": pages * ROWS_PER_PAGE,
+    }
+
+
+def run(pages=(1, 10, 50, 200), repeat: int = 1) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench-convert-") as work_dir:
+        return {"results": [bench_pages(n, repeat, work_dir) for n in pages]}
+
+
+def main(args):
+    common.emit({"benchmark": "convert_pdf", "env": common.environment(), **run(args.pages, args.repeat)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,78 @@
+"""Single-row CRUD latency for every master table.
+
+Times create, get, update and delete one row at a time through the crud
+helpers the routes use (one pooled connection and commit per call) and
+reports latency percentiles per table and operation as JSON. Rows are
+tagged with created_by=BENCH_USER and removed afterwards; point
+MYSQL_DATABASE at a scratch database before running.
+
+    python bench/crud_latency.py --rows 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+import services.crud as crud
+from db.db import transaction
+from services.master_cache import MASTER_TABLES
+
+
+def cleanup():
+    with transaction() as conn:
+        cur = conn.cursor()
+        for table in MASTER_TABLES:
+            cur.execute(f"DELETE FROM {table} WHERE created_by = %s", (common.BENCH_USER,))
+
+
+def _create(table: str, i: int) -> int:
+    # Fields a table does not have are ignored
+    values = {"name": f"BENCH {table} {i}", "short_name": f"B{i}", "t_name": f"BENCH TUG {i}", "ps": "P"}
+    return crud.create_entity(table, values, common.BENCH_USER)
+
+
+def _update(table: str, id_: int):
+    return crud.update_entity(table, id_, {"name": f"BENCH {table} {id_}*", "ps": "S"}, common.BENCH_USER)
+
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def bench_table(table: str, rows: int) -> dict:
+    timings = {"create": [], "get": [], "update": [], "delete": []}
+    ids = []
+    for i in range(rows):
+        id_, elapsed = _timed(_create, table, i)
+        ids.append(id_)
+        timings["create"].append(elapsed)
+    for id_ in ids:
+        timings["get"].append(_timed(crud.get_entity, table, id_)[1])
+    for id_ in ids:
+        timings["update"].append(_timed(_update, table, id_)[1])
+    for id_ in ids:
+        timings["delete"].append(_timed(crud.delete_entity, table, id_, common.BENCH_USER)[1])
+    return {op: common.latency_summary(values) for op, values in timings.items()}
+
+
+def run(rows: int = 200) -> dict:
+    cleanup()
+    try:
+        return {"rows": rows, "results": {table: bench_table(table, rows) for table in MASTER_TABLES}}
+    finally:
+        cleanup()
+
+
+def main(args):
+    common.emit({"benchmark": "crud_latency", "env": common.environment(), **run(args.rows)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200, help="Rows created, read, updated and deleted per table")
+    main(parser.parse_args())
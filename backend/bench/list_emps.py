@@ -0,0 +1,135 @@
+"""List-endpoint latency for /api/emps as the table grows.
+
+Seeds the emps table with synthetic rows up to each requested size and
+times GET requests against the API routes in this process (ASGI, no
+network), so routing, the query and JSON encoding are all measured. The
+full unpaginated list is only timed up to --full-list-max rows. Rows are
+tagged with created_by=BENCH_USER and removed afterwards; point
+MYSQL_DATABASE at an empty scratch database so the sizes are exact.
+
+    python bench/list_emps.py --sizes 10000 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+import httpx # type: ignore
+from fastapi import FastAPI # type: ignore
+import services.crud as crud
+from db.db import transaction
+from routes.routes import router
+
+SEED_CHUNK = 20000
+DELETE_CHUNK = 50000
+
+
+def seed(start: int, stop: int):
+    """Insert bench rows numbered [start, stop)."""
+    for offset in range(start, stop, SEED_CHUNK):
+        count = min(SEED_CHUNK, stop - offset)
+        crud.create_multiple_emps(
+            [
+                {
+                    "ship_name": f"BENCH MARU {(offset + i) % 5000}",
+                    "dw": offset + i,
+                    "loaded_cargo_name": "BENCH",
+                    "data_date": 20240101 + (offset + i) % 28,
+                    "created_by": common.BENCH_USER,
+                }
+                for i in range(count)
+            ],
+            mode="insert",
+        )
+
+
+def cleanup():
+    # Chunked so a million-row cleanup does not become one huge transaction
+    while True:
+        with transaction() as conn:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM emps WHERE created_by = %s LIMIT %s", (common.BENCH_USER, DELETE_CHUNK))
+            if cur.rowcount < DELETE_CHUNK:
+                return
+
+
+def paths(size: int, full_list_max: int) -> Dict[str, str]:
+    selected = {
+        "first_page_100": "/api/emps?limit=100",
+        "first_page_1000": "/api/emps?limit=1000",
+        "ship_name_filter": "/api/emps?limit=100&ship_name=BENCH%20MARU%2042",
+        "date_range_projection": "/api/emps?limit=1000&data_date_from=20240110&data_date_to=20240112&fields=id,ship_name,dw",
+    }
+    if size <= full_list_max:
+        selected["full_list"] = "/api/emps"
+    return selected
+
+
+async def measure(client: httpx.AsyncClient, path: str, requests: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    return common.latency_summary(latencies)
+
+
+async def deep_page(client: httpx.AsyncClient, pages: int) -> Dict[str, float]:
+    """Latency of following X-Next-Cursor `pages` pages deep."""
+    latencies: List[float] = []
+    params = {"limit": 100}
+    for _ in range(pages):
+        started = time.perf_counter()
+        response = await client.get("/api/emps", params=params)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        params = {"limit": 100, "cursor": cursor}
+    return common.latency_summary(latencies)
+
+
+async def bench_size(size: int, requests: int, full_list_max: int) -> dict:
+    app = FastAPI()
+    app.include_router(router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        result = {name: await measure(client, path, requests) for name, path in paths(size, full_list_max).items()}
+        result["cursor_walk_50_pages"] = await deep_page(client, 50)
+    return {"rows": size, **result}
+
+
+def run(sizes=(10000, 100000, 1000000), requests: int = 20, full_list_max: int = 100000) -> dict:
+    cleanup()
+    results = []
+    seeded = 0
+    try:
+        for size in sorted(sizes):
+            started = time.perf_counter()
+            seed(seeded, size)
+            seed_s = time.perf_counter() - started
+            seeded = max(seeded, size)
+            results.append({**asyncio.run(bench_size(size, requests, full_list_max)), "seed_s": seed_s})
+    finally:
+        cleanup()
+    return {"requests": requests, "results": results}
+
+
+def main(args):
+    report = run(args.sizes, args.requests, args.full_list_max)
+    common.emit({"benchmark": "list_emps", "env": common.environment(), **report})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--requests", type=int, default=20, help="Requests per path and size")
+    parser.add_argument("--full-list-max", type=int, default=100000, help="Largest table the full list is timed on")
+    main(parser.parse_args())
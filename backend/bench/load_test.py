@@ -0,0 +1,72 @@
+"""Concurrent HTTP load test for the API.
+
+Fires `--requests` GET requests at each path with `--concurrency` requests in
+flight and prints latency percentiles as JSON. Run it against the same server
+before and after a change to compare tail latency, e.g.
+
+    python bench/load_test.py --url http://localhost:8000 \
+        --path /api/master/ports --path /api/emps --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+import httpx # type: ignore
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": (len(latencies) + errors) / elapsed if elapsed else 0.0,
+        **common.latency_summary(latencies),
+    }
+
+
+async def run_path(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                response.raise_for_status()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        results = {}
+        for path in args.path:
+            results[path] = await run_path(client, path, args.requests, args.concurrency)
+    common.emit({"benchmark": "load_test", "concurrency": args.concurrency, "results": results})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", action="append", help="Path to request (repeatable)")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per path")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    args.path = args.path or ["/api/master/ports", "/api/emps"]
+    asyncio.run(main(args))
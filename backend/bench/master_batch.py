@@ -0,0 +1,80 @@
+"""Throughput benchmark for master batch writes (crud.apply_master_batch).
+
+Writes synthetic ports one request-sized batch at a time and compares the
+single transaction of apply_master_batch with one create_entity call (one
+connection checkout and commit) per row, the way the per-row routes do it.
+Each batch creates the rows, updates them and deletes them again; rows are
+tagged with created_by=BENCH_USER and removed afterwards. Point
+MYSQL_DATABASE at a scratch database before running.
+
+    python bench/master_batch.py --sizes 10 100 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+import services.crud as crud
+from db.db import transaction
+
+TABLE = "ports"
+
+
+def cleanup():
+    with transaction() as conn:
+        conn.cursor().execute(f"DELETE FROM {TABLE} WHERE created_by = %s", (common.BENCH_USER,))
+
+
+def creates(size: int, offset: int):
+    return [{"op": "create", "name": f"BENCH PORT {offset + i}", "short_name": f"B{offset + i}"} for i in range(size)]
+
+
+def run_batched(size: int, offset: int) -> float:
+    started = time.perf_counter()
+    created = crud.apply_master_batch(TABLE, creates(size, offset), common.BENCH_USER)
+    ids = [r["id"] for r in created]
+    crud.apply_master_batch(TABLE, [{"op": "update", "id": id_, "name": f"BENCH PORT {id_}*"} for id_ in ids], common.BENCH_USER)
+    crud.apply_master_batch(TABLE, [{"op": "delete", "id": id_} for id_ in ids], common.BENCH_USER)
+    return time.perf_counter() - started
+
+
+def run_per_row(size: int, offset: int) -> float:
+    started = time.perf_counter()
+    ids = [crud.create_entity(TABLE, op, common.BENCH_USER) for op in creates(size, offset)]
+    for id_ in ids:
+        crud.update_entity(TABLE, id_, {"name": f"BENCH PORT {id_}*"}, common.BENCH_USER)
+    for id_ in ids:
+        crud.delete_entity(TABLE, id_, common.BENCH_USER)
+    return time.perf_counter() - started
+
+
+def bench_size(size: int, repeat: int) -> dict:
+    result = {"size": size}
+    for name, fn in (("batch", run_batched), ("per_row", run_per_row)):
+        timings = []
+        for run in range(repeat):
+            timings.append(fn(size, offset=run * size))
+            cleanup()
+        best = min(timings)
+        # create + update + delete per row
+        result[name] = {"best_s": best, "rows_per_s": 3 * size / best if best else 0.0}
+    return result
+
+
+def run(sizes=(10, 100, 1000), repeat: int = 3) -> dict:
+    cleanup()
+    return {"table": TABLE, "results": [bench_size(size, repeat) for size in sizes]}
+
+
+def main(args):
+    common.emit({"benchmark": "master_batch", "env": common.environment(), **run(args.sizes, args.repeat)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
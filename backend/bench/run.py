@@ -0,0 +1,138 @@
+"""Run the benchmark suite and optionally compare it with an earlier run.
+
+Runs every selected benchmark with its default workload (or a smaller one
+with --quick) and writes one JSON report tagged with the git commit. With
+--baseline, timings that got slower (or throughputs that dropped) by more
+than --threshold are listed on stderr and the exit status is 1, so a
+converter upgrade or schema change can be checked against the previous
+report:
+
+    python bench/run.py --out bench-main.json
+    python bench/run.py --baseline bench-main.json --out bench-branch.json
+
+The database suites write to the configured MySQL database (migrations are
+applied first); point MYSQL_DATABASE at an empty scratch database. The SQL
+is MySQL-specific, so there is no SQLite stand-in.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+from bench import bulk_emps, convert_pdf, crud_latency, list_emps, master_batch, startup
+
+# name: (module, needs the database, full workload, --quick workload)
+SUITES = {
+    "startup": (startup, False, {"repeat": 5}, {"repeat": 2, "ready_timeout": 2.0}),
+    "convert_pdf": (convert_pdf, False, {"pages": [1, 10, 50, 200]}, {"pages": [1, 10]}),
+    "crud_latency": (crud_latency, True, {"rows": 200}, {"rows": 20}),
+    "bulk_emps": (bulk_emps, True, {"sizes": [10, 100, 1000, 10000, 100000]}, {"sizes": [10, 1000], "repeat": 1}),
+    "master_batch": (master_batch, True, {"sizes": [10, 100, 1000]}, {"sizes": [10, 100], "repeat": 1}),
+    "list_emps": (list_emps, True, {"sizes": [10000, 100000, 1000000]}, {"sizes": [10000], "requests": 5}),
+}
+
+# Keys that name a list item better than its position
+ITEM_KEYS = ("size", "pages", "rows")
+
+
+def run_suites(names: List[str], quick: bool) -> Dict[str, Any]:
+    db_error = None
+    if any(SUITES[name][1] for name in names):
+        from db.db import initialize_database
+        try:
+            initialize_database()
+        except Exception as e:
+            db_error = f"Database unavailable: {type(e).__name__}: {e}"
+
+    report = {}
+    for name in names:
+        module, needs_db, full, reduced = SUITES[name]
+        if needs_db and db_error:
+            report[name] = {"error": db_error}
+            continue
+        print(f"Running {name}...", file=sys.stderr, flush=True)
+        started = time.perf_counter()
+        try:
+            report[name] = module.run(**(reduced if quick else full))
+        except Exception as e:
+            # Keep the other suites' numbers
+            report[name] = {"error": f"{type(e).__name__}: {e}"}
+        print(f"  {name} took {time.perf_counter() - started:.1f}s", file=sys.stderr, flush=True)
+    return report
+
+
+def metrics(value: Any, path: str = "") -> Iterator[Tuple[str, float]]:
+    """Flatten a report into (path, number) pairs, naming list items by their size."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key not in ("env", "error"):
+                yield from metrics(item, f"{path}/{key}" if path else key)
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = str(index)
+            if isinstance(item, dict):
+                label = next((f"{k}={item[k]}" for k in ITEM_KEYS if k in item), label)
+            yield from metrics(item, f"{path}[{label}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield path, float(value)
+
+
+def direction(path: str) -> int:
+    """+1 when higher is better, -1 when lower is better, 0 when not a timing."""
+    key = path.rsplit("/", 1)[-1]
+    if key.endswith("per_s") or key == "rps":
+        return 1
+    if key.endswith("_ms") or key.endswith("_s"):
+        return -1
+    return 0
+
+
+def regressions(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    before = dict(metrics(baseline.get("suites", {})))
+    found = []
+    for path, value in metrics(current.get("suites", {})):
+        sign = direction(path)
+        old = before.get(path)
+        if not sign or not old or not value:
+            continue
+        # How many times worse the new value is
+        ratio = old / value if sign > 0 else value / old
+        if ratio > threshold:
+            found.append({"metric": path, "baseline": old, "current": value, "ratio": round(ratio, 3)})
+    return found
+
+
+def main(args) -> int:
+    names = args.suite or list(SUITES)
+    report = {"env": common.environment(), "quick": args.quick, "suites": run_suites(names, args.quick)}
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["baseline"] = {"commit": baseline.get("env", {}).get("commit"), "threshold": args.threshold}
+        report["regressions"] = regressions(baseline, report, args.threshold)
+        for item in report["regressions"]:
+            print(
+                f"REGRESSION {item['metric']}: {item['baseline']:.4g} -> {item['current']:.4g} (x{item['ratio']})",
+                file=sys.stderr,
+            )
+        status = 1 if report["regressions"] else 0
+
+    common.emit(report, args.out)
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suite", action="append", choices=list(SUITES), help="Suite to run (repeatable; default all)")
+    parser.add_argument("--quick", action="store_true", help="Smaller workloads for a fast smoke run")
+    parser.add_argument("--out", help="Write the report here instead of stdout")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Flag metrics this many times worse (default 1.2)")
+    sys.exit(main(parser.parse_args()))
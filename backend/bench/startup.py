@@ -0,0 +1,93 @@
+"""App import and startup time.
+
+Starts a fresh interpreter per run and times, from just before `import app`:
+  import_s  - the import (no database access happens here)
+  serving_s - the lifespan startup finished, i.e. the server would accept requests
+  ready_s   - migrations done and /api/ready would answer 200 (only when
+              MySQL is reachable within --ready-timeout)
+process_s is the whole child process, interpreter start and shutdown included.
+heavy_modules lists conversion and export libraries the import pulled in;
+it should stay empty.
+
+    python bench/startup.py --repeat 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench import common
+
+# Libraries only conversion workers and exports need
+HEAVY_MODULES = ["cv2", "numpy", "fitz", "pymupdf", "pdf_table2json.converter", "xlsxwriter"]
+
+RESULT_PREFIX = "STARTUP_RESULT "
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app
+result = {"import_s": time.perf_counter() - started}
+result["heavy_modules"] = [m for m in HEAVY_MODULES if m in sys.modules]
+
+async def main():
+    async with app.app.router.lifespan_context(app.app):
+        result["serving_s"] = time.perf_counter() - started
+        deadline = time.perf_counter() + READY_TIMEOUT
+        while not app.readiness["database"] and time.perf_counter() < deadline:
+            await asyncio.sleep(0.005)
+        if app.readiness["database"]:
+            result["ready_s"] = time.perf_counter() - started
+        else:
+            result["ready_error"] = app.readiness["error"]
+
+asyncio.run(main())
+print(RESULT_PREFIX + json.dumps(result), flush=True)
+"""
+
+
+def run_child(ready_timeout: float) -> dict:
+    script = f"HEAVY_MODULES = {HEAVY_MODULES!r}\nREADY_TIMEOUT = {ready_timeout!r}\nRESULT_PREFIX = {RESULT_PREFIX!r}\n{CHILD}"
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=common.BACKEND_DIR, capture_output=True, text=True, timeout=ready_timeout + 120,
+    )
+    elapsed = time.perf_counter() - started
+    for line in out.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return {**json.loads(line[len(RESULT_PREFIX):]), "process_s": elapsed}
+    raise RuntimeError(f"Startup run failed: {out.stderr.strip()[-500:]}")
+
+
+def _median(values):
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2] if ordered else None
+
+
+def run(repeat: int = 5, ready_timeout: float = 10.0) -> dict:
+    runs = [run_child(ready_timeout) for _ in range(repeat)]
+    result = {"repeat": repeat, "heavy_modules": sorted({m for r in runs for m in r["heavy_modules"]})}
+    for key in ("import_s", "serving_s", "ready_s", "process_s"):
+        values = [r[key] for r in runs if key in r]
+        if values:
+            result[key] = {"best_s": min(values), "median_s": _median(values)}
+    errors = [r["ready_error"] for r in runs if "ready_error" in r]
+    if errors:
+        result["ready_error"] = errors[-1]
+    return result
+
+
+def main(args):
+    common.emit({"benchmark": "startup", "env": common.environment(), **run(args.repeat, args.ready_timeout)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ready-timeout", type=float, default=10.0, help="Seconds to wait for the database per run")
+    main(parser.parse_args())
@@ -1,21 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import mysql.connector
+from mysql.connector import errorcode
+import asyncio
+import contextvars
+import functools
 import os
+import threading
+import time
 
 # Load .env variables
 load_dotenv()
 
 # MySQL configuration from environment
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_HOST = os.getenv("MYSQL_HOST")
-MYSQL_DATABASE = os.getenv("MYSQL_DATABASE")
+MYSQL_USER = os.getenv("MYSQL_USER", "root")
+MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
+MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
+MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "vessel_management")
 
-# Optional: path to your schema file
-SCHEMA_FILE = "schema.sql"
+# Connection pool configuration
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Connections older than this many seconds are replaced on checkout
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# Connections idle for longer than this many seconds are pinged on checkout
+DB_POOL_PING_AFTER = int(os.getenv("DB_POOL_PING_AFTER", "30"))
+# Threads used to run blocking queries off the event loop; defaults to the
+# pool capacity so a DB thread never waits on the pool
+DB_THREADS = int(os.getenv("DB_THREADS", "0")) or (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW)
+# Startup retries migrations until MySQL answers: first delay and its cap in
+# seconds, doubled after each failed attempt
+DB_INIT_BACKOFF = float(os.getenv("DB_INIT_BACKOFF", "0.5"))
+DB_INIT_BACKOFF_MAX = float(os.getenv("DB_INIT_BACKOFF_MAX", "30"))
+
+# Baseline schema, applied by the first migration
+SCHEMA_FILE = os.path.join(os.path.dirname(__file__), "schema.sql")
 
 def get_connection():
-    """Returns a MySQL database connection."""
+    """Returns a new (unpooled) MySQL database connection."""
     return mysql.connector.connect(
         user=MYSQL_USER,
         password=MYSQL_PASSWORD,
@@ -23,16 +47,288 @@ def get_connection():
         database=MYSQL_DATABASE,
     )
 
-# List of expected table names (must match the schema.sql)
-REQUIRED_TABLES = [
-    "operating_vessels",
-    "ports",
-    "agents",
-    "escort_locations",
-    "loaded_cargo",
-    "berths",
-    "master_towing"
-]
+
+# -----------------------
+# Query instrumentation
+# -----------------------
+# Pooled connections time every statement and report it to listeners
+# (request metrics); the wrappers pass everything else straight through.
+
+_query_listeners = []
+
+def add_query_listener(listener):
+    """Call `listener(seconds)` after every statement run on a pooled connection."""
+    _query_listeners.append(listener)
+
+def _report_query(started):
+    elapsed = time.perf_counter() - started
+    for listener in list(_query_listeners):
+        listener(elapsed)
+
+
+class TimedCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            _report_query(started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        finally:
+            _report_query(started)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def get_timed_connection():
+    return TimedConnection(get_connection())
+
+
+class PoolTimeoutError(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool.
+
+    Keeps up to `size` idle connections and opens up to `max_overflow`
+    extra ones under load; overflow connections are closed when returned
+    while the idle set is full. Callers wait up to `timeout` seconds for a
+    free connection before PoolTimeoutError is raised.
+    """
+
+    def __init__(self, factory, size, max_overflow, timeout, recycle, ping_after):
+        self._factory = factory
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self._cond = threading.Condition()
+        self._idle = []  # (conn, returned_at), used LIFO
+        self._created_at = {}
+        self._open = 0
+        self._in_use = 0
+        self.checkouts = 0
+        self.created = 0
+        self.closed = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.health_check_failures = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _new_connection(self):
+        conn = self._factory()
+        with self._cond:
+            self.created += 1
+            self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _close(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self.closed += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, returned_at):
+        now = time.monotonic()
+        if now - self._created_at.get(id(conn), now) > self.recycle:
+            return False
+        if now - returned_at > self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self.health_check_failures += 1
+                return False
+        return True
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    conn, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available within {self.timeout}s "
+                        f"(pool size {self.size}, overflow {self.max_overflow})"
+                    )
+                self._cond.wait(remaining)
+            waited = time.monotonic() - started
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+            self.checkouts += 1
+            self._in_use += 1
+            if self._in_use > self.size:
+                self.overflow_checkouts += 1
+
+        try:
+            if conn is not None and not self._healthy(conn, returned_at):
+                self._close(conn)
+                conn = None
+            if conn is None:
+                conn = self._new_connection()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def release(self, conn, discard=False):
+        if not discard:
+            try:
+                # End any transaction left open by reads so the next user gets a fresh snapshot
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._cond:
+            self._in_use -= 1
+            keep = not discard and len(self._idle) < self.size
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection and always return it, rolling back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn)
+            raise
+        self.release(conn)
+
+    def dispose(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "timeout": self.timeout,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "checkouts": self.checkouts,
+                "overflow_checkouts": self.overflow_checkouts,
+                "created": self.created,
+                "closed": self.closed,
+                "timeouts": self.timeouts,
+                "health_check_failures": self.health_check_failures,
+                "wait_time_avg": self.wait_time_total / self.checkouts if self.checkouts else 0.0,
+                "wait_time_max": self.wait_time_max,
+            }
+
+
+pool = ConnectionPool(
+    get_timed_connection,
+    size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    timeout=DB_POOL_TIMEOUT,
+    recycle=DB_POOL_RECYCLE,
+    ping_after=DB_POOL_PING_AFTER,
+)
+
+
+def connection():
+    """Pooled connection for reads; returned to the pool when the block exits."""
+    return pool.connection()
+
+
+@contextmanager
+def transaction(conn=None):
+    """Pooled connection that is committed when the block succeeds.
+
+    When `conn` is given it is reused as-is and the caller owns the commit,
+    which lets several helpers share one transaction.
+    """
+    if conn is not None:
+        yield conn
+        return
+    with pool.connection() as c:
+        yield c
+        c.commit()
+
+# Created on first use, so a later app lifespan gets a fresh one after shutdown_db
+_db_executor = None
+_db_executor_lock = threading.Lock()
+
+
+def _executor():
+    global _db_executor
+    with _db_executor_lock:
+        if _db_executor is None:
+            _db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="db")
+        return _db_executor
+
+
+async def run_db(fn, *args, **kwargs):
+    """Run a blocking DB helper on the bounded DB thread pool and await its result."""
+    loop = asyncio.get_running_loop()
+    # Carry the caller's context (e.g. per-request metrics) into the DB thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor(), functools.partial(context.run, fn, *args, **kwargs))
+
+
+def ping():
+    """One round trip on a pooled connection; raises when MySQL is unreachable."""
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1")
+        cur.fetchall()
+
+
+def shutdown_db():
+    global _db_executor
+    with _db_executor_lock:
+        executor, _db_executor = _db_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    pool.dispose()
 
 def table_exists(cursor, table_name):
     """Check if a table exists in the MySQL database."""
@@ -42,30 +338,151 @@ def table_exists(cursor, table_name):
     """, (MYSQL_DATABASE, table_name))
     return cursor.fetchone() is not None
 
-def initialize_database():
-    """Initialize the database schema if required tables are missing."""
-    conn = get_connection()
+def column_exists(cursor, table_name, column_name):
+    """Check if a column exists on a table."""
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND column_name = %s;
+    """, (MYSQL_DATABASE, table_name, column_name))
+    return cursor.fetchone() is not None
+
+def index_exists(cursor, table_name, index_name):
+    """Check if an index exists on a table."""
+    cursor.execute("""
+        SELECT index_name FROM information_schema.statistics
+        WHERE table_schema = %s AND table_name = %s AND index_name = %s
+        LIMIT 1;
+    """, (MYSQL_DATABASE, table_name, index_name))
+    return cursor.fetchone() is not None
+
+# -----------------------
+# Schema migrations
+# -----------------------
+# Migrations run once each, in version order, and are recorded in
+# schema_migrations. Databases created before versioning existed already have
+# some of these changes, so every step checks before it alters anything.
+
+# Secondary indexes: (table, index name, columns)
+LIST_INDEXED_TABLES = [
+    "operating_vessels",
+    "ports",
+    "agents",
+    "escort_locations",
+    "loaded_cargo",
+    "berths",
+    "master_towing",
+    "emps",
+]
+INDEXES = [(table, f"ix_{table}_live_updated", "deleted_at, updated_at") for table in LIST_INDEXED_TABLES] + [
+    ("emps", "ix_emps_session_id", "session_id"),
+    ("emps", "ix_emps_ship_dw_date", "ship_name, dw, data_date"),
+]
+# Covers crud.last_cargo: id keeps the (data_date, id) order in the index,
+# loaded_cargo_name makes it index-only
+LAST_CARGO_INDEXES = [
+    ("emps", "ix_emps_last_cargo", "ship_name, dw, deleted_at, data_date, id, loaded_cargo_name"),
+]
+
+def _initial_schema(conn):
     cursor = conn.cursor()
+    with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
+        schema_sql = f.read()
+    for stmt in schema_sql.split(";"):
+        stmt = stmt.strip()
+        if stmt:
+            cursor.execute(stmt)
+    cursor.close()
 
-    missing_tables = [table for table in REQUIRED_TABLES if not table_exists(cursor, table)]
+def _emps_natural_key(conn):
+    from db.emp_dedup import compact_emps
+    result = compact_emps(conn)
+    print(f"Backfilled {result['backfilled']} emp keys, removed {result['removed_duplicates']} duplicate live emps.")
 
-    if missing_tables:
-        print(f"Missing tables: {', '.join(missing_tables)}")
-        print("Initializing schema from file...")
+def _create_indexes(conn, indexes):
+    cursor = conn.cursor(buffered=True)
+    for table, index_name, columns in indexes:
+        if not index_exists(cursor, table, index_name):
+            cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+    cursor.close()
 
-        try:
-            with open(SCHEMA_FILE, "r", encoding="utf-8") as f:
-                schema_sql = f.read()
-            for stmt in schema_sql.split(";"):
-                stmt = stmt.strip()
-                if stmt:
-                    cursor.execute(stmt)
+def _list_and_lookup_indexes(conn):
+    _create_indexes(conn, INDEXES)
+
+def _last_cargo_index(conn):
+    _create_indexes(conn, LAST_CARGO_INDEXES)
+
+def _emps_partitions(conn):
+    from db.emp_partitions import partition_emps
+    partition_emps(conn)
+
+def _emps_live_keys(conn):
+    from db.emp_dedup import unique_live_keys
+    unique_live_keys(conn)
+
+MIGRATIONS = [
+    (1, "initial schema", _initial_schema),
+    (2, "emps natural key", _emps_natural_key),
+    (3, "list and lookup indexes", _list_and_lookup_indexes),
+    (4, "emps last cargo index", _last_cargo_index),
+    (5, "emps partitioned by data_date month", _emps_partitions),
+    (6, "emps natural key unique among live rows", _emps_live_keys),
+]
+
+SCHEMA_MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at DATETIME
+    ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4
+"""
+
+def _applied_migrations(cursor):
+    # One query when the schema is already versioned (the usual startup)
+    try:
+        cursor.execute("SELECT version FROM schema_migrations")
+    except mysql.connector.ProgrammingError as e:
+        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        cursor.execute(SCHEMA_MIGRATIONS_DDL)
+        return set()
+    return {row[0] for row in cursor.fetchall()}
+
+def initialize_database():
+    """Bring the database schema up to date by applying pending migrations."""
+    with transaction() as conn:
+        cursor = conn.cursor(buffered=True)
+        applied = _applied_migrations(cursor)
+
+        pending = [m for m in MIGRATIONS if m[0] not in applied]
+        if not pending:
+            print("Database schema is up to date.")
+        for version, name, apply in pending:
+            print(f"Applying migration {version}: {name}")
+            apply(conn)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, NOW())",
+                (version, name),
+            )
             conn.commit()
-            print("Tables created.")
-        except Exception as e:
-            print(f"Error loading schema.sql: {e}")
-    else:
-        print("All required tables already exist.")
 
-    cursor.close()
-    conn.close()
+        cursor.close()
+
+async def initialize_database_with_retry(on_failure=None) -> int:
+    """Run initialize_database until it succeeds, backing off between attempts.
+
+    `on_failure(attempt, error)` is called after each failed attempt. Returns
+    the number of attempts it took.
+    """
+    delay = DB_INIT_BACKOFF
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await run_db(initialize_database)
+            return attempt
+        except Exception as e:
+            print(f"Database initialization failed (attempt {attempt}, retrying in {delay:g}s): {e}")
+            if on_failure:
+                on_failure(attempt, e)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, DB_INIT_BACKOFF_MAX)
@@ -0,0 +1,99 @@
+import hashlib
+from typing import Any, Dict, Optional
+from db.db import column_exists, index_exists, transaction
+
+# -----------------------
+# EMP natural key
+# -----------------------
+# An emp row is identified by (ship_name, dw, loaded_cargo_name, data_date).
+# The key is stored as a SHA-256 hex digest in emps.natural_key. The Python
+# and SQL definitions below must produce the same value.
+#
+# Uniqueness only applies to live rows: emps.live_key is a stored generated
+# column holding natural_key while the row is live and NULL once it is
+# soft-deleted, and the unique key is on (live_key, data_date) (data_date
+# because emps is partitioned on it). A deleted row therefore never blocks
+# the same emp from being created again.
+
+EMP_NATURAL_KEY_SQL = (
+    "SHA2(CONCAT_WS(CHAR(31 USING utf8mb4), ship_name, dw, loaded_cargo_name, "
+    "IFNULL(data_date, '')), 256)"
+)
+
+
+def emp_natural_key(ship_name: str, dw: Any, loaded_cargo_name: str, data_date: Optional[int]) -> str:
+    parts = [ship_name, str(dw), loaded_cargo_name, "" if data_date is None else str(data_date)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+EMP_LIVE_KEY_SQL = "IF(deleted_at IS NULL, natural_key, NULL)"
+
+# -----------------------
+# Compaction job
+# -----------------------
+
+def compact_emps(conn) -> Dict[str, int]:
+    """Deduplicate live emps rows and enforce the live natural key.
+
+    Adds the natural_key column and emp_ingestions table when missing,
+    backfills keys, keeps the newest live row of each (natural_key, data_date)
+    and then adds live_key and uq_emps_live_key (unique_live_keys). Deleted
+    rows are history and are left alone.
+    """
+    cur = conn.cursor(buffered=True)
+
+    if not column_exists(cur, "emps", "natural_key"):
+        cur.execute("ALTER TABLE emps ADD COLUMN natural_key CHAR(64)")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS emp_ingestions (
+            idempotency_key VARCHAR(128) PRIMARY KEY,
+            session_id VARCHAR(36) NOT NULL,
+            row_count INT NOT NULL,
+            created_at DATETIME
+        ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4
+    """)
+
+    cur.execute(f"UPDATE emps SET natural_key = {EMP_NATURAL_KEY_SQL} WHERE natural_key IS NULL")
+    backfilled = cur.rowcount
+
+    # For live rows natural_key is their live_key, which may not exist yet
+    cur.execute("""
+        DELETE e FROM emps e
+        JOIN (
+            SELECT natural_key, data_date, MAX(id) AS keep_id
+            FROM emps
+            WHERE deleted_at IS NULL
+            GROUP BY natural_key, data_date
+            HAVING COUNT(*) > 1
+        ) k ON e.natural_key = k.natural_key AND e.data_date <=> k.data_date
+        WHERE e.deleted_at IS NULL AND e.id <> k.keep_id
+    """)
+    removed = cur.rowcount
+    conn.commit()
+    cur.close()
+
+    unique_live_keys(conn)
+    return {"backfilled": backfilled, "removed_duplicates": removed}
+
+
+def unique_live_keys(conn):
+    """Migration: move the unique natural key from every row to live rows only."""
+    cur = conn.cursor(buffered=True)
+    changes = []
+    if not column_exists(cur, "emps", "live_key"):
+        changes.append(f"ADD COLUMN live_key CHAR(64) AS ({EMP_LIVE_KEY_SQL}) STORED")
+    if index_exists(cur, "emps", "uq_emps_natural_key"):
+        changes.append("DROP INDEX uq_emps_natural_key")
+    if not index_exists(cur, "emps", "uq_emps_live_key"):
+        changes.append("ADD UNIQUE KEY uq_emps_live_key (live_key, data_date)")
+    if changes:
+        cur.execute(f"ALTER TABLE emps {', '.join(changes)}")
+    cur.close()
+
+
+if __name__ == "__main__":
+    # One-off run from the backend directory: python -m db.emp_dedup
+    with transaction() as conn:
+        result = compact_emps(conn)
+    print(f"Backfilled {result['backfilled']} keys, removed {result['removed_duplicates']} duplicate live emps.")
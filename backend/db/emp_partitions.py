@@ -0,0 +1,124 @@
+import datetime
+import os
+import re
+from typing import List, Optional, Tuple
+from db.db import MYSQL_DATABASE, index_exists
+from db.emp_dedup import EMP_NATURAL_KEY_SQL
+
+# -----------------------
+# EMP partitions
+# -----------------------
+# emps is partitioned by RANGE on data_date (YYYYMMDD), one partition per
+# month named pYYYYMM, plus:
+#   p_before - undated rows (data_date 0) and anything before the first month
+#   p_future - catch-all above the last month; split as months come up
+# MySQL requires every unique key to contain the partitioning column, so the
+# primary key is (id, data_date), the natural key index is
+# (natural_key, data_date) (now (live_key, data_date), see db/emp_dedup.py)
+# and data_date is NOT NULL (undated rows store 0, which the EMP lookups
+# already treated as oldest).
+
+# Months past the current one that always have a partition ready
+EMP_PARTITION_AHEAD_MONTHS = int(os.getenv("EMP_PARTITION_AHEAD_MONTHS", "3"))
+
+# data_date stored for rows without a date
+UNDATED = 0
+# Oldest month given its own partition when the table is first partitioned
+FIRST_MONTH_LIMIT = 20 * 12
+BEFORE = "p_before"
+FUTURE = "p_future"
+MONTH_PARTITION = re.compile(r"^p(\d{4})(\d{2})$")
+
+Month = Tuple[int, int]
+
+
+def add_months(month: Month, count: int) -> Month:
+    index = month[0] * 12 + month[1] - 1 + count
+    return index // 12, index % 12 + 1
+
+
+def current_month() -> Month:
+    today = datetime.date.today()
+    return today.year, today.month
+
+
+def month_start(month: Month) -> int:
+    """First data_date of a month."""
+    return month[0] * 10000 + month[1] * 100 + 1
+
+
+def partition_name(month: Month) -> str:
+    return f"p{month[0]:04d}{month[1]:02d}"
+
+
+def partition_month(name: str) -> Optional[Month]:
+    m = MONTH_PARTITION.match(name)
+    return (int(m.group(1)), int(m.group(2))) if m else None
+
+
+def _month_definitions(first: Month, last: Month) -> List[str]:
+    definitions = []
+    month = first
+    while month <= last:
+        definitions.append(f"PARTITION {partition_name(month)} VALUES LESS THAN ({month_start(add_months(month, 1))})")
+        month = add_months(month, 1)
+    return definitions
+
+
+def list_partitions(cur) -> List[str]:
+    """Partition names of emps in range order (empty when not partitioned)."""
+    cur.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = %s AND table_name = 'emps' AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """, (MYSQL_DATABASE,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def partition_emps(conn, ahead: int = EMP_PARTITION_AHEAD_MONTHS):
+    """Migration: partition emps by data_date month, up to `ahead` months past the current one."""
+    cur = conn.cursor(buffered=True)
+    if list_partitions(cur):
+        cur.close()
+        return
+
+    cur.execute(f"UPDATE emps SET data_date = %s, natural_key = {EMP_NATURAL_KEY_SQL} WHERE data_date IS NULL", (UNDATED,))
+    print(f"Set data_date to {UNDATED} on {cur.rowcount} undated emps.")
+
+    now = current_month()
+    last = add_months(now, ahead)
+    cur.execute("SELECT MIN(data_date) FROM emps WHERE data_date >= %s", (month_start(add_months(now, -FIRST_MONTH_LIMIT)),))
+    oldest = cur.fetchone()[0]
+    first = min(now, (oldest // 10000, max(1, min(12, oldest // 100 % 100)))) if oldest else now
+
+    changes = ["MODIFY data_date INT NOT NULL DEFAULT 0", "DROP PRIMARY KEY", "ADD PRIMARY KEY (id, data_date)"]
+    # Databases compacted after the live key existed no longer have it
+    if index_exists(cur, "emps", "uq_emps_natural_key"):
+        changes += ["DROP INDEX uq_emps_natural_key", "ADD UNIQUE KEY uq_emps_natural_key (natural_key, data_date)"]
+    cur.execute(f"ALTER TABLE emps {', '.join(changes)}")
+    definitions = (
+        [f"PARTITION {BEFORE} VALUES LESS THAN ({month_start(first)})"]
+        + _month_definitions(first, last)
+        + [f"PARTITION {FUTURE} VALUES LESS THAN MAXVALUE"]
+    )
+    cur.execute(f"ALTER TABLE emps PARTITION BY RANGE (data_date) ({', '.join(definitions)})")
+    print(f"Partitioned emps into {len(definitions)} partitions.")
+    cur.close()
+
+
+def add_future_partitions(cur, ahead: int = EMP_PARTITION_AHEAD_MONTHS) -> List[str]:
+    """Split p_future so every month up to `ahead` months from now has its own partition."""
+    months = [m for m in (partition_month(name) for name in list_partitions(cur)) if m]
+    if not months:
+        return []
+    first = add_months(max(months), 1)
+    last = add_months(current_month(), ahead)
+    if first > last:
+        return []
+    definitions = _month_definitions(first, last)
+    # Rows already in p_future for these months are moved by the reorganize
+    cur.execute(
+        f"ALTER TABLE emps REORGANIZE PARTITION {FUTURE} INTO "
+        f"({', '.join(definitions)}, PARTITION {FUTURE} VALUES LESS THAN MAXVALUE)"
+    )
+    return [definition.split()[1] for definition in definitions]
@@ -1,4 +1,4 @@
-CREATE TABLE operating_vessels (
+CREATE TABLE IF NOT EXISTS operating_vessels (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -10,7 +10,7 @@ CREATE TABLE operating_vessels (
     deleted_by VARCHAR(255)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE ports (
+CREATE TABLE IF NOT EXISTS ports (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -22,7 +22,7 @@ CREATE TABLE ports (
     deleted_by VARCHAR(255)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE agents (
+CREATE TABLE IF NOT EXISTS agents (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -34,7 +34,7 @@ CREATE TABLE agents (
     deleted_by VARCHAR(255)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE escort_locations (
+CREATE TABLE IF NOT EXISTS escort_locations (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -46,7 +46,7 @@ CREATE TABLE escort_locations (
     deleted_by VARCHAR(255)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE loaded_cargo (
+CREATE TABLE IF NOT EXISTS loaded_cargo (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -58,7 +58,7 @@ CREATE TABLE loaded_cargo (
     deleted_by VARCHAR(255)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE berths (
+CREATE TABLE IF NOT EXISTS berths (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -72,7 +72,7 @@ CREATE TABLE berths (
     FOREIGN KEY (port_id) REFERENCES ports (id)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE master_towing (
+CREATE TABLE IF NOT EXISTS master_towing (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     short_name VARCHAR(255) NOT NULL,
@@ -86,7 +86,7 @@ CREATE TABLE master_towing (
     deleted_by VARCHAR(255)
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
 
-CREATE TABLE emps (
+CREATE TABLE IF NOT EXISTS emps (
     id INT AUTO_INCREMENT PRIMARY KEY,
     ship_name VARCHAR(255) NOT NULL,
     dw INT NOT NULL,
@@ -98,5 +98,14 @@ CREATE TABLE emps (
     created_by VARCHAR(255),
     updated_by VARCHAR(255),
     deleted_by VARCHAR(255),
-    session_id VARCHAR(36)
+    session_id VARCHAR(36),
+    natural_key CHAR(64),
+    UNIQUE KEY uq_emps_natural_key (natural_key)
+) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
+
+CREATE TABLE IF NOT EXISTS emp_ingestions (
+    idempotency_key VARCHAR(128) PRIMARY KEY,
+    session_id VARCHAR(36) NOT NULL,
+    row_count INT NOT NULL,
+    created_at DATETIME
 ) ENGINE = InnoDB DEFAULT CHARSET = utf8mb4;
\ No newline at end of file
@@ -1,113 +1,416 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException # type: ignore
-from pydantic import BaseModel # type: ignore
+from fastapi import APIRouter, Depends, File, Header, Query, UploadFile, HTTPException, Request, Response # type: ignore
+from fastapi.responses import FileResponse, StreamingResponse # type: ignore
+from starlette.background import BackgroundTask # type: ignore
+from pydantic import BaseModel, create_model # type: ignore
+import asyncio
 import os
-import shutil
-import pdf_table2json.converter as converter # type: ignore
-from typing import Optional, List, Dict, Any
+import tempfile
+from typing import Optional, List, Dict, Any, Literal, Tuple
+from mysql.connector import IntegrityError
 import services.crud as crud
+from db import db
+from db.db import run_db
+from services import cache, entities, jobs, master_cache, matcher, metrics, pipeline, result_format, upload_store, uploads, xlsx_export
 
 router = APIRouter()
 
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 # Request model
 class ConvertRequest(BaseModel):
     fileName: str
+    # Digest returned by the upload; picks this exact file even if the name was uploaded again since
+    sha256: Optional[str] = None
+    # Return finished PP template rows instead of the converter's rows
+    template: bool = False
+    # Shape of the result when the conversion is already cached
+    format: Literal["rows", "columnar"] = "rows"
 
-@router.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return {"message": f"Uploaded {file.filename} successfully."}
+class BatchConvertRequest(BaseModel):
+    fileNames: List[str]
 
-@router.post("/api/convert")
-async def convert_pdf(req: ConvertRequest):
-    file_path = os.path.join(UPLOAD_DIR, req.fileName)
+class UploadSessionCreate(BaseModel):
+    fileName: str
+    size: Optional[int] = None
 
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail="File not found.")
+class MatchRequest(BaseModel):
+    texts: List[str]
+    # Restrict matches to these tables (default: every matched table)
+    tables: Optional[List[str]] = None
 
+class ExportRequest(BaseModel):
+    fileName: str
+    rows: List[Dict[str, Dict[str, Any]]]
+
+def check_content_length(request: Request, limit: int):
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {limit} bytes")
+
+async def read_body(request: Request, limit: int) -> bytes:
+    check_content_length(request, limit)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes")
+    return bytes(body)
+
+async def store_upload(chunks, file_name: str) -> Dict[str, Any]:
     try:
-        result = converter.main(file_path, json_file_out=False, image_file_out=False)
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Conversion failed: {str(e)}")
-
-# ======= Pydantic models for request/response =======
-class OperatingVesselBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
-
-class OperatingVesselCreate(OperatingVesselBase):
-    created_by: str
+        info = await uploads.save_stream(chunks, file_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except uploads.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return {"message": f"Uploaded {info['fileName']} successfully.", **info}
 
-class OperatingVesselUpdate(OperatingVesselBase):
-    updated_by: str
-
-class PortBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
-
-class PortCreate(PortBase):
-    created_by: str
-
-class PortUpdate(PortBase):
-    updated_by: str
-
-class AgentBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
-
-class AgentCreate(AgentBase):
-    created_by: str
-
-class AgentUpdate(AgentBase):
-    updated_by: str
-
-class EscortLocationBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
+@router.post("/api/upload")
+async def upload_file(request: Request, file: UploadFile = File(...)):
+    check_content_length(request, uploads.UPLOAD_MAX_BYTES)
+    return await store_upload(uploads.iter_upload_file(file), file.filename)
+
+@router.post("/api/upload/stream")
+async def upload_stream(request: Request, fileName: str):
+    """Raw request body upload, written to disk chunk by chunk as it arrives."""
+    check_content_length(request, uploads.UPLOAD_MAX_BYTES)
+    return await store_upload(request.stream(), fileName)
+
+@router.post("/api/upload/sessions")
+async def create_upload_session(data: UploadSessionCreate):
+    try:
+        session = await uploads.create_session(data.fileName, data.size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except uploads.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return session.to_dict()
+
+def get_upload_session_or_404(session_id: str) -> uploads.UploadSession:
+    session = uploads.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+@router.get("/api/upload/sessions/{session_id}")
+async def get_upload_session(session_id: str):
+    return get_upload_session_or_404(session_id).to_dict()
+
+@router.put("/api/upload/sessions/{session_id}")
+async def upload_chunk(session_id: str, offset: int, request: Request):
+    session = get_upload_session_or_404(session_id)
+    chunk = await read_body(request, uploads.UPLOAD_CHUNK_MAX_BYTES)
+    try:
+        await uploads.append_chunk(session, offset, chunk)
+    except uploads.UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "offset": e.expected})
+    except uploads.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return session.to_dict()
+
+@router.post("/api/upload/sessions/{session_id}/complete")
+async def complete_upload_session(session_id: str):
+    session = get_upload_session_or_404(session_id)
+    try:
+        info = await uploads.complete_session(session)
+    except uploads.UploadOffsetError as e:
+        raise HTTPException(status_code=409, detail={"message": "Upload is incomplete", "offset": e.expected})
+    return {"message": f"Uploaded {info['fileName']} successfully.", **info}
 
-class EscortLocationCreate(EscortLocationBase):
-    created_by: str
+async def resolve_upload(file_name: str, sha256: Optional[str] = None) -> str:
+    """Stored path of an upload, by digest when given, else the latest upload under the name."""
+    try:
+        name = uploads.safe_filename(file_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if sha256 is not None and not upload_store.is_digest(sha256):
+        raise HTTPException(status_code=400, detail="Invalid sha256")
+
+    file_path = await asyncio.to_thread(upload_store.store.resolve, name, sha256)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="File not found.")
+    return file_path
+
+async def job_response(job: jobs.Job, request: Request, fmt: str = "rows", status_code: int = 200) -> Response:
+    """Job status with its result in the requested format, serialized once and compressed when accepted."""
+    data = job.to_dict()
+    if "result" in data:
+        data["result"] = result_format.apply_format(data["result"], fmt)
+    accept_encoding = request.headers.get("accept-encoding")
+    body, encoding = await asyncio.to_thread(result_format.encode, data, accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+@router.post("/api/convert", status_code=202)
+async def convert_pdf(req: ConvertRequest, request: Request):
+    file_path = await resolve_upload(req.fileName, req.sha256)
+
+    digest = await pipeline.file_digest(file_path)
+    cached = await pipeline.cached_document(digest)
+    if cached is not None and not req.template:
+        rows = await asyncio.to_thread(result_format.parse_rows, cached)
+        job = jobs.manager.add_finished(rows, name=req.fileName)
+        return await job_response(job, request, req.format, status_code=202)
+
+    async def work():
+        result = cached if cached is not None else await pipeline.convert_document(file_path, digest)
+        if req.template:
+            return await pipeline.to_templates(result, req.fileName)
+        return await asyncio.to_thread(result_format.parse_rows, result)
 
-class EscortLocationUpdate(EscortLocationBase):
-    updated_by: str
+    try:
+        job = jobs.manager.submit(work, name=req.fileName)
+    except jobs.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_dict()
+
+@router.post("/api/convert/stream")
+async def convert_pdf_stream(req: ConvertRequest, request: Request):
+    """Per-page conversion streamed as NDJSON, or as Server-Sent Events when requested."""
+    file_path = await resolve_upload(req.fileName, req.sha256)
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    # Pages skip the job queue, so turn streams away once it is backed up
+    try:
+        jobs.manager.check_capacity()
+    except jobs.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-class LoadedCargoBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
+    async def body():
+        async for event in pipeline.iter_pages(file_path):
+            data = result_format.dumps(event)
+            if use_sse:
+                yield b"event: " + event["type"].encode() + b"\ndata: " + data + b"\n\n"
+            else:
+                yield data + b"\n"
 
-class LoadedCargoCreate(LoadedCargoBase):
-    created_by: str
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
 
-class LoadedCargoUpdate(LoadedCargoBase):
-    updated_by: str
+def submit_batch(files: List[Tuple[str, str]], name: str) -> Dict[str, Any]:
+    """Queue a batch conversion job whose progress counts finished files."""
+    progress = {"done": 0, "failed": 0, "total": len(files)}
 
-class BerthBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
-    port_id: Optional[int] = None
+    def on_file(report: Dict[str, Any]):
+        progress["done" if report["status"] == "done" else "failed"] += 1
 
-class BerthCreate(BerthBase):
-    created_by: str
+    try:
+        job = jobs.manager.submit(lambda: pipeline.convert_batch(files, on_file=on_file), name=name)
+    except jobs.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    job.progress = progress
+    return job.to_dict()
+
+@router.post("/api/convert/batch", status_code=202)
+async def convert_batch(req: BatchConvertRequest):
+    """Convert several uploaded PDFs as one job; poll it at /api/convert/{job_id}."""
+    names = list(dict.fromkeys(req.fileNames))
+    if not names:
+        raise HTTPException(status_code=400, detail="No files to convert")
+    if len(names) > pipeline.BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {pipeline.BATCH_MAX_FILES} files per batch")
+    files = [(name, await resolve_upload(name)) for name in names]
+    return submit_batch(files, name=f"batch of {len(files)} files")
+
+@router.post("/api/convert/batch/zip", status_code=202)
+async def convert_batch_zip(request: Request, file: UploadFile = File(...)):
+    """Store every PDF in a ZIP archive as an upload and convert them as one job."""
+    check_content_length(request, pipeline.BATCH_ZIP_MAX_BYTES)
+    try:
+        extracted = await asyncio.to_thread(
+            uploads.extract_pdfs, file.file, max_files=pipeline.BATCH_MAX_FILES
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except uploads.UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    files = [(info["fileName"], upload_store.store.object_path(info["sha256"])) for info in extracted]
+    return {**submit_batch(files, name=file.filename or "batch.zip"), "uploads": extracted}
+
+@router.get("/api/convert/stats")
+async def convert_stats():
+    return jobs.manager.stats()
+
+@router.get("/api/convert/{job_id}")
+async def get_convert_job(job_id: str, request: Request, format: Literal["rows", "columnar"] = "rows"):
+    """Job status; a finished job carries its rows, or columns plus row arrays with format=columnar."""
+    job = jobs.manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Conversion job not found")
+    return await job_response(job, request, format)
+
+@router.post("/api/export/xlsx")
+async def export_xlsx(req: ExportRequest):
+    """Build the schedule workbook on the server and stream it back as a download."""
+    if not req.rows:
+        raise HTTPException(status_code=400, detail="No rows to export")
+
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(xlsx_export.write_schedule, path, req.rows)
+    except Exception:
+        os.remove(path)
+        raise
+    return FileResponse(
+        path,
+        media_type=xlsx_export.XLSX_MEDIA_TYPE,
+        filename=xlsx_export.export_file_name(req.fileName),
+        background=BackgroundTask(os.remove, path),
+    )
 
-class BerthUpdate(BerthBase):
-    updated_by: str
+@router.get("/api/admin/cache")
+async def cache_stats():
+    return cache.results.stats()
+
+@router.delete("/api/admin/cache")
+async def purge_cache():
+    removed = await asyncio.to_thread(cache.results.purge)
+    return {"removed": removed}
+
+@router.get("/api/admin/uploads")
+async def upload_store_stats():
+    return upload_store.store.stats()
+
+@router.get("/api/admin/db/pool")
+async def db_pool_stats():
+    return db.pool.stats()
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/api/admin/master-cache")
+async def master_cache_stats():
+    return master_cache.cache.stats()
+
+# Largest number of texts resolved by one /api/match call
+MAX_MATCH_TEXTS = 10000
+
+@router.post("/api/match")
+async def match_master(req: MatchRequest):
+    """Find master names (towing, ports, berths, agents, operating vessels) in many texts at once.
+
+    `results[i]` lists the matches in `texts[i]`.
+    """
+    if len(req.texts) > MAX_MATCH_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_MATCH_TEXTS} texts per request")
+    unknown = [t for t in req.tables or [] if t not in matcher.MATCH_TABLES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown tables: {', '.join(unknown)}")
+
+    def resolve():
+        index = matcher.current_index()
+        return [index.match(text, req.tables) for text in req.texts]
+
+    return {"results": await run_db(resolve)}
+
+# ======= List query parameters =======
+MAX_PAGE_SIZE = 1000
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+class MasterListParams:
+    """Without `limit` the whole list is returned; with it, one keyset page."""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+        fields: Optional[str] = Query(default=None, description="Comma separated columns to return"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.name_prefix = name_prefix
+        self.fields = parse_fields(fields)
+
+class EmpListParams:
+    def __init__(
+        self,
+        limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        ship_name: Optional[str] = None,
+        data_date_from: Optional[int] = None,
+        data_date_to: Optional[int] = None,
+        fields: Optional[str] = Query(default=None, description="Comma separated columns to return"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.ship_name = ship_name
+        self.data_date_from = data_date_from
+        self.data_date_to = data_date_to
+        self.fields = parse_fields(fields)
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+def cached_json(request: Request, entry: master_cache.CachedEntry) -> Response:
+    """Serve a cached body with its ETag; 304 when the client already has it."""
+    # no-cache: clients may keep the body but must revalidate it every time
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if if_none_match(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+async def list_master(table: str, request: Request, response: Response, params: MasterListParams):
+    # The plain full list is served from the master cache
+    if params.limit is None and not params.name_prefix and not params.fields:
+        return cached_json(request, await run_db(master_cache.cache.get, table))
+    try:
+        if params.limit is None:
+            return await run_db(crud.list_entities, table, params.name_prefix, params.fields)
+        rows, next_cursor = await run_db(
+            crud.list_entities_page, table, params.limit, params.cursor, params.name_prefix, params.fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return rows
 
-class MasterTowingBase(BaseModel):
-    name: str
-    short_name: Optional[str] = None
-    t_name: Optional[str] = None
-    ps: Optional[str] = None
+# ======= Pydantic models for request/response =======
+def _model_prefix(spec: entities.EntitySpec) -> str:
+    return "".join(word.capitalize() for word in spec.label.split())
+
+def _field_definitions(spec: entities.EntitySpec, optional: bool = False) -> Dict[str, Any]:
+    return {
+        name: (type_, ...) if name in spec.required and not optional else (Optional[type_], None)
+        for name, type_ in spec.fields.items()
+    }
+
+def master_models(spec: entities.EntitySpec) -> Tuple[type, type]:
+    """Create and update bodies of a master table: its fields plus created_by / updated_by."""
+    prefix = _model_prefix(spec)
+    fields = _field_definitions(spec)
+    return (
+        create_model(f"{prefix}Create", **fields, created_by=(str, ...)),
+        create_model(f"{prefix}Update", **fields, updated_by=(str, ...)),
+    )
 
-class MasterTowingCreate(MasterTowingBase):
-    created_by: str
+# One operation of a batch on any master table; which fields are required
+# depends on op and the table (crud.validate_master_batch)
+MasterBatchOperation = create_model(
+    "MasterBatchOperation",
+    op=(Literal["create", "update", "delete"], ...),
+    id=(Optional[int], None),
+    **{name: field for spec in entities.ENTITIES for name, field in _field_definitions(spec, optional=True).items()},
+)
 
-class MasterTowingUpdate(MasterTowingBase):
-    updated_by: str
+class MasterBatchRequest(BaseModel):
+    # Recorded as created_by / updated_by / deleted_by
+    user: str
+    operations: List[MasterBatchOperation]
 
 class EmpCreate(BaseModel):
     ship_name: str
@@ -116,6 +419,15 @@ class EmpCreate(BaseModel):
     data_date: int
     created_by: str
 
+class EmpLastCargoKey(BaseModel):
+    ship_name: str
+    dw: int
+    # Only EMP rows dated before this (the schedule's date) count
+    before_date: int
+
+class EmpLastCargoRequest(BaseModel):
+    keys: List[EmpLastCargoKey]
+
 class EmpUpdate(BaseModel):
     ship_name: str
     dw: int
@@ -125,303 +437,165 @@ class EmpUpdate(BaseModel):
 
 
 # =======================
-# OPERATING VESSELS ROUTES
+# MASTER SNAPSHOT
 # =======================
-@router.post("/api/master/operating-vessels", response_model=Dict[str, Any])
-async def create_operating_vessel(data: OperatingVesselCreate):
-    return crud.get_operating_vessel(
-        crud.create_operating_vessel(data.name, data.short_name, data.created_by)
-    )
-
-@router.get("/api/master/operating-vessels/{id}", response_model=Dict[str, Any])
-async def get_operating_vessel(id: int):
-    vessel = crud.get_operating_vessel(id)
-    if not vessel:
-        raise HTTPException(status_code=404, detail="Operating vessel not found")
-    return vessel
-
-@router.put("/api/master/operating-vessels/{id}", response_model=bool)
-async def update_operating_vessel(id: int, data: OperatingVesselUpdate):
-    updated = crud.update_operating_vessel(id, data.name, data.short_name, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Operating vessel not found or already deleted")
-    return updated
-
-@router.delete("/api/master/operating-vessels/{id}", response_model=bool)
-async def delete_operating_vessel(id: int, deleted_by: str):
-    deleted = crud.delete_operating_vessel(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Operating vessel not found or already deleted")
-    return deleted
-
-@router.get("/api/master/operating-vessels", response_model=List[Dict[str, Any]])
-async def list_operating_vessels():
-    return crud.list_operating_vessels()
-
-
-# ==============
-# PORTS ROUTES
-# ==============
-
-@router.post("/api/master/ports", response_model=Dict[str, Any])
-async def create_port(data: PortCreate):
-    return crud.get_port(
-        crud.create_port(data.name, data.short_name, data.created_by)
-    )
-
-@router.get("/api/master/ports/{id}", response_model=Dict[str, Any])
-async def get_port(id: int):
-    port = crud.get_port(id)
-    if not port:
-        raise HTTPException(status_code=404, detail="Port not found")
-    return port
-
-@router.put("/api/master/ports/{id}", response_model=bool)
-async def update_port(id: int, data: PortUpdate):
-    updated = crud.update_port(id, data.name, data.short_name, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Port not found or already deleted")
-    return updated
-
-@router.delete("/api/master/ports/{id}", response_model=bool)
-async def delete_port(id: int, deleted_by: str):
-    deleted = crud.delete_port(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Port not found or already deleted")
-    return deleted
-
-@router.get("/api/master/ports", response_model=List[Dict[str, Any]])
-async def list_ports():
-    return crud.list_ports()
+@router.get("/api/master/snapshot", response_model=Dict[str, List[Dict[str, Any]]])
+async def master_snapshot(request: Request):
+    """Every master table in one response; berths include port_name and port_short_name."""
+    return cached_json(request, await run_db(master_cache.cache.snapshot))
 
+# =======================
+# MASTER BATCH WRITES
+# =======================
+@router.post("/api/master/{slug}/batch", response_model=List[Dict[str, Any]])
+async def master_batch(slug: str, data: MasterBatchRequest):
+    """Mixed creates, updates and deletes in one transaction, one result per operation."""
+    spec = entities.BY_SLUG.get(slug)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"Unknown master table: {slug}")
+    if not data.operations:
+        raise HTTPException(status_code=400, detail="No operations")
+    operations = [op.dict() for op in data.operations]
+    try:
+        crud.validate_master_batch(spec.table, operations)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except crud.BatchItemError as e:
+        raise HTTPException(status_code=400, detail={"message": e.message, "index": e.index})
+    try:
+        return await run_db(crud.apply_master_batch, spec.table, operations, data.user)
+    except crud.BatchItemError as e:
+        # Nothing was written
+        raise HTTPException(status_code=409, detail={"message": e.message, "index": e.index})
 
-# ==============
-# AGENTS ROUTES
-# ==============
-
-@router.post("/api/master/agents", response_model=Dict[str, Any])
-async def create_agent(data: AgentCreate):
-    return crud.get_agent(
-        crud.create_agent(data.name, data.short_name, data.created_by)
-    )
-
-@router.get("/api/master/agents/{id}", response_model=Dict[str, Any])
-async def get_agent(id: int):
-    agent = crud.get_agent(id)
-    if not agent:
-        raise HTTPException(status_code=404, detail="Agent not found")
-    return agent
-
-@router.put("/api/master/agents/{id}", response_model=bool)
-async def update_agent(id: int, data: AgentUpdate):
-    updated = crud.update_agent(id, data.name, data.short_name, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Agent not found or already deleted")
-    return updated
-
-@router.delete("/api/master/agents/{id}", response_model=bool)
-async def delete_agent(id: int, deleted_by: str):
-    deleted = crud.delete_agent(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Agent not found or already deleted")
-    return deleted
-
-@router.get("/api/master/agents", response_model=List[Dict[str, Any]])
-async def list_agents():
-    return crud.list_agents()
-
-
-# ===================
-# ESCORT LOCATIONS ROUTES
-# ===================
-
-@router.post("/api/master/escort-locations", response_model=Dict[str, Any])
-async def create_escort_location(data: EscortLocationCreate):
-    return crud.get_escort_location(
-        crud.create_escort_location(data.name, data.short_name, data.created_by)
-    )
-
-@router.get("/api/master/escort-locations/{id}", response_model=Dict[str, Any])
-async def get_escort_location(id: int):
-    loc = crud.get_escort_location(id)
-    if not loc:
-        raise HTTPException(status_code=404, detail="Escort location not found")
-    return loc
-
-@router.put("/api/master/escort-locations/{id}", response_model=bool)
-async def update_escort_location(id: int, data: EscortLocationUpdate):
-    updated = crud.update_escort_location(id, data.name, data.short_name, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Escort location not found or already deleted")
-    return updated
-
-@router.delete("/api/master/escort-locations/{id}", response_model=bool)
-async def delete_escort_location(id: int, deleted_by: str):
-    deleted = crud.delete_escort_location(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Escort location not found or already deleted")
-    return deleted
-
-@router.get("/api/master/escort-locations", response_model=List[Dict[str, Any]])
-async def list_escort_locations():
-    return crud.list_escort_locations()
-
-
-# ===============
-# LOADED CARGO ROUTES
-# ===============
-
-@router.post("/api/master/loaded-cargo", response_model=Dict[str, Any])
-async def create_loaded_cargo(data: LoadedCargoCreate):
-    return crud.get_loaded_cargo(
-        crud.create_loaded_cargo(data.name, data.short_name, data.created_by)
-    )
-
-@router.get("/api/master/loaded-cargo/{id}", response_model=Dict[str, Any])
-async def get_loaded_cargo(id: int):
-    cargo = crud.get_loaded_cargo(id)
-    if not cargo:
-        raise HTTPException(status_code=404, detail="Loaded cargo not found")
-    return cargo
-
-@router.put("/api/master/loaded-cargo/{id}", response_model=bool)
-async def update_loaded_cargo(id: int, data: LoadedCargoUpdate):
-    updated = crud.update_loaded_cargo(id, data.name, data.short_name, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Loaded cargo not found or already deleted")
-    return updated
-
-@router.delete("/api/master/loaded-cargo/{id}", response_model=bool)
-async def delete_loaded_cargo(id: int, deleted_by: str):
-    deleted = crud.delete_loaded_cargo(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Loaded cargo not found or already deleted")
-    return deleted
-
-@router.get("/api/master/loaded-cargo", response_model=List[Dict[str, Any]])
-async def list_loaded_cargo():
-    return crud.list_loaded_cargo()
-
-
-# ============
-# BERTHS ROUTES
-# ============
-
-@router.post("/api/master/berths", response_model=Dict[str, Any])
-async def create_berth(data: BerthCreate):
-    return crud.get_berth(
-        crud.create_berth(data.name, data.short_name, data.port_id, data.created_by)
-    )
-
-@router.get("/api/master/berths/{id}", response_model=Dict[str, Any])
-async def get_berth(id: int):
-    berth = crud.get_berth(id)
-    if not berth:
-        raise HTTPException(status_code=404, detail="Berth not found")
-    return berth
-
-@router.put("/api/master/berths/{id}", response_model=bool)
-async def update_berth(id: int, data: BerthUpdate):
-    updated = crud.update_berth(id, data.name, data.short_name, data.port_id, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Berth not found or already deleted")
-    return updated
-
-@router.delete("/api/master/berths/{id}", response_model=bool)
-async def delete_berth(id: int, deleted_by: str):
-    deleted = crud.delete_berth(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Berth not found or already deleted")
-    return deleted
-
-@router.get("/api/master/berths", response_model=List[Dict[str, Any]])
-async def list_berths():
-    return crud.list_berths()
-
-
-# =================
-# MASTER TOWING ROUTES
-# =================
-
-@router.post("/api/master/master-towing", response_model=Dict[str, Any])
-async def create_master_towing(data: MasterTowingCreate):
-    return crud.get_master_towing(
-        crud.create_master_towing(data.name, data.short_name, data.t_name, data.ps, data.created_by)
-    )
-
-@router.get("/api/master/master-towing/{id}", response_model=Dict[str, Any])
-async def get_master_towing(id: int):
-    mt = crud.get_master_towing(id)
-    if not mt:
-        raise HTTPException(status_code=404, detail="Master towing not found")
-    return mt
-
-@router.put("/api/master/master-towing/{id}", response_model=bool)
-async def update_master_towing(id: int, data: MasterTowingUpdate):
-    updated = crud.update_master_towing(id, data.name, data.short_name,  data.t_name, data.ps, data.updated_by)
-    if not updated:
-        raise HTTPException(status_code=404, detail="Master towing not found or already deleted")
-    return updated
+# =======================
+# MASTER TABLE ROUTES
+# =======================
+# POST, GET, PUT and DELETE of single rows plus the list, mounted for every
+# table in the entity registry under /api/master/<slug>.
 
-@router.delete("/api/master/master-towing/{id}", response_model=bool)
-async def delete_master_towing(id: int, deleted_by: str):
-    deleted = crud.delete_master_towing(id, deleted_by)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Master towing not found or already deleted")
-    return deleted
+async def run_master_write(spec: entities.EntitySpec, fn, *args):
+    try:
+        return await run_db(fn, *args)
+    except IntegrityError as e:
+        # ER_NO_REFERENCED_ROW_2: a foreign key names a row that does not exist
+        if e.errno != 1452:
+            raise
+        refs = ", ".join(f"{field} -> {target}" for field, target in spec.foreign_keys.items())
+        raise HTTPException(status_code=400, detail=f"{spec.label} references a missing row ({refs})")
+
+def mount_master_routes(spec: entities.EntitySpec):
+    Create, Update = master_models(spec)
+    path = f"/api/master/{spec.slug}"
+    table = spec.table
+
+    async def create(data: Create):
+        new_id = await run_master_write(spec, crud.create_entity, table, data.dict(), data.created_by)
+        return await run_db(crud.get_entity, table, new_id)
+
+    async def get(id: int):
+        row = await run_db(crud.get_entity, table, id)
+        if not row:
+            raise HTTPException(status_code=404, detail=f"{spec.label} not found")
+        return row
+
+    async def update(id: int, data: Update):
+        updated = await run_master_write(spec, crud.update_entity, table, id, data.dict(), data.updated_by)
+        if not updated:
+            raise HTTPException(status_code=404, detail=f"{spec.label} not found or already deleted")
+        return updated
+
+    async def delete(id: int, deleted_by: str):
+        deleted = await run_db(crud.delete_entity, table, id, deleted_by)
+        if not deleted:
+            raise HTTPException(status_code=404, detail=f"{spec.label} not found or already deleted")
+        return deleted
+
+    async def list_rows(request: Request, response: Response, params: MasterListParams = Depends()):
+        return await list_master(table, request, response, params)
+
+    router.add_api_route(path, create, methods=["POST"], response_model=Dict[str, Any], name=f"create_{table}")
+    router.add_api_route(f"{path}/{{id}}", get, methods=["GET"], response_model=Dict[str, Any], name=f"get_{table}")
+    router.add_api_route(f"{path}/{{id}}", update, methods=["PUT"], response_model=bool, name=f"update_{table}")
+    router.add_api_route(f"{path}/{{id}}", delete, methods=["DELETE"], response_model=bool, name=f"delete_{table}")
+    router.add_api_route(path, list_rows, methods=["GET"], response_model=List[Dict[str, Any]], name=f"list_{table}")
+
+for spec in entities.ENTITIES:
+    mount_master_routes(spec)
 
 # ----------------------------
 # Routes for emps
 # ----------------------------
 
-@router.get("/api/master/master-towing", response_model=List[Dict[str, Any]])
-async def list_master_towing():
-    return crud.list_master_towing()
-
 @router.post("/api/emps", response_model=Dict[str, Any])
 async def create_emp(data: EmpCreate):
-    emp_id = crud.create_emp(data.ship_name, data.dw, data.loaded_cargo_name, data.created_by)
-    return crud.get_emp(emp_id)
+    try:
+        emp_id = await run_db(crud.create_emp, data.ship_name, data.dw, data.loaded_cargo_name, data.created_by, data.data_date)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Emp already exists")
+    return await run_db(crud.get_emp, emp_id)
 
 @router.post("/api/emps/bulk", response_model=List[Dict[str, Any]])
-async def create_multiple_emps(data: List[EmpCreate]):
+async def create_multiple_emps(
+    data: List[EmpCreate],
+    mode: Literal["upsert", "insert"] = "upsert",
+    idempotency_key: Optional[str] = Header(default=None, max_length=128),
+):
     if not data:
         raise HTTPException(status_code=400, detail="Input list is empty")
 
-    inserted_ids = crud.create_multiple_emps([e.dict() for e in data])
-    
-    results = []
-    for emp_id in inserted_ids:
-        emp = crud.get_emp(emp_id)
-        if emp is None:
-            raise HTTPException(status_code=500, detail=f"Employee with id={emp_id} not found after insertion")
-        results.append(emp)
+    try:
+        return await run_db(crud.create_multiple_emps, [e.dict() for e in data], mode, idempotency_key)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Emp already exists")
+
+# Largest number of keys resolved by one /api/emps/last-cargo call
+MAX_LAST_CARGO_KEYS = 10000
 
-    return results
+@router.post("/api/emps/last-cargo")
+async def emps_last_cargo(req: EmpLastCargoRequest):
+    """Last known loaded cargo of many (ship_name, dw, before_date) keys at once.
 
+    `results[i]` is the cargo of the newest EMP row for `keys[i]`, or null.
+    """
+    if len(req.keys) > MAX_LAST_CARGO_KEYS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_LAST_CARGO_KEYS} keys per request")
+    keys = [(k.ship_name, k.dw, k.before_date) for k in req.keys]
+    return {"results": await run_db(crud.last_cargo, keys)}
 
 @router.get("/api/emps/{id}", response_model=Dict[str, Any])
 async def get_emp(id: int):
-    emp = crud.get_emp(id)
+    emp = await run_db(crud.get_emp, id)
     if not emp:
         raise HTTPException(status_code=404, detail="Emp not found")
     return emp
 
 @router.put("/api/emps/{id}", response_model=bool)
 async def update_emp(id: int, data: EmpUpdate):
-    updated = crud.update_emp(id, data.ship_name, data.dw, data.loaded_cargo_name, data.updated_by)
+    try:
+        updated = await run_db(crud.update_emp, id, data.ship_name, data.dw, data.loaded_cargo_name, data.updated_by)
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="Emp already exists")
     if not updated:
         raise HTTPException(status_code=404, detail="Emp not found or already deleted")
     return updated
 
 @router.delete("/api/emps/{id}", response_model=bool)
 async def delete_emp(id: int, deleted_by: str):
-    deleted = crud.delete_emp(id, deleted_by)
+    deleted = await run_db(crud.delete_emp, id, deleted_by)
     if not deleted:
         raise HTTPException(status_code=404, detail="Emp not found or already deleted")
     return deleted
 
 @router.get("/api/emps", response_model=List[Dict[str, Any]])
-async def list_emps():
-    return crud.list_emps()
+async def list_emps(response: Response, params: EmpListParams = Depends()):
+    filters = (params.ship_name, params.data_date_from, params.data_date_to)
+    try:
+        if params.limit is None:
+            return await run_db(crud.list_emps, *filters, params.fields)
+        rows, next_cursor = await run_db(crud.list_emps_page, params.limit, params.cursor, *filters, params.fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return rows
 
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from importlib import metadata
+from typing import Any, Dict, Optional
+
+CACHE_DIR = os.getenv("CONVERT_CACHE_DIR", "cache")
+# Disk budget for cached results; least recently used entries are evicted first
+CACHE_MAX_BYTES = int(os.getenv("CONVERT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Number of results also kept in memory
+CACHE_MEMORY_ITEMS = int(os.getenv("CONVERT_CACHE_MEMORY_ITEMS", "64"))
+# Entries older than this many seconds are treated as misses and removed
+CACHE_TTL = int(os.getenv("CONVERT_CACHE_TTL", str(7 * 24 * 3600)))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _converter_version() -> str:
+    try:
+        return metadata.version("pdf-table2json")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+CONVERTER_VERSION = _converter_version()
+
+
+def file_digest(file_path: str) -> str:
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(content_digest: str, options: Dict[str, Any]) -> str:
+    """Key a result by PDF content, converter version and conversion options."""
+    raw = f"{content_digest}:{CONVERTER_VERSION}:{json.dumps(options, sort_keys=True)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Two-level (memory LRU + disk) cache of conversion results.
+
+    Values are bytes. Disk entries are evicted by TTL (file mtime is the store
+    time) and, once the disk budget is exceeded, by last access (file atime).
+    """
+
+    def __init__(self, directory: str, max_bytes: int, memory_items: int, ttl: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.bin")
+
+    def _remember(self, key: str, stored_at: float, value: bytes):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+        path = self._path(key)
+        try:
+            st = os.stat(path)
+            if now - st.st_mtime > self.ttl:
+                self._remove(path, st.st_size)
+                value = None
+            else:
+                with open(path, "rb") as f:
+                    value = f.read()
+                # Record the access for LRU eviction without touching the store time
+                os.utime(path, (now, st.st_mtime))
+        except FileNotFoundError:
+            value = None
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, st.st_mtime, value)
+        return value
+
+    def put(self, key: str, value: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        # An overwritten entry no longer counts towards the disk total
+        try:
+            replaced = os.stat(path).st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(key, time.time(), value)
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(value) - replaced
+        self._evict()
+
+    def _remove(self, path: str, size: int):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((path, os.stat(path)))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            if self._disk_bytes is not None and self._disk_bytes <= self.max_bytes:
+                return
+
+        entries = self._scan()
+        now = time.time()
+        total = 0
+        live = []
+        for path, st in entries:
+            if now - st.st_mtime > self.ttl:
+                self._remove(path, 0)
+            else:
+                live.append((path, st))
+                total += st.st_size
+
+        live.sort(key=lambda e: e[1].st_atime)
+        for path, st in live:
+            if total <= self.max_bytes:
+                break
+            self._remove(path, 0)
+            total -= st.st_size
+
+        with self._lock:
+            self._disk_bytes = total
+
+    def purge(self) -> int:
+        """Remove every cached result and return how many disk entries were dropped."""
+        removed = 0
+        for path, _ in self._scan():
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = 0
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "converter_version": CONVERTER_VERSION,
+            }
+
+
+results = ResultCache(CACHE_DIR, CACHE_MAX_BYTES, CACHE_MEMORY_ITEMS, CACHE_TTL)
@@ -0,0 +1,133 @@
+import functools
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# -----------------------
+# Conversion workers
+# -----------------------
+# Everything in this module runs inside the conversion process pool, so the
+# functions must stay importable at module level (picklable by reference).
+# The converter (and with it OpenCV and NumPy) and PyMuPDF are imported on
+# first use, not with this module, so the web process starts without them;
+# pool workers load them up front through load_converter.
+
+# Options passed to converter.main; part of the result cache key
+CONVERT_OPTIONS = {"json_file_out": False, "image_file_out": False}
+
+# -----------------------
+# Stage timing
+# -----------------------
+# converter.main is a single function; wrapping two of the module-level
+# helpers it calls marks where its stages begin and end:
+#   render    - PDF pages rendered to 300 dpi images
+#   detect    - table and cell detection plus text extraction per cell
+#   serialize - rows formatted and dumped to JSON
+# A worker process runs one conversion at a time, so module-level marks are safe.
+
+_marks: Dict[str, float] = {}
+
+
+def _marking(fn, start: str, end: Optional[str] = None):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        _marks[start] = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if end:
+                _marks[end] = time.perf_counter()
+    return wrapper
+
+
+_converter = None
+_converter_lock = threading.Lock()
+
+
+def load_converter():
+    """pdf_table2json.converter with its stage marks installed, imported once per process."""
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            import pdf_table2json.converter as converter # type: ignore
+            converter.f_convert_pdf_to_images = _marking(converter.f_convert_pdf_to_images, "render_start", "render_end")
+            converter.f_format_conversion = _marking(converter.f_format_conversion, "serialize_start")
+            _converter = converter
+    return _converter
+
+
+def _run_converter(path: str) -> Tuple[str, Dict[str, float]]:
+    """converter.main's JSON plus seconds spent in each stage."""
+    converter = load_converter()
+    _marks.clear()
+    started = time.perf_counter()
+    result = converter.main(path, **CONVERT_OPTIONS)
+    finished = time.perf_counter()
+    try:
+        stages = {
+            "render": _marks["render_end"] - _marks["render_start"],
+            "detect": _marks["serialize_start"] - _marks["render_end"],
+            "serialize": finished - _marks["serialize_start"],
+        }
+    except KeyError:
+        # A converter release that no longer calls the wrapped helpers
+        stages = {}
+    stages["total"] = finished - started
+    return result, stages
+
+
+def _link_into(work_dir: str, file_path: str) -> str:
+    work_path = os.path.join(work_dir, os.path.basename(file_path))
+    try:
+        os.symlink(os.path.abspath(file_path), work_path)
+    except OSError:
+        shutil.copyfile(file_path, work_path)
+    return work_path
+
+
+def convert_file_timed(file_path: str) -> Tuple[str, Dict[str, float]]:
+    """Convert a whole PDF; the converter's JSON string and its stage timings."""
+    # converter.main renders page images next to its input file, so run it
+    # against a link in a scratch directory that is removed afterwards.
+    with tempfile.TemporaryDirectory(prefix="convert-") as work_dir:
+        work_path = _link_into(work_dir, file_path)
+        return _run_converter(work_path)
+
+
+def convert_file(file_path: str) -> str:
+    """Convert a whole PDF and return the converter's JSON string."""
+    return convert_file_timed(file_path)[0]
+
+
+def page_count(file_path: str) -> int:
+    import fitz # type: ignore
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+
+def convert_page_timed(file_path: str, page_number: int) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """Convert a single page (0-based); its rows and the stage timings."""
+    import fitz # type: ignore
+    with tempfile.TemporaryDirectory(prefix="convert-page-") as work_dir:
+        name, _ = os.path.splitext(os.path.basename(file_path))
+        page_path = os.path.join(work_dir, f"{name}_p{page_number + 1}.pdf")
+        with fitz.open(file_path) as src, fitz.open() as page_doc:
+            page_doc.insert_pdf(src, from_page=page_number, to_page=page_number)
+            page_doc.save(page_path)
+        result, stages = _run_converter(page_path)
+        return json.loads(result), stages
+
+
+def convert_page(file_path: str, page_number: int) -> List[Dict[str, Any]]:
+    """Convert a single page (0-based) and return its rows."""
+    return convert_page_timed(file_path, page_number)[0]
+
+
+def join_pages(pages: List[List[Dict[str, Any]]]) -> str:
+    """Combine per-page rows into the same JSON string converter.main returns."""
+    rows = [row for page in pages for row in page]
+    return json.dumps(rows, indent=4, ensure_ascii=False)
@@ -1,24 +1,15 @@
-import mysql.connector
-from typing import Optional, List, Dict, Any
-import os
-from dotenv import load_dotenv
+from typing import Optional, List, Dict, Any, Tuple, Callable
+from datetime import datetime
+import base64
+import json
 import uuid
+from db.db import connection, transaction
+from db.emp_dedup import EMP_NATURAL_KEY_SQL, emp_natural_key
+from db.emp_partitions import UNDATED
+from services import entities
 
-load_dotenv()
-
-MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
-MYSQL_USER = os.getenv("MYSQL_USER", "root")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
-MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "vessel_management")
-
-
-def get_connection():
-    return mysql.connector.connect(
-        host=MYSQL_HOST,
-        user=MYSQL_USER,
-        password=MYSQL_PASSWORD,
-        database=MYSQL_DATABASE
-    )
+# Rows per multi-row INSERT statement in bulk emp ingestion
+EMP_BULK_CHUNK_SIZE = 1000
 
 # -----------------------
 # Generic Helpers
@@ -29,264 +20,417 @@ def fetch_all(cur) -> List[Dict[str, Any]]:
     return [dict(zip(columns, row)) for row in cur.fetchall()]
 
 def fetch_one(cur) -> Optional[Dict[str, Any]]:
-    row = cur.fetchone()
-    if row is None:
+    # Drain the result so the pooled connection has no unread rows left
+    rows = cur.fetchall()
+    if not rows:
         return None
     columns = [col[0] for col in cur.description]
-    return dict(zip(columns, row))
+    return dict(zip(columns, rows[0]))
 
 # -----------------------
-# Reusable CRUD Template
+# Change notifications
 # -----------------------
+# Listeners are called with the table name after a write to it has been
+# committed, so in-process caches of table contents can be invalidated.
 
-def create_entity(table: str, name: str, short_name: Optional[str], created_by: str) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
-    query = f"""
-        INSERT INTO {table} (name, short_name, created_at, created_by, updated_at, updated_by)
-        VALUES (%s, %s, NOW(), %s, NOW(), %s)
-    """
-    cur.execute(query, (name, short_name, created_by, created_by))
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
-    return new_id
+_change_listeners: List[Callable[[str], None]] = []
 
-def get_entity(table: str, id_: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(f"SELECT * FROM {table} WHERE id=%s AND deleted_at IS NULL", (id_,))
-    result = fetch_one(cur)
-    conn.close()
-    return result
+def add_change_listener(listener: Callable[[str], None]):
+    _change_listeners.append(listener)
 
-def update_entity(table: str, id_: int, name: str, short_name: Optional[str], updated_by: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    query = f"""
-        UPDATE {table}
-        SET name=%s, short_name=%s, updated_at=NOW(), updated_by=%s
-        WHERE id=%s AND deleted_at IS NULL
-    """
-    cur.execute(query, (name, short_name, updated_by, id_))
-    conn.commit()
-    updated = cur.rowcount > 0
-    conn.close()
-    return updated
+def notify_change(table: str):
+    for listener in list(_change_listeners):
+        listener(table)
 
-def delete_entity(table: str, id_: int, deleted_by: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(f"""
-        UPDATE {table} SET deleted_at=NOW(), deleted_by=%s
-        WHERE id=%s AND deleted_at IS NULL
-    """, (deleted_by, id_))
-    conn.commit()
-    deleted = cur.rowcount > 0
-    conn.close()
-    return deleted
+# -----------------------
+# Listing (filters, projection, keyset pagination)
+# -----------------------
 
-def list_entities(table: str) -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(f"SELECT * FROM {table} WHERE deleted_at IS NULL ORDER BY updated_at DESC")
-    results = fetch_all(cur)
-    conn.close()
-    return results
+# Selectable columns per table, used to validate field projection
+TABLE_COLUMNS: Dict[str, List[str]] = {
+    **{spec.table: spec.columns for spec in entities.ENTITIES},
+    "emps": ["id", "ship_name", "dw", "loaded_cargo_name", "data_date"] + entities.AUDIT_COLUMNS + ["session_id", "natural_key", "live_key"],
+}
+
+Filters = List[Tuple[str, tuple]]
+
+# Legacy rows may have no updated_at; the cursor carries it as null
+def encode_cursor(row: Dict[str, Any]) -> str:
+    updated_at = row["updated_at"]
+    raw = json.dumps([updated_at.isoformat() if updated_at is not None else None, row["id"]])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        updated_at, id_ = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (datetime.fromisoformat(updated_at) if updated_at is not None else None), int(id_)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(updated_at: Optional[datetime], id_: int) -> Filters:
+    """Rows after (updated_at, id) in ORDER BY updated_at DESC, id DESC, where NULLs sort last."""
+    if updated_at is None:
+        return [("(updated_at IS NULL AND id < %s)", (id_,))]
+    return [("(updated_at < %s OR (updated_at = %s AND id < %s) OR updated_at IS NULL)", (updated_at, updated_at, id_))]
+
+def select_columns(table: str, fields: Optional[List[str]]) -> List[str]:
+    if not fields:
+        return TABLE_COLUMNS[table]
+    unknown = [f for f in fields if f not in TABLE_COLUMNS[table]]
+    if unknown:
+        raise ValueError(f"Unknown fields for {table}: {', '.join(unknown)}")
+    return fields
+
+def prefix_filter(column: str, prefix: Optional[str]) -> Filters:
+    if not prefix:
+        return []
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return [(f"{column} LIKE %s", (escaped + "%",))]
+
+def _list_live(
+    table: str,
+    filters: Filters,
+    fields: Optional[List[str]],
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    columns = select_columns(table, fields)
+    # The cursor needs the sort key even when the caller did not ask for it
+    query_columns = columns + [c for c in ("updated_at", "id") if limit is not None and c not in columns]
+
+    if cursor:
+        filters = filters + keyset_filter(*decode_cursor(cursor))
+    where = ["deleted_at IS NULL"] + [clause for clause, _ in filters]
+    params: List[Any] = [p for _, values in filters for p in values]
+
+    query = f"SELECT {', '.join(query_columns)} FROM {table} WHERE {' AND '.join(where)} ORDER BY updated_at DESC, id DESC"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit + 1)
+
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, params)
+        rows = fetch_all(cur)
+
+    next_cursor = None
+    if limit is not None:
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1])
+        extra = set(query_columns) - set(columns)
+        if extra:
+            rows = [{k: v for k, v in row.items() if k not in extra} for row in rows]
+    return rows, next_cursor
 
 # -----------------------
-# Specific Entities
+# Master entities
 # -----------------------
-
-# Replace <entity_name> with actual table name below.
-
-# Operating Vessels
-create_operating_vessel = lambda name, sn, by: create_entity("operating_vessels", name, sn, by)
-get_operating_vessel = lambda id_: get_entity("operating_vessels", id_)
-update_operating_vessel = lambda id_, name, sn, by: update_entity("operating_vessels", id_, name, sn, by)
-delete_operating_vessel = lambda id_, by: delete_entity("operating_vessels", id_, by)
-list_operating_vessels = lambda: list_entities("operating_vessels")
-
-# Ports
-create_port = lambda name, sn, by: create_entity("ports", name, sn, by)
-get_port = lambda id_: get_entity("ports", id_)
-update_port = lambda id_, name, sn, by: update_entity("ports", id_, name, sn, by)
-delete_port = lambda id_, by: delete_entity("ports", id_, by)
-list_ports = lambda: list_entities("ports")
-
-# Agents
-create_agent = lambda name, sn, by: create_entity("agents", name, sn, by)
-get_agent = lambda id_: get_entity("agents", id_)
-update_agent = lambda id_, name, sn, by: update_entity("agents", id_, name, sn, by)
-delete_agent = lambda id_, by: delete_entity("agents", id_, by)
-list_agents = lambda: list_entities("agents")
-
-# Escort Locations
-create_escort_location = lambda name, sn, by: create_entity("escort_locations", name, sn, by)
-get_escort_location = lambda id_: get_entity("escort_locations", id_)
-update_escort_location = lambda id_, name, sn, by: update_entity("escort_locations", id_, name, sn, by)
-delete_escort_location = lambda id_, by: delete_entity("escort_locations", id_, by)
-list_escort_locations = lambda: list_entities("escort_locations")
-
-# Loaded Cargo
-create_loaded_cargo = lambda name, sn, by: create_entity("loaded_cargo", name, sn, by)
-get_loaded_cargo = lambda id_: get_entity("loaded_cargo", id_)
-update_loaded_cargo = lambda id_, name, sn, by: update_entity("loaded_cargo", id_, name, sn, by)
-delete_loaded_cargo = lambda id_, by: delete_entity("loaded_cargo", id_, by)
-list_loaded_cargo = lambda: list_entities("loaded_cargo")
-
-# Berths (with port_id)
-def create_berth(name: str, short_name: Optional[str], port_id: Optional[int], created_by: str) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO berths (name, short_name, port_id, created_at, created_by, updated_at, updated_by)
-        VALUES (%s, %s, %s, NOW(), %s, NOW(), %s)
-    """, (name, short_name, port_id, created_by, created_by))
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
+# One set of helpers for every table in services/entities.py, running the
+# statements the registry built at import. `values` maps field names to
+# values; fields it leaves out are written as NULL.
+
+def create_entity(table: str, values: Dict[str, Any], created_by: str, conn=None) -> int:
+    spec = entities.get(table)
+    with transaction(conn) as c:
+        cur = c.cursor()
+        cur.execute(spec.insert_sql, spec.values(values) + (created_by, created_by))
+        new_id = cur.lastrowid
+    if conn is None:
+        notify_change(table)
     return new_id
 
-def get_berth(id_: int): return get_entity("berths", id_)
-def update_berth(id_: int, name: str, short_name: Optional[str], port_id: Optional[int], updated_by: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE berths SET name=%s, short_name=%s, port_id=%s, updated_at=NOW(), updated_by=%s
-        WHERE id=%s AND deleted_at IS NULL
-    """, (name, short_name, port_id, updated_by, id_))
-    conn.commit()
-    updated = cur.rowcount > 0
-    conn.close()
+def get_entity(table: str, id_: int) -> Optional[Dict[str, Any]]:
+    spec = entities.get(table)
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(spec.get_sql, (id_,))
+        result = fetch_one(cur)
+    return result
+
+def update_entity(table: str, id_: int, values: Dict[str, Any], updated_by: str, conn=None) -> bool:
+    spec = entities.get(table)
+    with transaction(conn) as c:
+        cur = c.cursor()
+        cur.execute(spec.update_sql, spec.values(values) + (updated_by, id_))
+        updated = cur.rowcount > 0
+    if updated and conn is None:
+        notify_change(table)
     return updated
 
-def delete_berth(id_: int, deleted_by: str) -> bool:
-    return delete_entity("berths", id_, deleted_by)
-
-def list_berths() -> List[Dict[str, Any]]:
-    return list_entities("berths")
-
-# Master Towing (with t_name and ps fields)
-def create_master_towing(name: str, short_name: Optional[str], t_name: Optional[str], ps: Optional[str], created_by: str) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO master_towing (name, short_name, t_name, ps, created_at, created_by, updated_at, updated_by)
-        VALUES (%s, %s, %s, %s, NOW(), %s, NOW(), %s)
-    """, (name, short_name, t_name, ps, created_by, created_by))
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
-    return new_id
+def delete_entity(table: str, id_: int, deleted_by: str, conn=None) -> bool:
+    spec = entities.get(table)
+    with transaction(conn) as c:
+        cur = c.cursor()
+        cur.execute(spec.delete_sql, (deleted_by, id_))
+        deleted = cur.rowcount > 0
+    if deleted and conn is None:
+        notify_change(table)
+    return deleted
 
-def get_master_towing(id_: int): return get_entity("master_towing", id_)
-def update_master_towing(id_: int, name: str, short_name: str, t_name: str, ps: Optional[str], updated_by: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE master_towing SET name=%s, short_name=%s, t_name=%s, ps=%s, updated_at=NOW(), updated_by=%s
-        WHERE id=%s AND deleted_at IS NULL
-    """, (name, short_name, t_name, ps, updated_by, id_))
-    conn.commit()
-    updated = cur.rowcount > 0
-    conn.close()
-    return updated
+def list_entities(table: str, name_prefix: Optional[str] = None, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    rows, _ = _list_live(entities.get(table).table, prefix_filter("name", name_prefix), fields)
+    return rows
 
-def delete_master_towing(id_: int, deleted_by: str) -> bool:
-    return delete_entity("master_towing", id_, deleted_by)
+def list_entities_page(
+    table: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One keyset page ordered by (updated_at, id) descending, plus the cursor for the next page."""
+    return _list_live(entities.get(table).table, prefix_filter("name", name_prefix), fields, limit, cursor)
 
-def list_master_towing() -> List[Dict[str, Any]]:
-    return list_entities("master_towing")
+# -----------------------
+# Master batch writes
+# -----------------------
+# Mixed create/update/delete operations on one master table, applied on one
+# connection in one transaction: either every operation lands or none does.
+# The write helpers above take that connection and skip their own commit and
+# change notification; listeners hear about the table once, after the commit.
+
+# Maximum operations accepted in one batch
+MASTER_BATCH_MAX_OPERATIONS = 5000
+
+class BatchItemError(Exception):
+    """An operation failed; the whole batch was rolled back."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(message)
+        self.index = index
+        self.message = message
+
+def validate_master_batch(table: str, operations: List[Dict[str, Any]]):
+    """Raise BatchItemError for the first operation missing a required field."""
+    spec = entities.get(table)
+    if len(operations) > MASTER_BATCH_MAX_OPERATIONS:
+        raise ValueError(f"At most {MASTER_BATCH_MAX_OPERATIONS} operations per batch")
+    for index, op in enumerate(operations):
+        action = op.get("op")
+        if action not in ("create", "update", "delete"):
+            raise BatchItemError(index, f"Unknown op: {action}")
+        if action != "create" and op.get("id") is None:
+            raise BatchItemError(index, f"{action} requires id")
+        missing = spec.missing(op) if action != "delete" else []
+        if missing:
+            raise BatchItemError(index, f"{action} requires {', '.join(missing)}")
+
+def apply_master_batch(table: str, operations: List[Dict[str, Any]], user: str) -> List[Dict[str, Any]]:
+    """Apply the operations in order and return one result per operation.
+
+    An update or delete of a missing row is reported as "not_found" and does
+    not abort the batch; any database error rolls everything back and raises
+    BatchItemError with the index of the failing operation.
+    """
+    validate_master_batch(table, operations)
+    results = []
+    with transaction() as conn:
+        for index, op in enumerate(operations):
+            action = op["op"]
+            try:
+                if action == "create":
+                    new_id = create_entity(table, op, user, conn)
+                    results.append({"index": index, "op": action, "id": new_id, "status": "created"})
+                    continue
+                if action == "update":
+                    ok = update_entity(table, op["id"], op, user, conn)
+                else:
+                    ok = delete_entity(table, op["id"], user, conn)
+            except Exception as e:
+                raise BatchItemError(index, str(e)) from e
+            status = ("updated" if action == "update" else "deleted") if ok else "not_found"
+            results.append({"index": index, "op": action, "id": op["id"], "status": status})
+    if any(r["status"] != "not_found" for r in results):
+        notify_change(table)
+    return results
 
 # -----------------------
 # emps CRUD
 # -----------------------
 
-def create_emp(ship_name: str, dw: int, loaded_cargo_name: str, created_by: str) -> int:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO emps (ship_name, dw, loaded_cargo_name, created_at, created_by, updated_at, updated_by)
-        VALUES (%s, %s, %s, NOW(), %s, NOW(), %s)
-    """, (ship_name, dw, loaded_cargo_name, created_by, created_by))
-    conn.commit()
-    new_id = cur.lastrowid
-    conn.close()
+def create_emp(ship_name: str, dw: int, loaded_cargo_name: str, created_by: str, data_date: Optional[int] = None) -> int:
+    # data_date is the partitioning column, so it cannot be NULL
+    data_date = UNDATED if data_date is None else data_date
+    natural_key = emp_natural_key(ship_name, dw, loaded_cargo_name, data_date)
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO emps (ship_name, dw, loaded_cargo_name, data_date, created_at, created_by, updated_at, updated_by, natural_key)
+            VALUES (%s, %s, %s, %s, NOW(), %s, NOW(), %s, %s)
+        """, (ship_name, dw, loaded_cargo_name, data_date, created_by, created_by, natural_key))
+        new_id = cur.lastrowid
+    notify_change("emps")
     return new_id
 
-def create_multiple_emps(emps: List[Dict[str, Any]]) -> List[int]:
+EMP_INSERT_MODES = ("upsert", "insert")
+
+def create_multiple_emps(
+    emps: List[Dict[str, Any]],
+    mode: str = "upsert",
+    idempotency_key: Optional[str] = None,
+    chunk_size: int = EMP_BULK_CHUNK_SIZE,
+) -> List[Dict[str, Any]]:
+    """Insert a batch of emps in one transaction and return the stored rows.
+
+    Rows are sent in multi-row INSERTs of `chunk_size` and read back by
+    natural key, so the number of queries does not grow with the batch size.
+    Only live rows count as duplicates (a soft-deleted copy is inserted
+    again): in "upsert" mode live rows that already exist are left untouched,
+    in "insert" mode they raise mysql.connector.IntegrityError. Either way
+    the result has the live row of every submitted emp. A batch submitted
+    again with the same `idempotency_key` skips the write entirely.
+    """
+    if mode not in EMP_INSERT_MODES:
+        raise ValueError(f"Unknown emp insert mode: {mode}")
     if not emps:
         return []
 
-    conn = get_connection()
-    cur = conn.cursor()
-
     # Generate unique session ID to find inserted records later
     session_id = str(uuid.uuid4())
 
-    # Add session_id to each row
-    for emp in emps:
-        emp["session_id"] = session_id
-
     query = """
-        INSERT INTO emps (ship_name, dw, loaded_cargo_name, data_date, created_at, created_by, updated_at, updated_by, session_id)
-        VALUES (%s, %s, %s, %s, NOW(), %s, NOW(), %s, %s)
+        INSERT INTO emps (ship_name, dw, loaded_cargo_name, data_date, created_at, created_by, updated_at, updated_by, session_id, natural_key)
+        VALUES (%s, %s, %s, %s, NOW(), %s, NOW(), %s, %s, %s)
     """
-    values = [
-        (e["ship_name"], e["dw"], e["loaded_cargo_name"],  e['data_date'], e["created_by"],  e["created_by"], e["session_id"])
-        for e in emps
-    ]
-
-    cur.executemany(query, values)
-    conn.commit()
-
-    # Retrieve inserted rows using session_id
-    cur.execute("SELECT id FROM emps WHERE session_id = %s", (session_id,))
-    ids = [row[0] for row in cur.fetchall()]
-
-    conn.close()
-    return ids
+    if mode == "upsert":
+        query += " ON DUPLICATE KEY UPDATE id = id"
+
+    values = []
+    for e in emps:
+        data_date = UNDATED if e["data_date"] is None else e["data_date"]
+        values.append((
+            e["ship_name"], e["dw"], e["loaded_cargo_name"], data_date, e["created_by"], e["created_by"], session_id,
+            emp_natural_key(e["ship_name"], e["dw"], e["loaded_cargo_name"], data_date),
+        ))
+    keys = list(dict.fromkeys(v[-1] for v in values))
+
+    with transaction() as conn:
+        cur = conn.cursor()
+
+        first_submission = True
+        if idempotency_key:
+            # Concurrent submissions with the same key wait on this row lock
+            cur.execute("""
+                INSERT IGNORE INTO emp_ingestions (idempotency_key, session_id, row_count, created_at)
+                VALUES (%s, %s, %s, NOW())
+            """, (idempotency_key, session_id, len(values)))
+            first_submission = cur.rowcount > 0
+
+        if first_submission:
+            # executemany rewrites each chunk into one multi-row INSERT
+            for start in range(0, len(values), chunk_size):
+                cur.executemany(query, values[start:start + chunk_size])
+
+        rows: List[Dict[str, Any]] = []
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            cur.execute(
+                f"SELECT * FROM emps WHERE live_key IN ({placeholders}) ORDER BY id",
+                chunk,
+            )
+            rows.extend(fetch_all(cur))
+
+    if first_submission:
+        notify_change("emps")
+    return rows
 
 
 def get_emp(id_: int) -> Optional[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM emps WHERE id=%s AND deleted_at IS NULL", (id_,))
-    result = fetch_one(cur)
-    conn.close()
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM emps WHERE id=%s AND deleted_at IS NULL", (id_,))
+        result = fetch_one(cur)
     return result
 
 def update_emp(id_: int, ship_name: str, dw: str, loaded_cargo_name: str, updated_by: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE emps
-        SET ship_name=%s, dw=%s, loaded_cargo_name=%s, updated_at=NOW(), updated_by=%s
-        WHERE id=%s AND deleted_at IS NULL
-    """, (ship_name, dw, loaded_cargo_name, updated_by, id_))
-    conn.commit()
-    updated = cur.rowcount > 0
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            UPDATE emps
+            SET ship_name=%s, dw=%s, loaded_cargo_name=%s, updated_at=NOW(), updated_by=%s,
+                natural_key={EMP_NATURAL_KEY_SQL}
+            WHERE id=%s AND deleted_at IS NULL
+        """, (ship_name, dw, loaded_cargo_name, updated_by, id_))
+        updated = cur.rowcount > 0
+    if updated:
+        notify_change("emps")
     return updated
 
 def delete_emp(id_: int, deleted_by: str) -> bool:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        UPDATE emps
-        SET deleted_at=NOW(), deleted_by=%s
-        WHERE id=%s AND deleted_at IS NULL
-    """, (deleted_by, id_))
-    conn.commit()
-    deleted = cur.rowcount > 0
-    conn.close()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE emps
+            SET deleted_at=NOW(), deleted_by=%s
+            WHERE id=%s AND deleted_at IS NULL
+        """, (deleted_by, id_))
+        deleted = cur.rowcount > 0
+    if deleted:
+        notify_change("emps")
     return deleted
 
-def list_emps() -> List[Dict[str, Any]]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM emps WHERE deleted_at IS NULL ORDER BY updated_at DESC")
-    results = fetch_all(cur)
-    conn.close()
-    return results
+def emp_filters(ship_name: Optional[str] = None, data_date_from: Optional[int] = None, data_date_to: Optional[int] = None) -> Filters:
+    filters: Filters = []
+    if ship_name:
+        filters.append(("ship_name = %s", (ship_name,)))
+    if data_date_from is not None:
+        filters.append(("data_date >= %s", (data_date_from,)))
+    if data_date_to is not None:
+        filters.append(("data_date <= %s", (data_date_to,)))
+    return filters
+
+def list_emps(
+    ship_name: Optional[str] = None,
+    data_date_from: Optional[int] = None,
+    data_date_to: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    rows, _ = _list_live("emps", emp_filters(ship_name, data_date_from, data_date_to), fields)
+    return rows
+
+def list_emps_page(
+    limit: int,
+    cursor: Optional[str] = None,
+    ship_name: Optional[str] = None,
+    data_date_from: Optional[int] = None,
+    data_date_to: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return _list_live("emps", emp_filters(ship_name, data_date_from, data_date_to), fields, limit, cursor)
+
+# Keys looked up per UNION ALL statement in last_cargo
+EMP_LAST_CARGO_CHUNK_SIZE = 500
+
+# Newest live EMP row of a ship before a date; undated rows (data_date 0)
+# count as oldest, as in the template engine. Served from ix_emps_last_cargo alone: the
+# equality prefix plus a backward range scan stopped after one entry, so the
+# cost does not grow with the ship's history.
+EMP_LAST_CARGO_SQL = """
+    SELECT %s, (
+        SELECT loaded_cargo_name FROM emps
+        WHERE ship_name = %s AND dw = %s AND deleted_at IS NULL AND data_date < %s
+        ORDER BY data_date DESC, id DESC
+        LIMIT 1
+    )
+"""
+
+def last_cargo(keys: List[Tuple[str, int, int]]) -> List[Optional[str]]:
+    """Last known loaded_cargo_name for each (ship_name, dw, before_date) key, in key order."""
+    if not keys:
+        return []
+    unique = list(dict.fromkeys(keys))
+    found: Dict[Tuple[str, int, int], Optional[str]] = {}
+    with connection() as conn:
+        cur = conn.cursor()
+        for start in range(0, len(unique), EMP_LAST_CARGO_CHUNK_SIZE):
+            chunk = unique[start:start + EMP_LAST_CARGO_CHUNK_SIZE]
+            params: List[Any] = []
+            for i, key in enumerate(chunk):
+                params.extend((i, *key))
+            cur.execute(" UNION ALL ".join([EMP_LAST_CARGO_SQL] * len(chunk)), params)
+            for i, cargo in cur.fetchall():
+                found[chunk[i]] = cargo
+    return [found.get(key) for key in keys]
+
@@ -0,0 +1,193 @@
+"""Archive cold EMP partitions and purge old soft-deleted rows.
+
+Runs in the background from the app (every EMP_ARCHIVE_INTERVAL seconds) or
+once from the command line, from the backend directory:
+
+    python -m services.emp_archive
+"""
+import asyncio
+import csv
+import datetime
+import gzip
+import json
+import os
+from typing import Any, Dict, List
+from db.db import MYSQL_DATABASE, connection, run_db
+from db.emp_partitions import add_future_partitions, add_months, current_month, list_partitions, partition_month
+from services.crud import notify_change
+
+# -----------------------
+# EMP archival
+# -----------------------
+# Each run:
+#   1. splits p_future so upcoming months have partitions
+#   2. hard-deletes rows soft-deleted more than EMP_PURGE_DELETED_DAYS ago
+#      (only when that is set; by default soft-deleted rows are kept)
+#   3. moves the rows of every month partition older than the hot window out
+#      of emps with EXCHANGE PARTITION (atomic, so no concurrent insert is
+#      lost) into a staging table, writes that to
+#      EMP_ARCHIVE_DIR/emps_YYYYMM.csv.gz and drops it
+# The emptied partitions stay and catch late rows for their month, which the
+# next run archives into a second file. p_before is never archived: it holds
+# the undated rows (data_date 0), which have no month to age out of, and
+# EXCHANGE PARTITION can only move it whole. Archived rows are no longer
+# listed or used by the last-cargo lookup. A staging table left by an
+# interrupted run is written out first. A MySQL named lock keeps runs from several app
+# processes from overlapping.
+
+# Months of data_date kept in the table (current month included); 0 keeps everything
+EMP_HOT_MONTHS = int(os.getenv("EMP_HOT_MONTHS", "0"))
+EMP_ARCHIVE_DIR = os.getenv("EMP_ARCHIVE_DIR", "emp_archive")
+# Soft-deleted rows are removed for good after this many days; 0 (the default) keeps them
+EMP_PURGE_DELETED_DAYS = int(os.getenv("EMP_PURGE_DELETED_DAYS", "0"))
+# Seconds between background runs
+EMP_ARCHIVE_INTERVAL = int(os.getenv("EMP_ARCHIVE_INTERVAL", str(24 * 3600)))
+
+PURGE_CHUNK = 5000
+FETCH_CHUNK = 5000
+LOCK_NAME = "emp_archive"
+STAGE_PREFIX = "emps_archive_"
+
+
+def purge_deleted(cur, days: int) -> int:
+    """Hard-delete rows soft-deleted more than `days` days ago, in chunks."""
+    removed = 0
+    while True:
+        cur.execute(
+            "DELETE FROM emps WHERE deleted_at < NOW() - INTERVAL %s DAY LIMIT %s",
+            (days, PURGE_CHUNK),
+        )
+        removed += cur.rowcount
+        if cur.rowcount < PURGE_CHUNK:
+            return removed
+
+
+def _archive_value(value: Any) -> Any:
+    return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value
+
+
+def archive_path(archive_dir: str, partition: str) -> str:
+    path = os.path.join(archive_dir, f"emps_{partition[1:]}.csv.gz")
+    if os.path.exists(path):
+        # Late rows of an already archived month
+        path = path.replace(".csv.gz", f".{datetime.datetime.now():%Y%m%d%H%M%S}.csv.gz")
+    return path
+
+
+def export_table(conn, table: str, path: str) -> int:
+    """Write every row of a table to a gzipped CSV (header row first); returns the row count."""
+    tmp_path = f"{path}.tmp"
+    cur = conn.cursor()
+    cur.execute(f"SELECT * FROM {table} ORDER BY id")
+    count = 0
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([col[0] for col in cur.description])
+            while True:
+                rows = cur.fetchmany(FETCH_CHUNK)
+                if not rows:
+                    break
+                writer.writerows([_archive_value(v) for v in row] for row in rows)
+                count += len(rows)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cur.close()
+    return count
+
+
+def _stage_tables(cur) -> List[str]:
+    cur.execute("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = %s AND table_name LIKE %s
+    """, (MYSQL_DATABASE, STAGE_PREFIX.replace("_", "\\_") + "%"))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _archive_stage(conn, cur, stage: str, archive_dir: str) -> Dict[str, Any]:
+    partition = stage[len(STAGE_PREFIX):]
+    path = archive_path(archive_dir, partition)
+    rows = export_table(conn, stage, path)
+    cur.execute(f"DROP TABLE {stage}")
+    return {"partition": partition, "rows": rows, "file": path}
+
+
+def archive_partition(conn, cur, partition: str, archive_dir: str) -> Dict[str, Any]:
+    """Move one partition's rows out of emps and into an archive file."""
+    stage = f"{STAGE_PREFIX}{partition}"
+    cur.execute(f"CREATE TABLE {stage} LIKE emps")
+    cur.execute(f"ALTER TABLE {stage} REMOVE PARTITIONING")
+    cur.execute(f"ALTER TABLE emps EXCHANGE PARTITION {partition} WITH TABLE {stage} WITHOUT VALIDATION")
+    return _archive_stage(conn, cur, stage, archive_dir)
+
+
+def cold_partitions(partitions: List[str], hot_months: int) -> List[str]:
+    """Month partitions entirely before the hot window.
+
+    p_before and p_future are not month partitions and are never cold:
+    p_before keeps the undated rows, which stay in emps for good.
+    """
+    first_hot = add_months(current_month(), 1 - hot_months)
+    return [name for name in partitions if (partition_month(name) or first_hot) < first_hot]
+
+
+def run_once(
+    hot_months: int = EMP_HOT_MONTHS,
+    archive_dir: str = EMP_ARCHIVE_DIR,
+    purge_days: int = EMP_PURGE_DELETED_DAYS,
+) -> Dict[str, Any]:
+    """One archival run; returns what it did. Blocking, so call it through run_db."""
+    report: Dict[str, Any] = {"created": [], "purged": 0, "archived": []}
+    with connection() as conn:
+        cur = conn.cursor(buffered=True)
+        cur.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+        if cur.fetchone()[0] != 1:
+            cur.close()
+            return {**report, "skipped": "another run holds the lock"}
+        try:
+            if not list_partitions(cur):
+                return {**report, "skipped": "emps is not partitioned"}
+
+            # Partition DDL commits implicitly; the purge is committed explicitly
+            report["created"] = add_future_partitions(cur)
+            if purge_days > 0:
+                report["purged"] = purge_deleted(cur, purge_days)
+                conn.commit()
+
+            os.makedirs(archive_dir, exist_ok=True)
+            for stage in _stage_tables(cur):
+                report["archived"].append(_archive_stage(conn, cur, stage, archive_dir))
+            if hot_months > 0:
+                for partition in cold_partitions(list_partitions(cur), hot_months):
+                    cur.execute(f"SELECT 1 FROM emps PARTITION ({partition}) LIMIT 1")
+                    if cur.fetchone() is not None:
+                        report["archived"].append(archive_partition(conn, cur, partition, archive_dir))
+        finally:
+            cur.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cur.close()
+
+    if report["purged"] or report["archived"]:
+        notify_change("emps")
+    return report
+
+
+async def run_forever(interval: int = EMP_ARCHIVE_INTERVAL):
+    """Background task: run the archival job every `interval` seconds."""
+    while True:
+        try:
+            report = await run_db(run_once)
+            if report["created"] or report["purged"] or report["archived"]:
+                print(f"EMP archive: {report}")
+        except Exception as e:
+            print(f"EMP archive failed: {e}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_once(), ensure_ascii=False, indent=2))
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# -----------------------
+# Master entity registry
+# -----------------------
+# One entry per master table. crud builds its statements from it, the routes
+# mount the CRUD, list and batch endpoints from it and the master cache loads
+# every table in it. Adding a master table is one ENTITIES entry (plus its
+# CREATE TABLE in db/schema.sql).
+
+AUDIT_COLUMNS = ["created_at", "updated_at", "deleted_at", "created_by", "updated_by", "deleted_by"]
+
+
+class EntitySpec:
+    """A soft-deleted master table and the SQL for single-row access to it.
+
+    fields: writable columns and their Python types, in column order
+    required: fields every create and update must set
+    foreign_keys: field -> referenced table
+    """
+
+    def __init__(
+        self,
+        table: str,
+        slug: str,
+        label: str,
+        fields: Dict[str, type],
+        required: Tuple[str, ...] = ("name",),
+        foreign_keys: Optional[Dict[str, str]] = None,
+    ):
+        self.table = table
+        self.slug = slug
+        self.label = label
+        self.fields = dict(fields)
+        self.required = tuple(required)
+        self.foreign_keys = dict(foreign_keys or {})
+        self.columns = ["id"] + list(self.fields) + AUDIT_COLUMNS
+
+        names = list(self.fields)
+        select = ", ".join(self.columns)
+        self.insert_sql = (
+            f"INSERT INTO {table} ({', '.join(names)}, created_at, created_by, updated_at, updated_by) "
+            f"VALUES ({', '.join(['%s'] * len(names))}, NOW(), %s, NOW(), %s)"
+        )
+        self.update_sql = (
+            f"UPDATE {table} SET {', '.join(f'{n}=%s' for n in names)}, updated_at=NOW(), updated_by=%s "
+            f"WHERE id=%s AND deleted_at IS NULL"
+        )
+        self.delete_sql = f"UPDATE {table} SET deleted_at=NOW(), deleted_by=%s WHERE id=%s AND deleted_at IS NULL"
+        self.get_sql = f"SELECT {select} FROM {table} WHERE id=%s AND deleted_at IS NULL"
+
+    def values(self, data: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Field values in column order; fields missing from `data` are NULL."""
+        return tuple(data.get(name) for name in self.fields)
+
+    def missing(self, data: Dict[str, Any]) -> List[str]:
+        return [name for name in self.required if data.get(name) in (None, "")]
+
+
+def _master(table: str, slug: str, label: str, extra: Optional[Dict[str, type]] = None, **kwargs) -> EntitySpec:
+    return EntitySpec(table, slug, label, {"name": str, "short_name": str, **(extra or {})}, **kwargs)
+
+
+ENTITIES: List[EntitySpec] = [
+    _master("operating_vessels", "operating-vessels", "Operating vessel"),
+    _master("ports", "ports", "Port"),
+    _master("agents", "agents", "Agent"),
+    _master("escort_locations", "escort-locations", "Escort location"),
+    _master("loaded_cargo", "loaded-cargo", "Loaded cargo"),
+    _master("berths", "berths", "Berth", {"port_id": int}, foreign_keys={"port_id": "ports"}),
+    _master("master_towing", "master-towing", "Master towing", {"t_name": str, "ps": str}),
+]
+
+BY_TABLE: Dict[str, EntitySpec] = {spec.table: spec for spec in ENTITIES}
+BY_SLUG: Dict[str, EntitySpec] = {spec.slug: spec for spec in ENTITIES}
+
+
+def get(table: str) -> EntitySpec:
+    spec = BY_TABLE.get(table)
+    if spec is None:
+        raise ValueError(f"Unknown master table: {table}")
+    return spec
@@ -0,0 +1,201 @@
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from services import conversion
+
+# Number of conversion worker processes (defaults to every core)
+CONVERT_WORKERS = int(os.getenv("CONVERT_WORKERS", "0")) or (os.cpu_count() or 1)
+# Jobs each worker may hold at once; extra jobs wait in the queue
+CONVERT_JOBS_PER_WORKER = int(os.getenv("CONVERT_JOBS_PER_WORKER", "1"))
+# Maximum number of queued (not yet running) jobs before submissions are rejected
+CONVERT_QUEUE_SIZE = int(os.getenv("CONVERT_QUEUE_SIZE", "100"))
+# Recycle a worker process after this many jobs (0 = never)
+CONVERT_MAX_TASKS_PER_CHILD = int(os.getenv("CONVERT_MAX_TASKS_PER_CHILD", "0")) or None
+# Finished jobs are forgotten after this many seconds
+CONVERT_JOB_TTL = int(os.getenv("CONVERT_JOB_TTL", "3600"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Optional counters a long job updates as it goes (e.g. files done)
+        self.progress: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.progress is not None:
+            data["progress"] = dict(self.progress)
+        if self.status == "done":
+            data["result"] = self.result
+        if self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobManager:
+    """Queues conversion jobs and runs them on a shared process pool.
+
+    Every pool call, whether from a job, a batch file or a streamed page,
+    takes one of the `slots`; calls beyond that wait (pool_waiting).
+    """
+
+    def __init__(self, workers: int, jobs_per_worker: int, queue_size: int, initializer: Optional[Callable] = None):
+        self.workers = workers
+        # Run once in each worker process as it starts
+        self.initializer = initializer
+        self.slots = workers * jobs_per_worker
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatchers: List[asyncio.Task] = []
+        self._pool_slots: Optional[asyncio.Semaphore] = None
+        self._jobs: Dict[str, Job] = {}
+        self.pool_waiting = 0
+        self.pool_running = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._pool_slots = asyncio.Semaphore(self.slots)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            max_tasks_per_child=CONVERT_MAX_TASKS_PER_CHILD,
+            initializer=self.initializer,
+        )
+        loop = asyncio.get_running_loop()
+        self._dispatchers = [loop.create_task(self._dispatch()) for _ in range(self.slots)]
+
+    async def run_in_pool(self, fn: Callable, *args) -> Any:
+        """Run a module-level function on the worker pool once a slot is free."""
+        self._ensure_started()
+        pool_slots = self._pool_slots
+        self.pool_waiting += 1
+        try:
+            await pool_slots.acquire()
+        finally:
+            self.pool_waiting -= 1
+        self.pool_running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pool_running -= 1
+            pool_slots.release()
+
+    def queue_depth(self) -> int:
+        """Queued jobs plus pool calls waiting for a slot."""
+        return (self._queue.qsize() if self._queue is not None else 0) + self.pool_waiting
+
+    def check_capacity(self):
+        """Raise QueueFullError when work that bypasses submit() should be turned away."""
+        if self.queue_depth() >= self.queue_size:
+            raise QueueFullError(f"Conversion queue is full ({self.queue_size} jobs waiting)")
+
+    def submit(self, work: Callable[[], Awaitable[Any]], name: str) -> Job:
+        """Enqueue a coroutine factory; it is awaited once a worker slot frees up."""
+        self._purge_expired()
+        self._ensure_started()
+        job = Job(name)
+        try:
+            self._queue.put_nowait((job, work))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"Conversion queue is full ({self.queue_size} jobs waiting)")
+        self._jobs[job.id] = job
+        return job
+
+    def add_finished(self, result: Any, name: str) -> Job:
+        """Register a job whose result is already known (e.g. a cache hit)."""
+        self._purge_expired()
+        job = Job(name)
+        job.status = "done"
+        job.result = result
+        job.started_at = job.finished_at = job.created_at
+        self._jobs[job.id] = job
+        self.completed += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def _dispatch(self):
+        while True:
+            job, work = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            self.running += 1
+            try:
+                job.result = await work()
+                job.status = "done"
+                self.completed += 1
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                self.running -= 1
+                self._queue.task_done()
+
+    def _purge_expired(self):
+        cutoff = time.time() - CONVERT_JOB_TTL
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "slots": self.slots,
+            "queue_depth": self.queue_depth(),
+            "queue_size": self.queue_size,
+            "running": self.running,
+            "pool_waiting": self.pool_waiting,
+            "pool_running": self.pool_running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "tracked_jobs": len(self._jobs),
+        }
+
+    async def shutdown(self):
+        dispatchers, self._dispatchers = self._dispatchers, []
+        for task in dispatchers:
+            task.cancel()
+        # Let running jobs unwind (and mark their queue entries done) first
+        await asyncio.gather(*dispatchers, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._queue = None
+        self._pool_slots = None
+
+
+# Workers import the converter as they start rather than on their first job
+manager = JobManager(CONVERT_WORKERS, CONVERT_JOBS_PER_WORKER, CONVERT_QUEUE_SIZE, initializer=conversion.load_converter)
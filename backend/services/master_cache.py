@@ -0,0 +1,140 @@
+import datetime
+import decimal
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import services.crud as crud
+from services import entities
+
+# -----------------------
+# Master table cache
+# -----------------------
+# Master tables change a few times a month but are read on every page load
+# and conversion. Each table is kept in memory as its rows plus the encoded
+# JSON body and a content hash used as the HTTP ETag. crud reports every
+# committed write, which drops the table so the next read reloads it.
+
+MASTER_TABLES = [spec.table for spec in entities.ENTITIES]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode(data: Any) -> bytes:
+    """Compact JSON, encoded the same way as FastAPI's JSONResponse."""
+    return json.dumps(data, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CachedEntry:
+    def __init__(self, data: Any):
+        self.data = data
+        self.body = encode(data)
+        self.etag = _etag(self.body)
+
+
+def join_foreign_keys(data: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Rows with the name and short name of each referenced row attached.
+
+    berths.port_id adds port_name and port_short_name ("" when the port is
+    missing or deleted).
+    """
+    joined = dict(data)
+    for spec in entities.ENTITIES:
+        if not spec.foreign_keys or spec.table not in data:
+            continue
+        rows = data[spec.table]
+        for field, target in spec.foreign_keys.items():
+            prefix = field[:-3] if field.endswith("_id") else field
+            refs = {ref["id"]: ref for ref in data.get(target, [])}
+            rows = [
+                {
+                    **row,
+                    f"{prefix}_name": refs.get(row.get(field), {}).get("name") or "",
+                    f"{prefix}_short_name": refs.get(row.get(field), {}).get("short_name") or "",
+                }
+                for row in rows
+            ]
+        joined[spec.table] = rows
+    return joined
+
+
+class MasterCache:
+    def __init__(self, tables: List[str]):
+        self.tables = list(tables)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CachedEntry] = {}
+        self._generations = {table: 0 for table in self.tables}
+        self._snapshot: Optional[Tuple[Tuple[str, ...], CachedEntry]] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def invalidate(self, table: str):
+        if table not in self._generations:
+            return
+        with self._lock:
+            self._entries.pop(table, None)
+            self._generations[table] += 1
+            self.invalidations += 1
+
+    def get(self, table: str) -> CachedEntry:
+        """Live rows of `table`; blocking on a miss, so call it through run_db."""
+        with self._lock:
+            entry = self._entries.get(table)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generations[table]
+
+        entry = CachedEntry(crud.list_entities(table))
+        with self._lock:
+            # A write that landed during the load means these rows may be stale
+            if self._generations[table] == generation:
+                self._entries[table] = entry
+        return entry
+
+    def snapshot(self) -> CachedEntry:
+        """Every master table in one entry, with foreign keys joined (berths get their port's names)."""
+        entries = {table: self.get(table) for table in self.tables}
+        key = tuple(entries[table].etag for table in self.tables)
+        with self._lock:
+            if self._snapshot is not None and self._snapshot[0] == key:
+                return self._snapshot[1]
+
+        data = join_foreign_keys({table: entry.data for table, entry in entries.items()})
+        snapshot = CachedEntry(data)
+        with self._lock:
+            self._snapshot = (key, snapshot)
+        return snapshot
+
+    def warm(self):
+        self.snapshot()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "tables": {
+                    table: {"cached": table in self._entries, "generation": self._generations[table]}
+                    for table in self.tables
+                },
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+cache = MasterCache(MASTER_TABLES)
+crud.add_change_listener(cache.invalidate)
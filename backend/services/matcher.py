@@ -0,0 +1,153 @@
+import threading
+import unicodedata
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from services import master_cache
+
+# -----------------------
+# Master-data matcher
+# -----------------------
+# Multi-pattern substring search over master names. One Aho-Corasick
+# automaton finds every name occurring in a text in a single pass, however
+# many names there are, instead of one `includes`/RegExp test per name.
+
+
+def normalize(text: str) -> str:
+    """NFKC: half-width kana become full-width, full-width ASCII becomes ASCII."""
+    return unicodedata.normalize("NFKC", text)
+
+
+class Automaton:
+    """Aho-Corasick automaton over a fixed list of patterns.
+
+    Pattern indices follow the input order, so `first` picks the pattern that
+    comes first in the list, the same result as a find() over the list.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        # An empty pattern is contained in every text
+        self._always = [i for i, p in enumerate(self.patterns) if p == ""]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            if pattern:
+                self._out[state].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (end, pattern index) for every occurrence, overlapping ones included."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                yield pos + 1, index
+
+    def found(self, text: str) -> Set[int]:
+        return {index for _, index in self.iter(text)} | set(self._always)
+
+    def first(self, text: str) -> Optional[int]:
+        """Lowest pattern index contained in `text`, or None."""
+        found = self.found(text)
+        return min(found) if found else None
+
+
+# Matched tables and the column holding the name to look for
+MATCH_TABLES = {
+    "master_towing": "t_name",
+    "ports": "name",
+    "berths": "name",
+    "agents": "name",
+    "operating_vessels": "name",
+}
+
+
+class MasterIndex:
+    """One automaton over the names of every matched master table."""
+
+    def __init__(self, master: Dict[str, List[Dict[str, Any]]]):
+        self._entries: List[List[Tuple[str, Dict[str, Any]]]] = []
+        positions: Dict[str, int] = {}
+        for table, column in MATCH_TABLES.items():
+            for row in master.get(table, []):
+                name = row.get(column)
+                if not name:
+                    continue
+                key = normalize(name)
+                if key not in positions:
+                    positions[key] = len(self._entries)
+                    self._entries.append([])
+                self._entries[positions[key]].append((table, row))
+        self.automaton = Automaton(list(positions))
+        self.size = sum(len(e) for e in self._entries)
+
+    def match(self, text: str, tables: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Every master row whose name occurs in `text`, ordered by position.
+
+        Both sides are NFKC-normalized; `start`/`end` index the normalized text.
+        """
+        key = normalize(text)
+        hits = []
+        for end, index in self.automaton.iter(key):
+            start = end - len(self.automaton.patterns[index])
+            for table, row in self._entries[index]:
+                if tables and table not in tables:
+                    continue
+                hits.append({
+                    "table": table,
+                    "id": row.get("id"),
+                    "name": row.get(MATCH_TABLES[table]),
+                    "short_name": row.get("short_name"),
+                    "start": start,
+                    "end": end,
+                })
+        hits.sort(key=lambda h: (h["start"], -h["end"]))
+        return hits
+
+
+# -----------------------
+# Live index
+# -----------------------
+# Built from the master cache snapshot and rebuilt only when the snapshot's
+# ETag changes, i.e. after a write to one of the master tables.
+
+_lock = threading.Lock()
+_index: Optional[Tuple[str, MasterIndex]] = None
+
+
+def current_index() -> MasterIndex:
+    """The index over live master data; blocking on a cache miss, so call it through run_db."""
+    global _index
+    snapshot = master_cache.cache.snapshot()
+    with _lock:
+        if _index is not None and _index[0] == snapshot.etag:
+            return _index[1]
+    index = MasterIndex(snapshot.data)
+    with _lock:
+        _index = (snapshot.etag, index)
+    return index
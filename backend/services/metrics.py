@@ -0,0 +1,177 @@
+import contextvars
+import time
+from typing import Dict, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest # type: ignore
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily # type: ignore
+from db import db
+from services import cache, jobs, upload_store
+
+# -----------------------
+# Prometheus metrics
+# -----------------------
+# Per-route request latency, DB statements per request, conversion time per
+# stage, plus the connection pool, job queue and result cache counters that
+# their modules already keep. Served at /metrics in the Prometheus text format.
+
+# Conversions take seconds to minutes, HTTP requests milliseconds
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CONVERT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests being handled")
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "DB statements run while handling a request",
+    ["route"], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in DB statements while handling a request",
+    ["route"], buckets=REQUEST_BUCKETS,
+)
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Latency of single DB statements", buckets=REQUEST_BUCKETS)
+
+CONVERT_SECONDS = Histogram(
+    "convert_duration_seconds", "Conversion time including the wait for a worker (document or page)",
+    ["kind"], buckets=CONVERT_BUCKETS,
+)
+CONVERT_STAGE_SECONDS = Histogram(
+    "convert_stage_duration_seconds", "Time inside the converter per stage (render, detect, serialize, total)",
+    ["kind", "stage"], buckets=CONVERT_BUCKETS,
+)
+CONVERT_FAILURES = Counter("convert_failures_total", "Conversions that raised", ["kind"])
+
+
+# -----------------------
+# Per-request DB accounting
+# -----------------------
+# The middleware puts a fresh counter in the request's context; run_db and
+# asyncio.to_thread carry that context into worker threads, where the
+# pool's query listener adds to it.
+
+class RequestDbStats:
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_request_db: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar("request_db", default=None)
+
+
+def _on_query(seconds: float):
+    DB_QUERY_SECONDS.observe(seconds)
+    stats = _request_db.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += seconds
+
+
+db.add_query_listener(_on_query)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    # Unmatched paths share one label so scanners cannot blow up cardinality
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _request_db.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec()
+            _request_db.reset(token)
+            route = _route_template(scope)
+            REQUEST_SECONDS.labels(scope["method"], route, str(status["code"])).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.seconds)
+
+
+# -----------------------
+# Conversion
+# -----------------------
+
+def observe_conversion(kind: str, seconds: float, stages: Dict[str, float]):
+    CONVERT_SECONDS.labels(kind).observe(seconds)
+    for stage, value in stages.items():
+        CONVERT_STAGE_SECONDS.labels(kind, stage).observe(value)
+
+
+def conversion_failed(kind: str):
+    CONVERT_FAILURES.labels(kind).inc()
+
+
+# -----------------------
+# Existing counters
+# -----------------------
+
+class StatsCollector:
+    """Exports the counters the pool, job manager, result cache and upload store keep themselves."""
+
+    def collect(self):
+        pool = db.pool.stats()
+        yield CounterMetricFamily("db_pool_checkouts", "Connections checked out of the pool", value=pool["checkouts"])
+        yield CounterMetricFamily("db_pool_connections_created", "Connections opened by the pool", value=pool["created"])
+        yield CounterMetricFamily("db_pool_connections_closed", "Connections closed by the pool", value=pool["closed"])
+        yield CounterMetricFamily("db_pool_overflow_checkouts", "Checkouts beyond the pool size", value=pool["overflow_checkouts"])
+        yield CounterMetricFamily("db_pool_timeouts", "Checkouts that timed out", value=pool["timeouts"])
+        yield CounterMetricFamily(
+            "db_pool_health_check_failures", "Idle connections that failed their ping", value=pool["health_check_failures"],
+        )
+        yield GaugeMetricFamily("db_pool_open_connections", "Open pooled connections", value=pool["open"])
+        yield GaugeMetricFamily("db_pool_in_use_connections", "Connections checked out now", value=pool["in_use"])
+        yield GaugeMetricFamily("db_pool_wait_seconds_max", "Longest wait for a connection", value=pool["wait_time_max"])
+
+        queue = jobs.manager.stats()
+        yield GaugeMetricFamily(
+            "convert_queue_depth", "Conversion jobs and pool calls waiting for a worker slot", value=queue["queue_depth"],
+        )
+        yield GaugeMetricFamily("convert_jobs_running", "Conversion jobs running", value=queue["running"])
+        yield GaugeMetricFamily("convert_pool_calls_waiting", "Pool calls waiting for a worker slot", value=queue["pool_waiting"])
+        yield GaugeMetricFamily("convert_pool_calls_running", "Pool calls running on the workers", value=queue["pool_running"])
+        yield CounterMetricFamily("convert_jobs_completed", "Conversion jobs completed", value=queue["completed"])
+        yield CounterMetricFamily("convert_jobs_failed", "Conversion jobs failed", value=queue["failed"])
+
+        results = cache.results.stats()
+        yield CounterMetricFamily("convert_cache_hits", "Conversion result cache hits", value=results["hits"])
+        yield CounterMetricFamily("convert_cache_misses", "Conversion result cache misses", value=results["misses"])
+        yield CounterMetricFamily("convert_cache_evictions", "Conversion result cache evictions", value=results["evictions"])
+
+        store = upload_store.store.stats()
+        yield CounterMetricFamily("upload_store_added", "PDFs added to the upload store", value=store["added"])
+        yield CounterMetricFamily("upload_store_deduplicated", "Uploads whose content was already stored", value=store["deduplicated"])
+        yield CounterMetricFamily("upload_store_evictions", "PDFs evicted from the upload store", value=store["evictions"])
+        if store["disk_bytes"] is not None:
+            yield GaugeMetricFamily("upload_store_bytes", "Bytes of stored PDFs as of the last sweep", value=store["disk_bytes"])
+
+
+REGISTRY.register(StatsCollector())
+
+
+def render():
+    """Body and content type of the /metrics response."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,176 @@
+import asyncio
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import services.crud as crud
+from db.db import run_db
+from services import cache, conversion, jobs, master_cache, metrics, pp_convert, result_format
+
+# -----------------------
+# Conversion pipeline
+# -----------------------
+# Orchestrates cache lookups and worker pool calls for a stored PDF.
+
+# PDFs a batch converts at once (defaults to the worker count, never more than
+# the job manager's slots); every conversion also waits for one of those slots,
+# so batches share the workers with single jobs and streams
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "0")) or jobs.CONVERT_WORKERS
+# Largest number of PDFs accepted in one batch
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))
+# Largest ZIP archive accepted by the batch upload endpoint
+BATCH_ZIP_MAX_BYTES = int(os.getenv("BATCH_ZIP_MAX_BYTES", str(500 * 1024 * 1024)))
+
+
+async def file_digest(file_path: str) -> str:
+    return await asyncio.to_thread(cache.file_digest, file_path)
+
+
+def _document_key(digest: str) -> str:
+    return cache.cache_key(digest, conversion.CONVERT_OPTIONS)
+
+
+def _page_key(digest: str, page_number: int) -> str:
+    return cache.cache_key(digest, {**conversion.CONVERT_OPTIONS, "page": page_number})
+
+
+async def cached_document(digest: str) -> Optional[str]:
+    cached = await asyncio.to_thread(cache.results.get, _document_key(digest))
+    return cached.decode("utf-8") if cached is not None else None
+
+
+async def convert_document(file_path: str, digest: str) -> str:
+    """Convert the whole PDF on the worker pool and cache the result."""
+    started = time.perf_counter()
+    try:
+        result, stages = await jobs.manager.run_in_pool(conversion.convert_file_timed, file_path)
+    except Exception:
+        metrics.conversion_failed("document")
+        raise
+    metrics.observe_conversion("document", time.perf_counter() - started, stages)
+    await asyncio.to_thread(cache.results.put, _document_key(digest), result.encode("utf-8"))
+    return result
+
+
+async def convert_cached(file_path: str) -> Tuple[str, bool]:
+    """Converter JSON for a PDF and whether it came from the cache."""
+    digest = await file_digest(file_path)
+    cached = await cached_document(digest)
+    if cached is not None:
+        return cached, True
+    return await convert_document(file_path, digest), False
+
+
+async def convert_batch(
+    files: List[Tuple[str, str]],
+    concurrency: int = BATCH_CONCURRENCY,
+    on_file: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """Convert (file name, path) pairs concurrently into one combined result.
+
+    `result` joins the rows of every converted file in input order, the
+    same rows a single conversion returns; `files` reports each file's
+    status. A failed file does not stop the others. `on_file` is called with
+    each file's report as soon as that file is done.
+    """
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, jobs.manager.slots)))
+
+    async def run(name: str, path: str):
+        async with semaphore:
+            try:
+                result, cached = await convert_cached(path)
+                rows = result_format.parse_rows(result)
+                report = {"fileName": name, "status": "done", "rows": len(rows), "cached": cached}
+            except Exception as e:
+                rows = None
+                report = {"fileName": name, "status": "failed", "error": str(e)}
+        if on_file is not None:
+            on_file(report)
+        return report, rows
+
+    done = await asyncio.gather(*(run(name, path) for name, path in files))
+    return {
+        "files": [report for report, _ in done],
+        "failed": sum(1 for report, _ in done if report["status"] == "failed"),
+        "result": [row for _, rows in done if rows is not None for row in rows],
+    }
+
+
+async def to_templates(result: str, file_name: str) -> List[Dict[str, Any]]:
+    """Run converter output through the PP template engine on the worker pool.
+
+    Templates depend on the current master data, so they are not cached.
+    """
+    snapshot = await run_db(master_cache.cache.snapshot)
+    # Only the EMP rows this schedule refers to, not the whole history
+    keys = await asyncio.to_thread(pp_convert.emp_keys_json, result, file_name)
+    cargo = await run_db(crud.last_cargo, keys) if keys else []
+    return await jobs.manager.run_in_pool(
+        pp_convert.convert_json, result, file_name, snapshot.data, dict(zip(keys, cargo))
+    )
+
+
+async def _convert_page(file_path: str, digest: str, page_number: int) -> List[Dict[str, Any]]:
+    key = _page_key(digest, page_number)
+    cached = await asyncio.to_thread(cache.results.get, key)
+    if cached is not None:
+        return result_format.parse_rows(cached)
+    started = time.perf_counter()
+    try:
+        rows, stages = await jobs.manager.run_in_pool(conversion.convert_page_timed, file_path, page_number)
+    except Exception:
+        metrics.conversion_failed("page")
+        raise
+    metrics.observe_conversion("page", time.perf_counter() - started, stages)
+    await asyncio.to_thread(cache.results.put, key, result_format.dumps(rows))
+    return rows
+
+
+async def iter_pages(file_path: str) -> AsyncIterator[Dict[str, Any]]:
+    """Convert pages in parallel and yield an event for each page as soon as it is done.
+
+    Events: `start` (page count), `page` (1-based page number and its rows),
+    `error` (page that failed) and a final `end`. At most jobs.manager.slots
+    pages of a stream are converting or waiting for a worker slot at a time;
+    callers check jobs.manager.check_capacity() before starting one.
+    """
+    digest = await file_digest(file_path)
+    cached = await cached_document(digest)
+    if cached is not None:
+        yield {"type": "start", "pages": 1, "cached": True}
+        yield {"type": "page", "page": 1, "rows": result_format.parse_rows(cached)}
+        yield {"type": "end", "failed": 0}
+        return
+
+    pages = await asyncio.to_thread(conversion.page_count, file_path)
+    yield {"type": "start", "pages": pages, "cached": False}
+
+    in_flight = asyncio.Semaphore(jobs.manager.slots)
+
+    async def run(page_number: int):
+        try:
+            async with in_flight:
+                return page_number, await _convert_page(file_path, digest, page_number), None
+        except Exception as e:
+            return page_number, None, str(e)
+
+    tasks = [asyncio.ensure_future(run(n)) for n in range(pages)]
+    results: List[Optional[List[Dict[str, Any]]]] = [None] * pages
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            page_number, rows, error = await next_done
+            if error is not None:
+                failed += 1
+                yield {"type": "error", "page": page_number + 1, "error": error}
+                continue
+            results[page_number] = rows
+            yield {"type": "page", "page": page_number + 1, "rows": rows}
+    finally:
+        # The client may disconnect mid-stream
+        for task in tasks:
+            task.cancel()
+
+    if not failed:
+        joined = conversion.join_pages(results)
+        await asyncio.to_thread(cache.results.put, _document_key(digest), joined.encode("utf-8"))
+    yield {"type": "end", "failed": failed}
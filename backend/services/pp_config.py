@@ -0,0 +1,59 @@
+# -----------------------
+# Schedule template settings
+# -----------------------
+# Mirrors frontend/components/previewTable/PPConfig.ts; keep the two in sync.
+
+BGCOLOR = "#E6B8B7"
+
+# Converter output columns
+COLUMN1 = "№"
+COLUMN2 = "船  名／国  籍\n運航者／代理店"
+COLUMN3 = "D/W\nG/T"
+COLUMN4 = "積荷内容\n(ｽﾗｽﾀｰ)"
+COLUMN5 = "乗船地"
+COLUMN6 = "下船地"
+COLUMN7 = "航路通報"
+COLUMN8 = "備考"
+
+DEFAULT_BERTHS = ["明石", "備讃東", "備讃南", "来島", "水島"]
+
+PP_TABLE_HEADER = {
+    "no": "No",
+    "b": "B",
+    "c": "C",
+    "shipName": "船名",
+    "ovc": "運航船社",
+    "agent": "代理店",
+    "dwt": "DWT",
+    "load": "積荷",
+    "loadDetail": "積荷詳細",
+    "port": "港",
+    "berth": "バース",
+    "work": "作業",
+    "ne": "NE",
+    "na": "NA",
+    "sk": "SK",
+    "nk": "NK",
+    "nt": "NT",
+    "sg": "SG",
+    "hk": "HK",
+    "fp": "FP",
+    "ek": "EK",
+    "up": "UP",
+    "gs": "GS",
+    "a": "A",
+    "zz": "ZZ",
+    "nnk": "NNK",
+    "or": "OR",
+    "fk": "FK",
+    "yk": "YK",
+    "sb": "SB",
+    "dm": "DM",
+    "se": "SE",
+    "ppnp": "前港・次港",
+}
+
+# Excel number formats per template column
+PP_NUMBER_FORMATS = {
+    "dwt": "#,##0",
+}
@@ -0,0 +1,553 @@
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from services.pp_config import (
+    BGCOLOR,
+    COLUMN1,
+    COLUMN2,
+    COLUMN3,
+    COLUMN4,
+    COLUMN5,
+    COLUMN6,
+    COLUMN7,
+    COLUMN8,
+    DEFAULT_BERTHS,
+)
+from services.matcher import Automaton
+
+# -----------------------
+# PP template engine
+# -----------------------
+# Python port of frontend/components/previewTable (PPconvert, parseRowToTemplate,
+# extractRoute, findTowingShipNames, isValidLine). It turns converter rows into
+# PP template rows ({column: {value, error?, bgColor?}}) and must give the same
+# output as the TypeScript version; quirks of the original are kept on purpose.
+#
+# Rows are processed a column at a time. Master data is indexed once per batch
+# in PPContext: exact names go into dicts and substring searches (ports,
+# berths, tug names) into Aho-Corasick automata, instead of an Array.find or a
+# fresh RegExp per row, token and master entry.
+#
+# JS regex classes are ASCII-only where Python's are Unicode-aware, so digits
+# are written as [0-9] throughout.
+
+Cell = Dict[str, Any]
+Row = Dict[str, Any]
+# (ship_name, dw, before_date) of an EMP row lookup, as crud.last_cargo takes it
+EmpKey = Tuple[str, int, int]
+
+WORK_CODES = ("U", "M", "A", "S")
+ESCORT_ROUTES = "明石|備讃東|備讃北|備讃南|来島|水島"
+PPNP_KEYWORDS = ["部埼", "関埼", "和田"]
+# Private-use glyph the converter emits for the anchor symbol in the schedule PDFs
+ANCHOR_MARK = "\ue000"
+SHIP_COUNT_COLUMNS = [
+    "ne", "na", "sk", "nk", "nt", "sg", "hk", "fp", "ek", "up", "gs", "a", "zz",
+    "nnk", "or", "fk", "yk", "sb", "dm", "se",
+]
+
+_JS_NUMBER = re.compile(r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+_ESCORT_SPLIT = re.compile(r"ｴｽｺｰﾄ:|ES:")
+_TIME_RANGE = re.compile(r"[0-9]{2}:[0-9]{2}-[0-9]{2}:[0-9]{2}")
+_PAIR = re.compile(r"([^\s:：]+)[：:]\s*([^\s　、,]+)")
+_TRANSITION = re.compile(r"\(([^→\-\(\)]+)[→\-]+([^→\-\(\)]+)\)")
+_ROUTE_ESCORT_SHIP = re.compile(r"(.+?[#by]+)[：:]*.*?(ｴｽｺｰﾄ|ES)[:：]?\s*(.+)", re.I)
+_ROUTE_SHIP = re.compile(r"([^\s:：]+)[\s\-～]*[^\s]*[ｴｽｺｰﾄ|ES][:：]?\s*(.+)", re.I)
+_DANGLING_ESCORT = re.compile(r"((ｴｽｺｰﾄ|ES)\s*[:：]\s*)$", re.I)
+_TOKEN_SPLIT = re.compile(r"[\n 　,]+")
+_ESCORT_TOKEN = re.compile(r"^(?:ｴｽｺｰﾄ|ES)\s*[:：]\s*(.*)$", re.I)
+# What must follow a tug name in a token: NAME(12) or NAME:anything
+_HP_TAIL = re.compile(r"[\(（][0-9０-９]+[\)）]")
+_INFO_TAIL = re.compile(r"[:：][^\n\r\u2028\u2029]")
+
+_DEFAULT_BERTHS = Automaton(DEFAULT_BERTHS)
+
+
+def _error(value: Any = "") -> Cell:
+    return {"value": value, "error": True, "bgColor": BGCOLOR}
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _line(text: str, index: int) -> str:
+    lines = text.split("\n")
+    return lines[index] if index < len(lines) else ""
+
+
+def js_number(text: str) -> Optional[float]:
+    """JavaScript Number(text); NaN and Infinity become None (JSON null)."""
+    text = text.strip()
+    if text == "":
+        return 0
+    if _JS_NUMBER.fullmatch(text):
+        value = float(text)
+    elif re.fullmatch(r"0[xX][0-9a-fA-F]+", text):
+        value = float(int(text, 16))
+    else:
+        return None
+    if not math.isfinite(value):
+        return None
+    return int(value) if value.is_integer() and abs(value) < 2 ** 53 else value
+
+
+def _digits_number(text: str) -> Optional[float]:
+    return js_number("".join(re.findall(r"[0-9]+", text)))
+
+
+def is_valid_line(line: str) -> bool:
+    has_digit = re.search(r"[0-9]", line) is not None
+    has_japanese = re.search(r"[\u3040-\u30FF\u4E00-\u9FFF\uFF66-\uFF9F]", line) is not None
+    has_english = re.search(r"[A-Za-z]", line) is not None
+    has_special_char = re.search(r"[!@#$%^&*()_+=\[\]{};:\"\\|<>/~`]", line) is not None
+    has_forbidden_word = re.search(r"(なし|未定|BAY)", line) is not None
+    has_full_width_kana = re.search(r"[\u30A0-\u30FF]", line) is not None
+    has_half_width_kana = re.search(r"[\uFF61-\uFF9F]", line) is not None
+    return not (
+        has_digit
+        or (has_japanese and has_english)
+        or has_special_char
+        or has_forbidden_word
+        or (has_full_width_kana and has_half_width_kana)
+    )
+
+
+def extract_route(line: str) -> str:
+    candidates = re.split(r"～|-", _ESCORT_SPLIT.split(line)[0])
+    route = ""
+    for candidate in candidates:
+        index = _DEFAULT_BERTHS.first(candidate)
+        if index is not None:
+            route = DEFAULT_BERTHS[index]
+            break
+
+    if not route:
+        route = next((part.strip() for part in candidates if "#" in part), "")
+
+    if not route:
+        route = _ESCORT_SPLIT.split(line)[0]
+
+    # Remove leading numbers, then normalize to one letter after `#`
+    route = re.sub(r"^[0-9]+", "", route).strip()
+    return re.sub(r"#([0-9]+)[^0-9\s]*", r"#\1", route)
+
+
+# -----------------------
+# Escort parsing
+# -----------------------
+
+def parse_escort_info(raw7: str, is_lng: bool) -> List[Dict[str, Any]]:
+    result: List[Dict[str, Any]] = []
+    if not raw7:
+        return result
+    for line in re.split(f"(?={ESCORT_ROUTES})", raw7):
+        route_match = re.match(f"({ESCORT_ROUTES})", line)
+        if not route_match:
+            continue
+        route = route_match.group(0)
+        if route == "備讃北":
+            continue
+
+        # Text after the time range, e.g. after 03:15-03:35
+        parts = _TIME_RANGE.split(line)
+        after_time = parts[1] if len(parts) > 1 else ""
+        if not after_time:
+            continue
+
+        ships = [s.strip() for s in re.split(r"(?=\n|\s)", after_time)]
+        ships = [s for s in ships if s]
+        if ships:
+            result.append({"route": route, "ships": ships})
+
+    if is_lng:
+        updated = [{"route": e["route"], "ships": [e["ships"][-1]]} for e in result if e["route"] == "明石"]
+        lng_group = [e for e in result if e["route"] != "明石"]
+        if lng_group:
+            updated.append({"route": lng_group[0]["route"], "ships": lng_group[0]["ships"]})
+        return updated
+
+    return result
+
+
+def _is_pattern_context_line(line: str) -> bool:
+    return (
+        re.search(r"[^:\s]{1,10}[:：][^\s　]{1,10}", line) is not None
+        or re.search(r"[^\s→\-]{1,10}[→\-]{1,2}[^\s→\-]{1,10}", line) is not None
+    )
+
+
+def _relevant_escort_lines(raw: str) -> List[str]:
+    lines = raw.split("\n")
+    results = []
+    for i, raw_line in enumerate(lines):
+        line = raw_line.strip()
+        if not re.search(r"ｴｽｺｰﾄ|ES", line, re.I) or "交代" in line:
+            continue
+
+        before = lines[i - 1].strip() if i > 0 else ""
+        after = lines[i + 1].strip() if i + 1 < len(lines) else ""
+
+        if before and "#" in before:
+            combined = before + line
+        elif after and _is_pattern_context_line(after) and not re.search(r"[0-9]", after):
+            combined = line + "　" + after
+        else:
+            combined = line
+
+        if _DANGLING_ESCORT.search(combined):
+            continue
+        results.append(combined)
+    return results
+
+
+def parse_escort_info2(raw5: str, raw6: str, raw8: str) -> List[Dict[str, Any]]:
+    lines = _relevant_escort_lines(raw5) + _relevant_escort_lines(raw6) + _relevant_escort_lines(raw8)
+    results: List[Dict[str, Any]] = []
+
+    for line in lines:
+        trimmed = line.strip()
+        if not trimmed:
+            continue
+
+        # Several escorts on one line: 速吸:ｲｸﾀ　伊予灘:ｼﾘｳｽ 平郡:ｶｲﾀ
+        pairs = list(_PAIR.finditer(trimmed))
+        if len(pairs) > 1:
+            for m in pairs:
+                ship = m.group(2).strip()
+                if ship:
+                    results.append({"route": m.group(1).strip(), "ships": [ship]})
+            continue
+
+        # Hand-over between two tugs: (ﾀﾂﾀ→ﾊﾙﾀ)
+        transition = _TRANSITION.search(trimmed)
+        if transition:
+            route = re.split(r"～|-", trimmed)[0]
+            results.append({"route": route, "ships": [transition.group(1).strip(), transition.group(2).strip()]})
+            continue
+
+        # Route with the escort in the middle: 交差部～播磨灘#1by: ｴｽｺｰﾄ:ｵｵｼｵ
+        m = _ROUTE_ESCORT_SHIP.search(trimmed)
+        if m:
+            ship = m.group(3).strip()
+            if ship:
+                results.append({"route": extract_route(trimmed), "ships": [ship]})
+                continue
+
+        # Route followed by the escort: 播磨灘#1by-日出ｴｽｺｰﾄ:ﾚｲｺｳ
+        if _ROUTE_SHIP.search(trimmed):
+            parts = _ESCORT_SPLIT.split(trimmed)
+            ship = parts[1] if len(parts) > 1 else ""
+            if ship:
+                results.append({"route": extract_route(trimmed), "ships": [ship]})
+            continue
+
+        for m in pairs:
+            ship = m.group(2).strip()
+            if ship:
+                results.append({"route": m.group(1).strip(), "ships": [ship]})
+
+    return results
+
+
+# -----------------------
+# Dock / work classification
+# -----------------------
+
+def _has_dock(text: str) -> bool:
+    return "右舷" in text or "左舷" in text
+
+
+def _has_assist_anchor(text: str) -> bool:
+    return "ｱﾝｶｰ" in text or ANCHOR_MARK in text
+
+
+def get_work(raw5: str, raw6: str) -> Cell:
+    raw5_dock = _has_dock(raw5)
+    raw6_dock = _has_dock(raw6)
+    if raw5_dock and raw6_dock:
+        return {"value": "S"}
+    if raw5_dock:
+        return {"value": "U"}
+    if raw6_dock:
+        return {"value": "M"}
+    if _has_assist_anchor(raw6):
+        return {"value": "A"}
+    return _error()
+
+
+def get_ppnp(work: Cell, raw5: str, raw6: str) -> Cell:
+    if work["value"] not in WORK_CODES:
+        return _error()
+
+    def has_direction(text: str) -> bool:
+        return _has_dock(text) or _has_assist_anchor(text)
+
+    opposite = raw6 if has_direction(raw5) else raw5 if has_direction(raw6) else None
+    if not opposite:
+        return _error()
+
+    lines = [line.strip() for line in opposite.split("\n")]
+    lines = [line for line in lines if line]
+    keyword_index = next(
+        (i for i, line in enumerate(lines) if any(kw in line for kw in PPNP_KEYWORDS)), -1
+    )
+    if keyword_index == -1:
+        return _error()
+
+    for line in lines[keyword_index + 1:keyword_index + 6]:
+        if is_valid_line(line):
+            return {"value": line}
+    return _error()
+
+
+# -----------------------
+# Master data lookups
+# -----------------------
+
+def _short_names(items: List[Dict[str, Any]], strip: bool = True) -> Dict[str, Any]:
+    """name -> short_name, keeping the first entry like Array.find."""
+    index: Dict[str, Any] = {}
+    for item in items:
+        name = item.get("name")
+        if name is None:
+            continue
+        index.setdefault(name.strip() if strip else name, item.get("short_name"))
+    return index
+
+
+class PPContext:
+    """Master data and EMP history indexed for one conversion batch.
+
+    `master` has the same shape as the frontend MasterData: a list per master
+    table, with berths carrying port_short_name. `last_cargo` maps the
+    emp_keys of the batch to their last known cargo (crud.last_cargo).
+    """
+
+    def __init__(self, master: Dict[str, List[Dict[str, Any]]], last_cargo: Dict[EmpKey, Optional[str]]):
+        self.operating_vessels = _short_names(master.get("operating_vessels", []))
+        self.agents = _short_names(master.get("agents", []))
+        self.loaded_cargo = _short_names(master.get("loaded_cargo", []))
+        self.escort_locations = _short_names(master.get("escort_locations", []), strip=False)
+        ports = [p for p in master.get("ports", []) if p.get("name") is not None]
+        self.ports = Automaton([p["name"] for p in ports])
+        self.port_short_names = [p.get("short_name") for p in ports]
+
+        berths = [b for b in master.get("berths", []) if b.get("name") is not None]
+        self.berths = Automaton([b["name"] for b in berths])
+        self.berth_ports = [(b.get("port_short_name"), b.get("short_name")) for b in berths]
+
+        towing = master.get("master_towing", [])
+        self.towing_marks = _short_names(
+            [{"name": t.get("t_name"), "short_name": t.get("short_name")} for t in towing], strip=False
+        )
+        self.towing_names = Automaton(
+            list(dict.fromkeys(t["t_name"] for t in towing if t.get("t_name")))
+        )
+
+        self.last_cargo = last_cargo
+
+    def _lookup(self, index: Dict[str, Any], name: str) -> Cell:
+        return {"value": index[name]} if name in index else _error(name)
+
+    def ovc(self, raw2: str) -> Cell:
+        return self._lookup(self.operating_vessels, _line(raw2, 2).split("/")[0].strip())
+
+    def agent(self, raw2: str) -> Cell:
+        return self._lookup(self.agents, _line(raw2, 3).split("/")[0].strip())
+
+    def load(self, raw4: str, ship_name: str, dwt: Any, no: Any) -> Cell:
+        load = _load_name(raw4)
+        if _is_emp(load):
+            key = emp_key(ship_name, dwt, no)
+            cargo = _text(self.last_cargo.get(key)) if key else ""
+            return {"value": f"EMP ({cargo})"}
+        return self._lookup(self.loaded_cargo, load)
+
+    def port_short_name(self, text: str) -> Any:
+        index = self.ports.first(text)
+        return self.port_short_names[index] if index is not None else None
+
+    def port(self, raw5: str, raw6: str) -> Cell:
+        raw5_dock = _has_dock(raw5)
+        raw6_dock = _has_dock(raw6)
+        candidates = []
+        if raw5_dock:
+            candidates.append(raw5)
+        if raw6_dock or (not raw5_dock and _has_assist_anchor(raw6)):
+            candidates.append(raw6)
+        if raw5_dock or raw6_dock:
+            candidates.append(raw6)
+        for text in candidates:
+            short_name = self.port_short_name(text)
+            if short_name:
+                return {"value": short_name}
+        return _error()
+
+    def berth(self, work: Cell, port: Cell, raw5: str, raw6: str) -> Cell:
+        if work["value"] in WORK_CODES and port["value"]:
+            for index in sorted(self.berths.found(raw5) | self.berths.found(raw6)):
+                port_short_name, short_name = self.berth_ports[index]
+                if port_short_name == port["value"]:
+                    return {"value": short_name}
+        return _error()
+
+    def escort_berth(self, route: str, is_lng: bool) -> Cell:
+        short_name = self.escort_locations.get(route)
+        if is_lng:
+            return {"value": "AKASHIL" if route in self.escort_locations and short_name == "AKASHI" else "LNGES"}
+        return {"value": short_name if route in self.escort_locations else "OTHERS"}
+
+    def towing_ship_names(self, columns: List[str]) -> List[str]:
+        names = self.towing_names.patterns
+        found: Dict[str, None] = {}
+        for text in columns:
+            if not text:
+                continue
+            matched = set()
+            for token in _TOKEN_SPLIT.split(text):
+                token = token.strip()
+                if not token:
+                    continue
+                # `ｴｽｺｰﾄ:NAME` on its own names the escort, not an assisting tug
+                escort = _ESCORT_TOKEN.match(token)
+                escorted = escort.group(1).lower() if escort else None
+                for end, index in self.towing_names.iter(token):
+                    if index in matched or names[index].lower() == escorted:
+                        continue
+                    if _HP_TAIL.match(token, end) or _INFO_TAIL.match(token, end):
+                        matched.add(index)
+            # Same order as the TS loop: by column, then by master_towing order
+            for index in sorted(matched):
+                found.setdefault(names[index], None)
+        return list(found)
+
+    def count_ships(self, row: Row, ships: List[str]) -> Row:
+        for ship in ships:
+            mark = self.towing_marks.get(ship.strip()) or ""
+            key = mark.lower() if mark else "zz"
+            current = js_number(_text(row.get(key, {}).get("value")))
+            row[key] = {"value": (current or 0) + 1}
+        return row
+
+
+# -----------------------
+# Batch conversion
+# -----------------------
+
+def extract_no(file_name: str) -> Any:
+    return _digits_number(file_name)
+
+
+def _load_name(raw4: str) -> str:
+    return re.sub(r"\s+", "", raw4.split("\n")[0])
+
+
+def _is_emp(load: str) -> bool:
+    """Ballast (空船) and inert (ｲﾅｰﾄ) loads show the ship's last known cargo instead."""
+    return re.search(r"(空船|ｲﾅｰﾄ)", load) is not None
+
+
+def emp_key(ship_name: str, dwt: Any, no: Any) -> Optional[EmpKey]:
+    """Lookup key of a row, or None when no EMP row can match (dw is an integer column)."""
+    if not isinstance(dwt, int) or not isinstance(no, int) or no <= 0:
+        return None
+    return (ship_name, dwt, no)
+
+
+def emp_keys(rows: List[Dict[str, Any]], file_name: str) -> List[EmpKey]:
+    """Distinct last-cargo lookups convert_rows will make for these rows."""
+    no = extract_no(file_name)
+    keys: Dict[EmpKey, None] = {}
+    for row in rows:
+        if not row.get(COLUMN2) or not _is_emp(_load_name(_text(row.get(COLUMN4)))):
+            continue
+        ship_name = _text(row.get(COLUMN2)).split("\n")[0]
+        dwt = js_number(_text(row.get(COLUMN3)).split("\n")[0].replace(",", ""))
+        key = emp_key(ship_name, dwt, no)
+        if key:
+            keys.setdefault(key)
+    return list(keys)
+
+
+def convert_rows(rows: List[Dict[str, Any]], file_name: str, ctx: PPContext) -> List[Row]:
+    """Turn converter rows into PP template rows (PPconvert)."""
+    rows = [row for row in rows if row.get(COLUMN2)]
+    if not rows:
+        return []
+
+    # Per-file values
+    no = extract_no(file_name)
+    c = file_name[:1]
+
+    cols = {name: [_text(row.get(name)) for row in rows] for name in (
+        COLUMN1, COLUMN2, COLUMN3, COLUMN4, COLUMN5, COLUMN6, COLUMN7, COLUMN8
+    )}
+    raw2, raw4, raw5, raw6, raw7, raw8 = (
+        cols[COLUMN2], cols[COLUMN4], cols[COLUMN5], cols[COLUMN6], cols[COLUMN7], cols[COLUMN8]
+    )
+
+    b = [_digits_number(v) for v in cols[COLUMN1]]
+    ship_names = [v.split("\n")[0] for v in raw2]
+    dwt = [js_number(v.split("\n")[0].replace(",", "")) for v in cols[COLUMN3]]
+    is_lng = [
+        any("ＬＮＧ" in v for v in values) for values in zip(raw2, raw4, raw5, raw6, raw7, raw8)
+    ]
+    ovc = [ctx.ovc(v) for v in raw2]
+    agent = [ctx.agent(v) for v in raw2]
+    load = [ctx.load(v, s, d, no) for v, s, d in zip(raw4, ship_names, dwt)]
+    port = [ctx.port(r5, r6) for r5, r6 in zip(raw5, raw6)]
+    work = [get_work(r5, r6) for r5, r6 in zip(raw5, raw6)]
+    escorts = [
+        parse_escort_info(r7, lng) + parse_escort_info2(r5, r6, r8)
+        for r5, r6, r7, r8, lng in zip(raw5, raw6, raw7, raw8, is_lng)
+    ]
+    ppnp = [get_ppnp(w, r5, r6) for w, r5, r6 in zip(work, raw5, raw6)]
+    berth = [ctx.berth(w, p, r5, r6) for w, p, r5, r6 in zip(work, port, raw5, raw6)]
+    towing = [ctx.towing_ship_names([r2, r5, r6, r8]) for r2, r5, r6, r8 in zip(raw2, raw5, raw6, raw8)]
+
+    templates: List[Row] = []
+    for i in range(len(rows)):
+        base: Row = {
+            "no": {"value": no},
+            "b": {"value": b[i]},
+            "c": {"value": c},
+            "shipName": {"value": ship_names[i]},
+            "ovc": ovc[i],
+            "agent": agent[i],
+            "dwt": {"value": dwt[i]},
+            "load": load[i],
+            "loadDetail": {"value": ""},
+            "port": port[i],
+            "berth": _error(),
+            "work": _error(),
+            **{key: {"value": 0} for key in SHIP_COUNT_COLUMNS},
+            "ppnp": _error(),
+        }
+
+        primary = {**base, "work": work[i], "berth": berth[i], "ppnp": ppnp[i]}
+        if primary["work"]["value"] != "":
+            templates.append(ctx.count_ships(primary, towing[i]))
+
+        for escort in escorts[i]:
+            escort_row = {
+                **base,
+                "work": {"value": "E"},
+                "berth": ctx.escort_berth(escort["route"], is_lng[i]),
+                "ppnp": ppnp[i],
+            }
+            templates.append(ctx.count_ships(escort_row, escort["ships"]))
+
+    return templates
+
+
+def emp_keys_json(result: str, file_name: str) -> List[EmpKey]:
+    return emp_keys(json.loads(result), file_name)
+
+
+def convert_json(
+    result: str, file_name: str, master: Dict[str, List[Dict[str, Any]]], last_cargo: Dict[EmpKey, Optional[str]]
+) -> List[Row]:
+    """Pipeline stage after converter.main: its JSON string in, PP templates out."""
+    return convert_rows(json.loads(result), file_name, PPContext(master, last_cargo))
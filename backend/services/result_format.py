@@ -0,0 +1,90 @@
+import gzip
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+import brotli # type: ignore
+import orjson # type: ignore
+
+# -----------------------
+# Conversion result encoding
+# -----------------------
+# Conversion results are kept as rows and serialized once with orjson, never
+# as a JSON string nested in JSON. Two response formats:
+#   rows     - a list of row objects, as the converter produces them
+#   columnar - {"columns": [...], "rows": [[...], ...]}: column names once,
+#              one array per row (far smaller for multi-page schedules)
+# Bodies of at least COMPRESS_MIN_BYTES are brotli or gzip compressed when
+# the client accepts it.
+
+FORMATS = ("rows", "columnar")
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+# Brotli 11 is far too slow for per-request use; 5 still beats gzip -9 in size
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+# Preferred first
+ENCODINGS = ("br", "gzip")
+
+
+def parse_rows(result: Union[str, bytes]) -> List[Dict[str, Any]]:
+    """Rows from converter JSON (a cached or freshly converted result)."""
+    return orjson.loads(result)
+
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value)
+
+
+def to_columnar(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Column names in first-seen order plus one value array per row (None where a row lacks a column)."""
+    columns: Dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key)
+    names = list(columns)
+    return {"columns": names, "rows": [[row.get(name) for name in names] for row in rows]}
+
+
+def apply_format(result: Any, fmt: str) -> Any:
+    """Re-shape a job result (rows, or a batch dict with its rows under "result")."""
+    if fmt != "columnar":
+        return result
+    if isinstance(result, list):
+        return to_columnar(result)
+    if isinstance(result, dict) and isinstance(result.get("result"), list):
+        return {**result, "result": to_columnar(result["result"])}
+    return result
+
+
+def accepted_encoding(accept_encoding: Optional[str], available: Tuple[str, ...] = ENCODINGS) -> Optional[str]:
+    """Best encoding of `available` (in ENCODINGS order) the Accept-Encoding header allows (q=0 excludes)."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name == "*":
+            accepted.update(ENCODINGS)
+        elif name:
+            accepted.add(name)
+    return next((encoding for encoding in ENCODINGS if encoding in accepted and encoding in available), None)
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compressed body and its Content-Encoding (None when sent as is)."""
+    if len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    encoding = accepted_encoding(accept_encoding)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), encoding
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), encoding
+    return body, None
+
+
+def encode(payload: Any, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    return compress(dumps(payload), accept_encoding)
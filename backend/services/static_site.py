@@ -0,0 +1,211 @@
+"""Static frontend: the Next.js export mapped into memory once at startup.
+
+Precompress an export (the Docker image does this after `npm run build`),
+from the backend directory:
+
+    python -m services.static_site ../frontend/out
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import sys
+from typing import Dict, Optional, Tuple
+import brotli # type: ignore
+from services.result_format import BROTLI_QUALITY, COMPRESS_MIN_BYTES, GZIP_LEVEL
+
+# -----------------------
+# Static frontend
+# -----------------------
+# The export is walked once and every request path is mapped to its file with
+# the same precedence the old per-request probing had:
+#   1. the file itself (_next/static/*, css, js, images)
+#   2. <path>/index.html
+#   3. <path>.html
+# and anything else gets 404.html with status 404. Serving a page then costs
+# no filesystem lookups: files up to STATIC_MEMORY_MAX_BYTES (every HTML page
+# and RSC payload in practice) are held in memory, larger ones are streamed
+# with the stat taken at load.
+#
+# A `<file>.br` / `<file>.gz` next to a file is sent to clients that accept
+# it; precompress() writes them at the highest levels. Small files without
+# them are compressed in memory at load instead (at the cheaper per-request
+# levels). Files under _next/static have content hashes in their names and
+# are cached for a year as immutable; everything else must be revalidated
+# against its ETag.
+
+FRONTEND_BUILD_DIR = os.getenv(
+    "FRONTEND_BUILD_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "out")
+)
+# Files up to this size are served from memory
+STATIC_MEMORY_MAX_BYTES = int(os.getenv("STATIC_MEMORY_MAX_BYTES", str(64 * 1024)))
+
+IMMUTABLE_PREFIX = "_next/static/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+NOT_FOUND_PAGE = "404.html"
+
+# Content-Encoding -> suffix of the precompressed file
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# Worth compressing; images and fonts other than these already are
+COMPRESSIBLE_SUFFIXES = (
+    ".html", ".txt", ".js", ".mjs", ".css", ".json", ".map", ".svg", ".xml", ".webmanifest", ".ico",
+)
+
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+class StaticBody:
+    """One representation of a file: on disk (path + stat) and, when small, in memory."""
+
+    def __init__(self, path: str, stat: os.stat_result, body: Optional[bytes], etag: str):
+        self.path = path
+        self.stat = stat
+        self.body = body
+        self.etag = etag
+
+
+class StaticAsset:
+    def __init__(self, path: str, name: str, stat: os.stat_result, siblings: Dict[str, os.stat_result]):
+        self.name = name
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if name.startswith(IMMUTABLE_PREFIX) else REVALIDATE_CACHE_CONTROL
+
+        body = None
+        if stat.st_size <= STATIC_MEMORY_MAX_BYTES:
+            with open(path, "rb") as f:
+                body = f.read()
+            tag = hashlib.sha256(body).hexdigest()[:32]
+        else:
+            tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+        self.identity = StaticBody(path, stat, body, f'"{tag}"')
+
+        # Content-Encoding -> representation, in preference order
+        self.encoded: Dict[str, StaticBody] = {}
+        for encoding, suffix in VARIANT_SUFFIXES.items():
+            variant = siblings.get(suffix)
+            if variant is not None and variant.st_mtime_ns >= stat.st_mtime_ns:
+                variant_body = None
+                if body is not None:
+                    with open(path + suffix, "rb") as f:
+                        variant_body = f.read()
+                self.encoded[encoding] = StaticBody(path + suffix, variant, variant_body, f'"{tag}-{encoding}"')
+            elif body is not None and compressible(name, len(body)):
+                compressed = _compress(body, encoding, BROTLI_QUALITY, GZIP_LEVEL)
+                if len(compressed) < len(body):
+                    self.encoded[encoding] = StaticBody(path, stat, compressed, f'"{tag}-{encoding}"')
+
+    def representation(self, encoding: Optional[str]) -> StaticBody:
+        return self.encoded.get(encoding) or self.identity
+
+
+def compressible(name: str, size: int) -> bool:
+    return size >= COMPRESS_MIN_BYTES and name.lower().endswith(COMPRESSIBLE_SUFFIXES)
+
+
+def _compress(body: bytes, encoding: str, brotli_quality: int, gzip_level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime=0 keeps the output identical across builds
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def _walk(directory: str) -> Dict[str, os.stat_result]:
+    """Every regular file under `directory` by its /-separated relative name."""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for file_name in names:
+            path = os.path.join(root, file_name)
+            name = os.path.relpath(path, directory).replace(os.sep, "/")
+            files[name] = os.stat(path)
+    return files
+
+
+def _is_variant(name: str, files: Dict[str, os.stat_result]) -> bool:
+    return any(name.endswith(suffix) and name[: -len(suffix)] in files for suffix in VARIANT_SUFFIXES.values())
+
+
+class StaticSite:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.routes: Dict[str, StaticAsset] = {}
+        self.not_found: Optional[StaticAsset] = None
+        self.memory_bytes = 0
+
+    def load(self) -> int:
+        """Scan the export and build the route map; returns the number of files. Blocking."""
+        if not os.path.isdir(self.directory):
+            print(f"Frontend build not found at {self.directory}; serving the API only.")
+            self.routes, self.not_found = {}, None
+            return 0
+
+        files = _walk(self.directory)
+        assets = {}
+        for name, stat in files.items():
+            if _is_variant(name, files):
+                continue
+            siblings = {suffix: files[name + suffix] for suffix in VARIANT_SUFFIXES.values() if name + suffix in files}
+            assets[name] = StaticAsset(os.path.join(self.directory, name), name, stat, siblings)
+
+        routes = dict(assets)
+        for name, asset in assets.items():
+            if name == "index.html" or name.endswith("/index.html"):
+                directory = name[: -len("index.html")]
+                routes.setdefault(directory.rstrip("/"), asset)
+                if directory:
+                    routes.setdefault(directory, asset)
+        for name, asset in assets.items():
+            if name.endswith(".html"):
+                routes.setdefault(name[: -len(".html")], asset)
+
+        self.routes = routes
+        self.not_found = assets.get(NOT_FOUND_PAGE)
+        self.memory_bytes = sum(
+            len(body.body)
+            for asset in assets.values()
+            for body in [asset.identity, *asset.encoded.values()]
+            if body.body is not None
+        )
+        return len(assets)
+
+    def resolve(self, path: str) -> Tuple[Optional[StaticAsset], int]:
+        """Asset and status code for a request path (without the leading slash)."""
+        asset = self.routes.get(path)
+        if asset is not None:
+            return asset, 200
+        return self.not_found, 404
+
+
+def precompress(directory: str) -> Dict[str, int]:
+    """Write .br and .gz next to every compressible file that lacks an up-to-date one."""
+    files = _walk(directory)
+    report = {"written": 0, "skipped": 0}
+    for name, stat in files.items():
+        if _is_variant(name, files) or not compressible(name, stat.st_size):
+            continue
+        path = os.path.join(directory, name)
+        body = None
+        for encoding, suffix in VARIANT_SUFFIXES.items():
+            existing = files.get(name + suffix)
+            if existing is not None and existing.st_mtime_ns >= stat.st_mtime_ns:
+                report["skipped"] += 1
+                continue
+            if body is None:
+                with open(path, "rb") as f:
+                    body = f.read()
+            compressed = _compress(body, encoding, 11, 9)
+            if len(compressed) >= len(body):
+                report["skipped"] += 1
+                continue
+            with open(path + suffix, "wb") as f:
+                f.write(compressed)
+            report["written"] += 1
+    return report
+
+
+site = StaticSite(FRONTEND_BUILD_DIR)
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else FRONTEND_BUILD_DIR
+    print(precompress(target))
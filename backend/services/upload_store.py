@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+# Disk budget for stored PDFs; least recently used are evicted first
+UPLOAD_STORE_MAX_BYTES = int(os.getenv("UPLOAD_STORE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+# PDFs not uploaded or converted for this many seconds are evicted
+UPLOAD_TTL = int(os.getenv("UPLOAD_TTL", str(7 * 24 * 3600)))
+# PDFs used this recently are never evicted for space, so a running conversion keeps its file
+UPLOAD_EVICT_GRACE = int(os.getenv("UPLOAD_EVICT_GRACE", "3600"))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value: str) -> bool:
+    return bool(DIGEST_PATTERN.match(value))
+
+
+class UploadStore:
+    """Content-addressed store of uploaded PDFs.
+
+    Each PDF is kept once under its SHA-256 (objects/ab/abcd....pdf), so
+    identical uploads share a file and a new upload never overwrites one that
+    another user's conversion is reading. index.json maps each client file
+    name to the digest of its latest upload. An object's mtime is its last
+    use (upload or lookup); sweep() evicts objects unused for `ttl` seconds
+    and then, while over `max_bytes`, the least recently used ones.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: int, grace: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.grace = grace
+        self.objects_dir = os.path.join(directory, "objects")
+        self.tmp_dir = os.path.join(directory, "tmp")
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._names: Dict[str, Dict[str, Any]] = {}
+        self._disk_bytes: Optional[int] = None
+        self.added = 0
+        self.deduplicated = 0
+        self.evictions = 0
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                self._names = json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            # The objects are intact; only name lookups are lost
+            print(f"Upload index unreadable, starting empty: {e}")
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._names, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def part_path(self) -> str:
+        """Fresh temporary path for an upload in progress."""
+        return os.path.join(self.tmp_dir, f"{uuid.uuid4().hex}.part")
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.pdf")
+
+    def add(self, part_path: str, name: str, digest: str) -> bool:
+        """Move a finished upload into the store under `name`; True when the content was already stored."""
+        path = self.object_path(digest)
+        with self._lock:
+            duplicate = os.path.exists(path)
+            if duplicate:
+                os.remove(part_path)
+                os.utime(path)
+                self.deduplicated += 1
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                size = os.path.getsize(part_path)
+                os.replace(part_path, path)
+                self.added += 1
+                if self._disk_bytes is not None:
+                    self._disk_bytes += size
+            self._names[name] = {"sha256": digest, "uploaded_at": time.time()}
+            self._save()
+        return duplicate
+
+    def resolve(self, name: Optional[str] = None, digest: Optional[str] = None) -> Optional[str]:
+        """Path of a stored PDF by digest, or by the latest upload under `name`; marks it used."""
+        with self._lock:
+            if digest is None and name is not None:
+                entry = self._names.get(name)
+                digest = entry["sha256"] if entry else None
+            if digest is None:
+                path = self._adopt_legacy(name) if name else None
+                if path is None:
+                    return None
+            else:
+                path = self.object_path(digest)
+            try:
+                # Under the lock, so a sweep cannot evict it between the check and the touch
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+        return path
+
+    def _adopt_legacy(self, name: str) -> Optional[str]:
+        """Move a file saved by name directly in the upload directory (before this store) into the store."""
+        legacy = os.path.join(self.directory, name)
+        if not name.lower().endswith(".pdf") or not os.path.isfile(legacy):
+            return None
+        digest = hashlib.sha256()
+        with open(legacy, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        path = self.object_path(digest.hexdigest())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(legacy)
+        else:
+            os.replace(legacy, path)
+        self._names[name] = {"sha256": digest.hexdigest(), "uploaded_at": os.path.getmtime(path)}
+        self._save()
+        self._disk_bytes = None
+        return path
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.objects_dir):
+            for name in files:
+                if not name.endswith(".pdf"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    entries.append((name[:-len(".pdf")], path, os.stat(path)))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _remove(self, digest: str, path: str, mtime: float) -> bool:
+        """Evict one object unless it was used after the scan saw it."""
+        with self._lock:
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    return False
+                os.remove(path)
+            except FileNotFoundError:
+                return False
+            self.evictions += 1
+            return True
+
+    def sweep(self, part_ttl: int) -> Dict[str, int]:
+        """Evict expired and over-budget objects, drop their names and stale partial uploads."""
+        with self._lock:
+            legacy = [
+                name for name in os.listdir(self.directory)
+                if os.path.isfile(os.path.join(self.directory, name)) and name.lower().endswith(".pdf")
+            ]
+            for name in legacy:
+                self._adopt_legacy(name)
+
+        now = time.time()
+        expired = 0
+        parts = 0
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            try:
+                if now - os.path.getmtime(path) > part_ttl:
+                    os.remove(path)
+                    parts += 1
+            except FileNotFoundError:
+                continue
+
+        total = 0
+        live = []
+        for digest, path, st in self._scan():
+            if now - st.st_mtime > self.ttl:
+                expired += self._remove(digest, path, st.st_mtime)
+            else:
+                live.append((digest, path, st))
+                total += st.st_size
+
+        evicted = 0
+        live.sort(key=lambda e: e[2].st_mtime)
+        for digest, path, st in live:
+            if total <= self.max_bytes or now - st.st_mtime < self.grace:
+                break
+            if self._remove(digest, path, st.st_mtime):
+                evicted += 1
+                total -= st.st_size
+
+        with self._lock:
+            stale = [name for name, entry in self._names.items() if not os.path.exists(self.object_path(entry["sha256"]))]
+            for name in stale:
+                del self._names[name]
+            if stale:
+                self._save()
+            self._disk_bytes = total
+        return {"expired": expired, "evicted": evicted, "names_dropped": len(stale), "parts_removed": parts}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "names": len(self._names),
+                "added": self.added,
+                "deduplicated": self.deduplicated,
+                "evictions": self.evictions,
+                "disk_bytes": self._disk_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+
+store = UploadStore(UPLOAD_DIR, UPLOAD_STORE_MAX_BYTES, UPLOAD_TTL, UPLOAD_EVICT_GRACE)
@@ -0,0 +1,297 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+import zipfile
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional, Union
+import aiofiles # type: ignore
+import aiofiles.os # type: ignore
+from services import upload_store
+from services.upload_store import UploadStore
+
+# Largest accepted PDF
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+# Largest single chunk accepted by the resumable upload endpoints
+UPLOAD_CHUNK_MAX_BYTES = int(os.getenv("UPLOAD_CHUNK_MAX_BYTES", str(8 * 1024 * 1024)))
+# Unfinished resumable uploads are discarded after this many seconds
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+# Seconds between background sweeps of the upload store
+UPLOAD_SWEEP_INTERVAL = int(os.getenv("UPLOAD_SWEEP_INTERVAL", "600"))
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UploadOffsetError(Exception):
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk offset does not match upload offset {expected}")
+        self.expected = expected
+
+
+def safe_filename(name: Optional[str]) -> str:
+    """Strip any directory part from a client supplied file name."""
+    cleaned = os.path.basename((name or "").replace("\\", "/")).strip()
+    if cleaned in ("", ".", ".."):
+        raise ValueError("Invalid file name")
+    return cleaned
+
+
+class PageCounter:
+    """Counts `/Type /Page` objects in a PDF byte stream as it arrives.
+
+    Pages stored inside compressed object streams are not visible to this
+    scan, so a count of 0 means "unknown" rather than "empty".
+    """
+
+    PATTERN = re.compile(rb"/Type\s{0,8}/Page(?![A-Za-z])")
+    TAIL = 64
+
+    def __init__(self):
+        self.count = 0
+        self._buf = b""
+        self._base = 0
+        self._last_end = 0
+
+    def feed(self, chunk: bytes, final: bool = False):
+        buf = self._buf + chunk
+        for m in self.PATTERN.finditer(buf):
+            end = self._base + m.end()
+            if end <= self._last_end:
+                continue
+            # The lookahead cannot be decided until the next byte arrives
+            if m.end() == len(buf) and not final:
+                continue
+            self.count += 1
+            self._last_end = end
+        keep = min(len(buf), self.TAIL)
+        self._base += len(buf) - keep
+        self._buf = buf[len(buf) - keep:]
+
+    def finish(self):
+        self.feed(b"", final=True)
+
+
+def _upload_info(file_name: str, size: int, hasher, pages: PageCounter, deduplicated: bool) -> Dict[str, Any]:
+    return {
+        "fileName": file_name,
+        "size": size,
+        # Identifies this upload even after another one reuses its file name
+        "sha256": hasher.hexdigest(),
+        "pages": pages.count or None,
+        "deduplicated": deduplicated,
+    }
+
+
+async def _discard(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def save_stream(
+    chunks: AsyncIterator[bytes],
+    file_name: str,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+    store: UploadStore = upload_store.store,
+) -> Dict[str, Any]:
+    """Write an async byte stream into the upload store, hashing and counting pages on the way."""
+    name = safe_filename(file_name)
+    part_path = store.part_path()
+    hasher = hashlib.sha256()
+    pages = PageCounter()
+    size = 0
+
+    try:
+        async with aiofiles.open(part_path, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                hasher.update(chunk)
+                pages.feed(chunk)
+                await f.write(chunk)
+        pages.finish()
+        deduplicated = await asyncio.to_thread(store.add, part_path, name, hasher.hexdigest())
+    except BaseException:
+        await _discard(part_path)
+        raise
+
+    return _upload_info(name, size, hasher, pages, deduplicated)
+
+
+async def iter_upload_file(file, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Async chunk iterator over a FastAPI UploadFile."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+# -----------------------
+# ZIP archives
+# -----------------------
+
+def _is_pdf_entry(info: zipfile.ZipInfo) -> bool:
+    name = info.filename.replace("\\", "/")
+    # Skip folders and the resource forks macOS adds to archives
+    if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("._"):
+        return False
+    return name.lower().endswith(".pdf")
+
+
+def extract_pdfs(
+    source: Union[str, BinaryIO],
+    store: UploadStore = upload_store.store,
+    max_files: Optional[int] = None,
+    max_bytes: int = UPLOAD_MAX_BYTES,
+) -> List[Dict[str, Any]]:
+    """Add every PDF in a ZIP archive to `store` as if each were uploaded.
+
+    Entries are flattened to their base name. Sizes are counted while
+    copying rather than trusted from the archive headers. Blocking, so call
+    it through asyncio.to_thread.
+    """
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Not a ZIP archive: {e}")
+
+    with archive:
+        entries = [info for info in archive.infolist() if _is_pdf_entry(info)]
+        if not entries:
+            raise ValueError("No PDF files in archive")
+        if max_files is not None and len(entries) > max_files:
+            raise ValueError(f"Archive holds {len(entries)} PDF files; at most {max_files} are accepted")
+        names = [safe_filename(info.filename) for info in entries]
+        if len(set(names)) != len(names):
+            raise ValueError("Archive holds PDF files with the same name in different folders")
+
+        extracted = []
+        for info, name in zip(entries, names):
+            part_path = store.part_path()
+            hasher = hashlib.sha256()
+            pages = PageCounter()
+            size = 0
+            try:
+                with archive.open(info) as src, open(part_path, "wb") as f:
+                    while True:
+                        chunk = src.read(READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise UploadTooLargeError(f"{name} exceeds {max_bytes} bytes")
+                        hasher.update(chunk)
+                        pages.feed(chunk)
+                        f.write(chunk)
+                pages.finish()
+                deduplicated = store.add(part_path, name, hasher.hexdigest())
+            except BaseException:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                raise
+            extracted.append(_upload_info(name, size, hasher, pages, deduplicated))
+    return extracted
+
+
+# -----------------------
+# Resumable uploads
+# -----------------------
+
+class UploadSession:
+    def __init__(self, file_name: str, size: Optional[int]):
+        self.id = uuid.uuid4().hex
+        self.file_name = file_name
+        self.size = size
+        self.offset = 0
+        self.part_path = upload_store.store.part_path()
+        self.hasher = hashlib.sha256()
+        self.pages = PageCounter()
+        self.touched_at = time.time()
+        self.lock = asyncio.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "fileName": self.file_name, "size": self.size, "offset": self.offset}
+
+
+_sessions: Dict[str, UploadSession] = {}
+
+
+async def _purge_sessions():
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for session in [s for s in _sessions.values() if s.touched_at < cutoff]:
+        _sessions.pop(session.id, None)
+        await _discard(session.part_path)
+
+
+async def create_session(file_name: str, size: Optional[int]) -> UploadSession:
+    await _purge_sessions()
+    name = safe_filename(file_name)
+    if size is not None and size > UPLOAD_MAX_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+    session = UploadSession(name, size)
+    async with aiofiles.open(session.part_path, "wb"):
+        pass
+    _sessions[session.id] = session
+    return session
+
+
+def get_session(session_id: str) -> Optional[UploadSession]:
+    return _sessions.get(session_id)
+
+
+async def append_chunk(session: UploadSession, offset: int, chunk: bytes) -> UploadSession:
+    """Append a chunk at `offset`; a retried chunk that was already stored is accepted as a no-op."""
+    async with session.lock:
+        session.touched_at = time.time()
+        if offset + len(chunk) == session.offset and offset < session.offset:
+            return session
+        if offset != session.offset:
+            raise UploadOffsetError(session.offset)
+        limit = session.size if session.size is not None else UPLOAD_MAX_BYTES
+        if session.offset + len(chunk) > limit:
+            raise UploadTooLargeError(f"Upload exceeds {limit} bytes")
+        async with aiofiles.open(session.part_path, "ab") as f:
+            await f.write(chunk)
+        session.hasher.update(chunk)
+        session.pages.feed(chunk)
+        session.offset += len(chunk)
+        return session
+
+
+async def complete_session(session: UploadSession) -> Dict[str, Any]:
+    async with session.lock:
+        if session.size is not None and session.offset != session.size:
+            raise UploadOffsetError(session.offset)
+        session.pages.finish()
+        deduplicated = await asyncio.to_thread(
+            upload_store.store.add, session.part_path, session.file_name, session.hasher.hexdigest()
+        )
+        _sessions.pop(session.id, None)
+        return _upload_info(session.file_name, session.offset, session.hasher, session.pages, deduplicated)
+
+
+# -----------------------
+# Sweeper
+# -----------------------
+
+async def sweep_forever(store: UploadStore = upload_store.store, interval: int = UPLOAD_SWEEP_INTERVAL):
+    """Background task: expire resumable sessions and evict old PDFs every `interval` seconds."""
+    while True:
+        try:
+            await _purge_sessions()
+            result = await asyncio.to_thread(store.sweep, UPLOAD_SESSION_TTL)
+            if any(result.values()):
+                print(f"Upload sweep: {result}")
+        except Exception as e:
+            print(f"Upload sweep failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,86 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from services.pp_config import PP_NUMBER_FORMATS, PP_TABLE_HEADER
+
+# -----------------------
+# Schedule workbook export
+# -----------------------
+# Rows are the PPTemplate objects built by the frontend: {column: {value, bgColor}}.
+# The workbook is written in constant-memory mode, so each row is flushed to
+# disk as soon as it is written and memory use does not grow with the schedule.
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Starting column width; columns only grow to fit their content
+MIN_COLUMN_WIDTH = 5
+
+
+class _Formats:
+    """Caches one workbook format per (background colour, number format)."""
+
+    def __init__(self, workbook):
+        self._workbook = workbook
+        self._formats: Dict[Tuple[Optional[str], Optional[str]], Any] = {}
+
+    def get(self, bg_color: Optional[str], num_format: Optional[str]):
+        if not bg_color and not num_format:
+            return None
+        key = (bg_color, num_format)
+        if key not in self._formats:
+            props: Dict[str, Any] = {}
+            if bg_color:
+                props["pattern"] = 1
+                props["bg_color"] = bg_color if bg_color.startswith("#") else f"#{bg_color}"
+            if num_format:
+                props["num_format"] = num_format
+            self._formats[key] = self._workbook.add_format(props)
+        return self._formats[key]
+
+
+def write_schedule(path: str, rows: List[Dict[str, Dict[str, Any]]], sheet_name: str = "Preview") -> int:
+    """Write template rows to an .xlsx file at `path` and return the number of data rows."""
+    headers = list(rows[0].keys()) if rows else []
+    # Imported here so only exports pay for it, not app startup
+    import xlsxwriter # type: ignore
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        formats = _Formats(workbook)
+        widths = [MIN_COLUMN_WIDTH] * len(headers)
+
+        def track_width(col: int, text: str):
+            widths[col] = max(widths[col], len(text) + 2)
+
+        for col, key in enumerate(headers):
+            title = PP_TABLE_HEADER.get(key, key)
+            worksheet.write_string(0, col, title)
+            track_width(col, title)
+
+        for row_index, row in enumerate(rows, start=1):
+            for col, key in enumerate(headers):
+                cell = row.get(key) or {}
+                value = cell.get("value")
+                # Zero means "no value" in the template and is left blank
+                if value == 0 and not isinstance(value, bool):
+                    continue
+                fmt = formats.get(cell.get("bgColor"), PP_NUMBER_FORMATS.get(key))
+                if value is None or value == "":
+                    worksheet.write_blank(row_index, col, None, fmt)
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    worksheet.write_number(row_index, col, value, fmt)
+                    track_width(col, str(value))
+                else:
+                    worksheet.write_string(row_index, col, str(value), fmt)
+                    track_width(col, str(value))
+
+        for col, width in enumerate(widths):
+            worksheet.set_column(col, col, width, formats.get(None, PP_NUMBER_FORMATS.get(headers[col])))
+    finally:
+        workbook.close()
+    return len(rows)
+
+
+def export_file_name(file_name: str) -> str:
+    """Workbook name for a converted PDF: the upload name with its extension swapped."""
+    base = os.path.splitext(os.path.basename(file_name.replace("\\", "/")))[0] or "export"
+    return f"{base}.xlsx"
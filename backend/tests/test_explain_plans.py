@@ -0,0 +1,61 @@
+"""EXPLAIN checks that the list and lookup queries use the index meant for them.
+
+Runs against the configured MySQL database (MYSQL_* / .env) after applying
+migrations, so point MYSQL_DATABASE at a scratch database. Skipped when
+MySQL is unreachable.
+"""
+from typing import Any, Dict, List
+import pytest
+from db.db import LIST_INDEXED_TABLES, connection, initialize_database, ping
+
+# (description, query, params, index the query must use)
+CHECKS = [
+    (
+        f"list {table}",
+        f"SELECT * FROM {table} WHERE deleted_at IS NULL ORDER BY updated_at DESC",
+        (),
+        f"ix_{table}_live_updated",
+    )
+    for table in LIST_INDEXED_TABLES
+] + [
+    ("emps by session", "SELECT * FROM emps WHERE session_id = %s ORDER BY id", ("x",), "ix_emps_session_id"),
+    ("emps by live natural key", "SELECT * FROM emps WHERE live_key IN (%s, %s)", ("a", "b"), "uq_emps_live_key"),
+    (
+        "emps by ship",
+        "SELECT * FROM emps WHERE ship_name = %s AND dw = %s AND data_date < %s AND deleted_at IS NULL",
+        ("x", 1, 20240101),
+        "ix_emps_ship_dw_date",
+    ),
+    (
+        "emps last cargo",
+        "SELECT loaded_cargo_name FROM emps WHERE ship_name = %s AND dw = %s AND deleted_at IS NULL"
+        " AND data_date < %s ORDER BY data_date DESC, id DESC LIMIT 1",
+        ("x", 1, 20240101),
+        "ix_emps_last_cargo",
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def migrated():
+    try:
+        ping()
+    except Exception as e:
+        pytest.skip(f"MySQL unreachable: {e}")
+    initialize_database()
+
+
+def explain(query: str, params: tuple) -> List[Dict[str, Any]]:
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"EXPLAIN {query}", params)
+        columns = [col[0] for col in cur.description]
+        plan = [dict(zip(columns, row)) for row in cur.fetchall()]
+        cur.close()
+    return plan
+
+
+@pytest.mark.parametrize("description, query, params, index_name", CHECKS, ids=[c[0] for c in CHECKS])
+def test_query_uses_index(migrated, description, query, params, index_name):
+    keys = [row.get("key") for row in explain(query, params)]
+    assert index_name in keys, f"{description}: key={keys}, expected {index_name}"
@@ -0,0 +1,50 @@
+"""Parity of services.pp_convert with the TypeScript PP engine.
+
+fixtures/pp_convert holds converter rows, a master snapshot and a last-cargo
+map; expected.json is what the frontend's PPconvert (parseRowToTemplate)
+returns for them. Regenerate it from the frontend directory after changing
+either side:
+
+    npm run pp:golden
+"""
+import json
+import os
+from typing import Any, Dict, List
+import pytest
+from services.pp_convert import PPContext, convert_rows, emp_keys
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "pp_convert")
+
+
+def _fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+ROWS = _fixture("rows.json")
+MASTER = _fixture("master.json")
+LAST_CARGO = {(e["ship_name"], e["dw"], e["before_date"]): e["cargo"] for e in _fixture("last_cargo.json")}
+EXPECTED: List[Dict[str, Any]] = _fixture("expected.json")
+
+
+@pytest.fixture(scope="module")
+def converted() -> List[Dict[str, Any]]:
+    return convert_rows(ROWS["rows"], ROWS["file_name"], PPContext(MASTER, LAST_CARGO))
+
+
+def test_template_count(converted):
+    assert len(converted) == len(EXPECTED)
+
+
+@pytest.mark.parametrize("index", range(len(EXPECTED)))
+def test_template_fields(converted, index):
+    expected = EXPECTED[index]
+    actual = converted[index]
+    assert list(actual) == list(expected)
+    for field, cell in expected.items():
+        assert actual[field] == cell, f"template {index} ({expected['shipName']['value']}), field {field}"
+
+
+def test_emp_keys_cover_last_cargo():
+    # The fixture map answers exactly the lookups the batch makes
+    assert emp_keys(ROWS["rows"], ROWS["file_name"]) == list(LAST_CARGO)
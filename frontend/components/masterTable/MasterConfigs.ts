@@ -65,42 +65,22 @@ export const MASTER_CONFIGS: Record<string, { title: string; columns: any[]; end
   },
 };
 
+// One request for every master table; berths already carry port_name/port_short_name.
+// The snapshot is served with an ETag, so an unchanged snapshot comes back as a 304.
 export const MasterDataLoader = async () => {
-  const entries = Object.entries(MASTER_CONFIGS);
+  const keys = Object.keys(MASTER_CONFIGS);
+  let snapshot: Record<string, any[]> = {};
 
-  const dataPairs = await Promise.all(
-    entries.map(async ([key, config]) => {
-      try {
-        const res = await fetch(config.endpoint);
-        const json = await res.json();
-
-        let data: any[] = [];
-
-        if (Array.isArray(json)) data = json;
-        else if (Array.isArray(json.data)) data = json.data;
-
-        return [key, data] as [string, any[]];
-      } catch (e) {
-        console.error(`Failed to fetch ${key}:`, e);
-        return [key, []] as [string, any[]];
-      }
-    })
-  );
-
-  const result = Object.fromEntries(dataPairs);
-  const portMap = new Map((result.ports || []).map((port: any) => [port.id, port]));
-
-  if (Array.isArray(result.berths)) {
-    result.berths = result.berths.map((berth: any) => {
-      const port = portMap.get(berth.port_id) || {};
-      return {
-        ...berth,
-        port_name: port.name || "",
-        port_short_name: port.short_name || "",
-      };
-    });
+  try {
+    const res = await fetch(`${endpoint}/master/snapshot`);
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    snapshot = await res.json();
+  } catch (e) {
+    console.error("Failed to fetch master snapshot:", e);
   }
 
+  const result = Object.fromEntries(keys.map((key) => [key, Array.isArray(snapshot[key]) ? snapshot[key] : []]));
+
   console.log(result);
   return result;
 };
@@ -1,16 +1,10 @@
 import React, { createContext, useContext, useEffect, useState } from "react";
 import { MasterDataLoader } from "./MasterConfigs";
 
-const endpoint = process.env.NEXT_PUBLIC_API_ENDPOINT;
-
 export type MasterData = Record<string, any[]>;
-export type EmpData = {
-  [key: string]: string | number;
-}[];
 
 interface MasterDataContextType {
   masterData: MasterData;
-  empData: EmpData;
   isLoading: boolean;
   reload: () => void;
 }
@@ -19,7 +13,6 @@ const MasterDataContext = createContext<MasterDataContextType | undefined>(undef
 
 export const MasterDataProvider: React.FC<{ children: React.ReactNode }> = ({ children }) => {
   const [masterData, setMasterData] = useState<MasterData>({});
-  const [empData, setEmpData] = useState<EmpData>([]);
   const [isLoading, setIsLoading] = useState(true);
 
   const load = async () => {
@@ -29,19 +22,12 @@ export const MasterDataProvider: React.FC<{ children: React.ReactNode }> = ({ ch
     setIsLoading(false);
   };
 
-  const empLoad = async () => {
-    const res = await fetch(`${endpoint}/emps`);
-    const json = await res.json();
-    setEmpData(json);
-  };
-
   useEffect(() => {
     load();
-    empLoad();
   }, []);
 
   return (
-    <MasterDataContext.Provider value={{ masterData, empData, isLoading, reload: load }}>
+    <MasterDataContext.Provider value={{ masterData, isLoading, reload: load }}>
       {children}
     </MasterDataContext.Provider>
   );
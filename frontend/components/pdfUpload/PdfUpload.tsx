@@ -11,6 +11,8 @@ const PdfUpload = () => {
   const endpoint = process.env.NEXT_PUBLIC_API_ENDPOINT;
 
   const [uploadedFileName, setUploadedFileName] = useState<string | null>(null);
+  // Content digest from the upload response; names are shared, digests are not
+  const [uploadedDigest, setUploadedDigest] = useState<string | null>(null);
   const [jsonData, setJsonData] = useState<any[]>([]);
   const [showUpload, setShowUpload] = useState(true); // New flag
   const maxFilesReached = useRef(false);
@@ -28,29 +30,61 @@ const PdfUpload = () => {
     const file = event.detail.file;
     if (file && file.name) {
       setUploadedFileName(file.name);
+      try {
+        setUploadedDigest(JSON.parse(event.detail.xhr.responseText).sha256 ?? null);
+      } catch {
+        setUploadedDigest(null);
+      }
       Notification.show(`ファイル '${file.name}' がアップロードされました`, { position: "bottom-center" });
     }
   };
 
+  // Read the NDJSON page stream and render rows as soon as each page is converted
   const handleConvert = async () => {
     if (!uploadedFileName) return;
     try {
       setConverting(true);
-      const response = await fetch(`${endpoint}/convert`, {
+      const response = await fetch(`${endpoint}/convert/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ fileName: uploadedFileName }),
+        body: JSON.stringify({ fileName: uploadedFileName, sha256: uploadedDigest ?? undefined }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error("変換に失敗しました。");
       }
 
-      const result = await response.json();
-      const dataArray = JSON.parse(result);
-      setJsonData(dataArray);
-      Notification.show("PDFが正常にJSONへ変換されました。", { position: "bottom-center" });
-      setShowUpload(false); // Hide upload after conversion success
+      const pages = new Map<number, any[]>();
+      let failedPages = 0;
+      const handleEvent = (event: any) => {
+        if (event.type === "page") {
+          pages.set(event.page, event.rows);
+          const ordered = [...pages.keys()].sort((a, b) => a - b).flatMap((page) => pages.get(page) ?? []);
+          setJsonData(ordered);
+          if (ordered.length > 0) setShowUpload(false);
+        } else if (event.type === "error") {
+          failedPages += 1;
+        }
+      };
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = "";
+      for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop() ?? "";
+        lines.filter(Boolean).forEach((line) => handleEvent(JSON.parse(line)));
+      }
+      if (buffered.trim()) handleEvent(JSON.parse(buffered));
+
+      if (failedPages > 0) {
+        Notification.show(`${failedPages}ページの変換に失敗しました。`, { position: "bottom-center" });
+      } else {
+        Notification.show("PDFが正常にJSONへ変換されました。", { position: "bottom-center" });
+      }
     } catch (error: any) {
       Notification.show(error.message || "変換中にエラーが発生しました。", { position: "bottom-center" });
     } finally {
@@ -104,6 +138,7 @@ const PdfUpload = () => {
             setShowUpload(true);
             setJsonData([]);
             setUploadedFileName(null);
+            setUploadedDigest(null);
           }}
           fileName={uploadedFileName ?? ""}
         />
@@ -1,4 +1,5 @@
-import { EmpData, MasterData } from "../masterTable/MasterDataContext";
+import { MasterData } from "../masterTable/MasterDataContext";
+import { LastCargo } from "./lastCargo";
 import { parseRowToTemplate } from "./parseRowToTemplate";
 import { PPTemplate } from "./PPConfig";
 
@@ -6,7 +7,7 @@ export const PPconvert = (
   initialData: any[],
   fileName: string,
   masterData: MasterData,
-  empData: EmpData
+  lastCargo: LastCargo
 ): PPTemplate[] => {
-  return initialData.flatMap((item) => parseRowToTemplate(item, fileName, masterData, empData));
+  return initialData.flatMap((item) => parseRowToTemplate(item, fileName, masterData, lastCargo));
 };
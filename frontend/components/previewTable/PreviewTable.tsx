@@ -2,9 +2,9 @@ import React, { useEffect, useMemo, useState } from "react";
 import { useReactTable, getCoreRowModel, flexRender, ColumnDef } from "@tanstack/react-table";
 import { Button } from "@vaadin/react-components/Button.js";
 import { PPconvert } from "./PPconvert";
+import { fetchLastCargo, LastCargo } from "./lastCargo";
 import { useMasterData } from "../masterTable/MasterDataContext";
 import { CellResult, COLUMN2, PP_TABLE_HEADER, PPHeaderKey, PPTemplate } from "./PPConfig";
-import ExcelJS from "exceljs";
 import { saveAs } from "file-saver";
 import { Notification } from "@vaadin/react-components/Notification.js";
 
@@ -12,6 +12,12 @@ const endpoint = process.env.NEXT_PUBLIC_API_ENDPOINT;
 
 type TableData = Record<string, string>;
 
+// Same payload => same key, so pressing download again does not re-ingest EMP rows
+const sha256Hex = async (text: string): Promise<string> => {
+  const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+};
+
 interface PreviewTableProps {
   initialData: TableData[];
   onReset: () => void;
@@ -20,13 +26,26 @@ interface PreviewTableProps {
 
 const PreviewTable: React.FC<PreviewTableProps> = ({ initialData, onReset, fileName }) => {
   const [data, setData] = useState<PPTemplate[]>([]);
-  const { masterData, empData } = useMasterData();
+  const { masterData } = useMasterData();
 
   useEffect(() => {
+    let cancelled = false;
     const parsedData = initialData.filter((item) => item[COLUMN2] !== "");
-    const newData = PPconvert(parsedData, fileName, masterData, empData);
-    console.log(parsedData);
-    setData(newData);
+    // Only the EMP rows this schedule refers to are looked up
+    const convert = async () => {
+      let lastCargo: LastCargo = new Map();
+      try {
+        lastCargo = await fetchLastCargo(parsedData, fileName);
+      } catch (error) {
+        console.error("EMP lookup failed", error);
+        Notification.show("EMPデータの取得に失敗しました。", { position: "bottom-center" });
+      }
+      if (!cancelled) setData(PPconvert(parsedData, fileName, masterData, lastCargo));
+    };
+    convert();
+    return () => {
+      cancelled = true;
+    };
   }, [fileName, initialData, masterData]);
 
   const handleDownload = async () => {
@@ -48,74 +67,32 @@ const PreviewTable: React.FC<PreviewTableProps> = ({ initialData, onReset, fileN
           created_by: "admin",
           data_date: row.no.value,
         }));
-      await fetch(`${endpoint}/emps/bulk`, {
+      const body = JSON.stringify(payload);
+      await fetch(`${endpoint}/emps/bulk?mode=upsert`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(payload),
+        headers: { "Content-Type": "application/json", "Idempotency-Key": await sha256Hex(body) },
+        body,
       });
     } catch (error) {
       console.error("EMP API failed", error);
       Notification.show("EMPデータ保存に失敗しました。", { position: "bottom-center" });
     }
 
-    const workbook = new ExcelJS.Workbook();
-    const worksheet = workbook.addWorksheet("Preview");
-
-    const headers = Object.keys(data[0]);
-
-    // Define columns
-    worksheet.columns = headers.map((key) => ({
-      header: PP_TABLE_HEADER[key as PPHeaderKey] ?? key,
-      key,
-      width: 5,
-      style: key === "dwt" ? { numFmt: "#,##0" } : {},
-    }));
-
-    // Add rows
-    data.forEach((row) => {
-      const flatRow: Record<string, string | number> = {};
-      for (const key of headers) {
-        const val = row[key]?.value;
-        if (val !== 0) {
-          flatRow[key] = val ?? "";
-        }
-      }
-      worksheet.addRow(flatRow);
-    });
-
-    // Apply background colors and track max width
-    worksheet.eachRow({ includeEmpty: false }, (row, rowIndex) => {
-      row.eachCell((cell, colNumber) => {
-        const key = headers[colNumber - 1]; // Excel columns are 1-based
-        const cellData = data[rowIndex - 2]?.[key];
-
-        // Apply background color
-        const bgColor = cellData?.bgColor;
-        if (bgColor) {
-          cell.fill = {
-            type: "pattern",
-            pattern: "solid",
-            fgColor: { argb: bgColor.replace("#", "") },
-          };
-        }
-
-        // Auto-width: set column width based on content
-        const text = String(cell.value ?? "");
-        const currentWidth = worksheet.columns[colNumber - 1].width ?? 10;
-        const estimatedWidth = text.length + 2;
-        if (estimatedWidth > currentWidth) {
-          worksheet.columns[colNumber - 1].width = estimatedWidth;
-        }
+    // The workbook is built and streamed back by the backend
+    try {
+      const res = await fetch(`${endpoint}/export/xlsx`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ fileName, rows: data }),
       });
-    });
-
-    // Write file
-    const buffer = await workbook.xlsx.writeBuffer();
-    const cleanName = fileName.replace(/\.[^/.]+$/, "");
-    const blob = new Blob([buffer], {
-      type: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    });
-    saveAs(blob, `${cleanName}.xlsx`);
+      if (!res.ok) throw new Error(`Export failed: ${res.status}`);
+      const blob = await res.blob();
+      const cleanName = fileName.replace(/\.[^/.]+$/, "");
+      saveAs(blob, `${cleanName}.xlsx`);
+    } catch (error) {
+      console.error("Excel export failed", error);
+      Notification.show("Excelファイルの作成に失敗しました。", { position: "bottom-center" });
+    }
   };
 
   const columns = useMemo<ColumnDef<PPTemplate>[]>(() => {
@@ -0,0 +1,11 @@
+// Row fields shared by parseRowToTemplate and the EMP lookup in lastCargo
+
+// (A: Ref.No)
+export const extractNo = (fileName: string): number => Number(fileName.match(/\d+/g)?.join("") ?? "");
+// (D: 船名)
+export const extractShipName = (col: string): string => col.split("\n")[0] ?? "";
+// (G: DWT)
+export const extractDWT = (col: string): number => Number(col.split("\n")[0].replace(/,/g, "") ?? "");
+// (H: 積荷)
+export const loadName = (raw: string): string => raw.split("\n")[0].replace(/\s+/g, "");
+export const isEmpLoad = (load: string): boolean => /(空船|ｲﾅｰﾄ)/.test(load);
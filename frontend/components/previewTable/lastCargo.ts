@@ -0,0 +1,43 @@
+import { COLUMN2, COLUMN3, COLUMN4 } from "./PPConfig";
+import { extractDWT, extractNo, extractShipName, isEmpLoad, loadName } from "./extractFields";
+
+const endpoint = process.env.NEXT_PUBLIC_API_ENDPOINT;
+
+// Last known cargo per EMP key, resolved by the backend (POST /emps/last-cargo)
+export type LastCargo = Map<string, string | null>;
+
+type EmpKey = { ship_name: string; dw: number; before_date: number };
+
+// null when no EMP row can match (dw is an integer column, undated rows need no > 0)
+export const empKey = (shipName: string, dwt: number, no: number): string | null =>
+  Number.isInteger(dwt) && Number.isInteger(no) && no > 0 ? JSON.stringify([shipName, dwt, no]) : null;
+
+// Distinct lookups parseRowToTemplate will make for these rows
+const collectEmpKeys = (rows: any[], fileName: string): EmpKey[] => {
+  const no = extractNo(fileName);
+  const keys = new Map<string, EmpKey>();
+  for (const row of rows) {
+    if (!row[COLUMN2] || !isEmpLoad(loadName(row[COLUMN4] ?? ""))) continue;
+    const shipName = extractShipName(row[COLUMN2]);
+    const dwt = extractDWT(row[COLUMN3] ?? "");
+    const key = empKey(shipName, dwt, no);
+    if (key) keys.set(key, { ship_name: shipName, dw: dwt, before_date: no });
+  }
+  return [...keys.values()];
+};
+
+export const fetchLastCargo = async (rows: any[], fileName: string): Promise<LastCargo> => {
+  const keys = collectEmpKeys(rows, fileName);
+  const lastCargo: LastCargo = new Map();
+  if (keys.length === 0) return lastCargo;
+
+  const res = await fetch(`${endpoint}/emps/last-cargo`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ keys }),
+  });
+  if (!res.ok) throw new Error(`EMP lookup failed: ${res.status}`);
+  const { results } = await res.json();
+  keys.forEach((k, i) => lastCargo.set(JSON.stringify([k.ship_name, k.dw, k.before_date]), results[i]));
+  return lastCargo;
+};
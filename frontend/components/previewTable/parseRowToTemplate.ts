@@ -1,7 +1,9 @@
-import { EmpData, MasterData } from "../masterTable/MasterDataContext";
+import { MasterData } from "../masterTable/MasterDataContext";
+import { extractDWT, extractNo, extractShipName, isEmpLoad, loadName } from "./extractFields";
 import { extractRoute } from "./extractRoute";
 import { findTowingShipNames } from "./findTowingShipNames";
 import { isValidLine } from "./isValidLine";
+import { empKey, LastCargo } from "./lastCargo";
 import {
   BGCOLOR,
   CellResult,
@@ -22,7 +24,7 @@ export const parseRowToTemplate = (
   item: any,
   fileName: string,
   masterData: MasterData,
-  empData: EmpData
+  lastCargo: LastCargo
 ): PPTemplate[] => {
   const no = extractNo(fileName);
   const b = extractB(item[COLUMN1]);
@@ -42,7 +44,7 @@ export const parseRowToTemplate = (
     ovc: getOvc(item[COLUMN2], masterData.operating_vessels),
     agent: getAgent(item[COLUMN2], masterData.agents),
     dwt: { value: dwt },
-    load: getLoad(item[COLUMN4], masterData.loaded_cargo, shipName, dwt, no, empData),
+    load: getLoad(item[COLUMN4], masterData.loaded_cargo, shipName, dwt, no, lastCargo),
     loadDetail: { value: "" },
     port,
     berth: { value: "", error: true, bgColor: BGCOLOR },
@@ -118,14 +120,10 @@ export const parseRowToTemplate = (
   return [completedPrimaryRow, ...escortRows].filter((row) => row.work?.value !== "");
 };
 
-// (A: Ref.No)
-const extractNo = (fileName: string): number => Number(fileName.match(/\d+/g)?.join("") ?? "");
 // (B: Ref.No)
 const extractB = (col: string): number => Number(col.match(/\d+/g)?.join("") ?? "");
 // (C: Ref.No)
 const extractC = (fileName: string): string => fileName.at(0) ?? "";
-// (D: 船名)
-const extractShipName = (col: string): string => col.split("\n")[0] ?? "";
 // (E: 運航船社)
 const getOvc = (raw: string, operatingVessels: { name: string; short_name: string }[]): CellResult => {
   const companyName = raw.split("\n")[2].split("/")[0].trim();
@@ -150,8 +148,6 @@ const getAgent = (raw: string, agents: { name: string; short_name: string }[]):
         bgColor: BGCOLOR,
       };
 };
-// (G: DWT)
-const extractDWT = (col: string): number => Number(col.split("\n")[0].replace(/,/g, "") ?? "");
 // (H: 積荷)
 const getLoad = (
   raw: string,
@@ -159,19 +155,15 @@ const getLoad = (
   shipName: string,
   dwt: number,
   no: number,
-  empData: EmpData
+  lastCargo: LastCargo
 ): CellResult => {
-  const load = raw.split("\n")[0].replace(/\s+/g, "");
-
-  // If load matches 空船 or ｲﾅｰﾄ or is empty
-  if (/(空船|ｲﾅｰﾄ)/.test(load)) {
-    const hit = empData.find((e) => {
-      const condition = e.ship_name === shipName && e.dw === dwt && Number(no) > Number(e.data_date);
-      return condition;
-    });
+  const load = loadName(raw);
 
+  // 空船 or ｲﾅｰﾄ: show the ship's last known cargo
+  if (isEmpLoad(load)) {
+    const key = empKey(shipName, dwt, no);
     return {
-      value: `EMP (${hit?.loaded_cargo_name ?? ""})`,
+      value: `EMP (${(key && lastCargo.get(key)) ?? ""})`,
     };
   }
 
@@ -0,0 +1,55 @@
+// Golden output of the TypeScript PP engine for the backend parity test
+// (backend/tests/test_pp_convert_parity.py). Run it after changing the
+// fixtures or components/previewTable and commit expected.json with the change:
+//
+//   npm run pp:golden
+import { mkdtempSync, readdirSync, readFileSync, rmSync, writeFileSync } from "node:fs";
+import { tmpdir } from "node:os";
+import { dirname, join } from "node:path";
+import { fileURLToPath, pathToFileURL } from "node:url";
+import ts from "typescript";
+
+const root = join(dirname(fileURLToPath(import.meta.url)), "..");
+const sourceDir = join(root, "components", "previewTable");
+const fixtureDir = join(root, "..", "backend", "tests", "fixtures", "pp_convert");
+
+const readFixture = (name) => JSON.parse(readFileSync(join(fixtureDir, name), "utf8"));
+
+// The engine modules as plain ES modules; type-only imports such as
+// MasterData are elided, so nothing React-side gets loaded
+const buildDir = mkdtempSync(join(tmpdir(), "pp-golden-"));
+try {
+  for (const file of readdirSync(sourceDir).filter((name) => name.endsWith(".ts"))) {
+    const { outputText } = ts.transpileModule(readFileSync(join(sourceDir, file), "utf8"), {
+      compilerOptions: { module: ts.ModuleKind.ESNext, target: ts.ScriptTarget.ES2022 },
+    });
+    // Relative imports are extensionless in the sources
+    const code = outputText.replace(/from "(\.\/[^"]+)"/g, 'from "$1.mjs"');
+    writeFileSync(join(buildDir, file.replace(/\.ts$/, ".mjs")), code);
+  }
+
+  const { COLUMN2 } = await import(pathToFileURL(join(buildDir, "PPConfig.mjs")).href);
+  const { PPconvert } = await import(pathToFileURL(join(buildDir, "PPconvert.mjs")).href);
+
+  const { file_name: fileName, rows } = readFixture("rows.json");
+  const masterData = readFixture("master.json");
+  // Keyed like fetchLastCargo fills it from POST /emps/last-cargo
+  const lastCargo = new Map(
+    readFixture("last_cargo.json").map((entry) => [
+      JSON.stringify([entry.ship_name, entry.dw, entry.before_date]),
+      entry.cargo,
+    ])
+  );
+
+  // Same row filter as PreviewTable
+  const templates = PPconvert(
+    rows.filter((item) => item[COLUMN2] !== ""),
+    fileName,
+    masterData,
+    lastCargo
+  );
+  writeFileSync(join(fixtureDir, "expected.json"), JSON.stringify(templates, null, 2) + "\n");
+  console.log(`${templates.length} templates written to ${join(fixtureDir, "expected.json")}`);
+} finally {
+  rmSync(buildDir, { recursive: true, force: true });
+}